@@ -0,0 +1,141 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to benchmark the time taken to drag blocks and edges in a big graph.
+
+Usage: python benchmarks/block_drag.py [--moves MOVES]
+
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Iterable
+
+from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint:disable=wrong-import-position
+from pyflow.blocks.block import Block
+from pyflow.core.edge import Edge
+from pyflow.core.socket import Socket
+from pyflow.graphics.view import View
+from pyflow.scene.scene import Scene
+
+COLUMNS, ROWS = 25, 20
+SELECTED_COLUMNS, SELECTED_ROWS = 5, 10
+
+
+def build_scene(scene: Scene):
+    """Fill a scene with a grid of blocks, each one linked to its right and lower ones.
+
+    Returns:
+        The blocks of the scene, by column and row.
+
+    """
+    grid = {}
+    for column in range(COLUMNS):
+        for row in range(ROWS):
+            block = Block(title=f"{column}-{row}", width=300, height=150)
+            block.setPos(column * 400, row * 250)
+            for socket_type in ("input", "output"):
+                block.add_socket(Socket(block, socket_type=socket_type))
+            scene.addItem(block)
+            grid[column, row] = block
+    for (column, row), block in grid.items():
+        for neighbor in (grid.get((column + 1, row)), grid.get((column, row + 1))):
+            if neighbor is not None:
+                edge = Edge(
+                    source_socket=block.sockets_out[0],
+                    destination_socket=neighbor.sockets_in[0],
+                )
+                scene.addItem(edge)
+    return grid
+
+
+def send_mouse_event(view: View, event_type: QEvent.Type, position: QPoint):
+    """Send a left button mouse event to the viewport of a view."""
+    viewport = view.viewport()
+    pressed = event_type != QEvent.Type.MouseButtonRelease
+    viewport_event = QMouseEvent(
+        event_type,
+        QPointF(position),
+        QPointF(viewport.mapToGlobal(position)),
+        Qt.MouseButton.NoButton
+        if event_type == QEvent.Type.MouseMove
+        else Qt.MouseButton.LeftButton,
+        Qt.MouseButton.LeftButton if pressed else Qt.MouseButton.NoButton,
+        Qt.KeyboardModifier.NoModifier,
+    )
+    QApplication.sendEvent(viewport, viewport_event)
+
+
+def drag(
+    view: View, start: QPoint, moves: int, selection: Iterable[Block] = ()
+) -> float:
+    """Drag the mouse from a position in the view.
+
+    Args:
+        view: View receiving the mouse events.
+        start: Position of the mouse press in the view.
+        moves: Number of mouse moves, of one pixel in each direction.
+        selection: Blocks selected once the mouse is pressed, to drag them together.
+
+    Returns:
+        The mean time taken to handle a mouse move and to repaint the view.
+
+    """
+    send_mouse_event(view, QEvent.Type.MouseButtonPress, start)
+    for block in selection:
+        block.setSelected(True)
+    QApplication.processEvents()
+    begin = time.perf_counter()
+    for move in range(1, moves + 1):
+        send_mouse_event(view, QEvent.Type.MouseMove, start + QPoint(move, move))
+        QApplication.processEvents()
+    move_time = (time.perf_counter() - begin) / moves
+    send_mouse_event(view, QEvent.Type.MouseButtonRelease, start + QPoint(moves, moves))
+    QApplication.processEvents()
+    return move_time
+
+
+def benchmark(moves: int):
+    """Print the mean time taken by a mouse move when dragging blocks or an edge."""
+    scene = Scene()
+    grid = build_scene(scene)
+    view = View(scene)
+    view.resize(1600, 1000)
+    view.show()
+    view.setZoom(0.5)
+    view.centerOn(grid[SELECTED_COLUMNS, SELECTED_ROWS])
+    QApplication.processEvents()
+
+    selection = [
+        grid[column, row]
+        for column in range(SELECTED_COLUMNS)
+        for row in range(SELECTED_ROWS)
+    ]
+    block = selection[-1]
+    start = view.mapFromScene(block.scenePos() + QPointF(block.width / 2, 10))
+    move_time = drag(view, start, moves, selection)
+    print(
+        f"Dragging {len(scene.selectedItems())} of {len(scene.blocks)} blocks: "
+        f"{1000 * move_time:.2f} ms per move"
+    )
+
+    scene.clearSelection()
+    socket = grid[SELECTED_COLUMNS + 1, SELECTED_ROWS].sockets_out[0]
+    move_time = drag(view, view.mapFromScene(socket.scenePos()), moves)
+    print(f"Dragging an edge: {1000 * move_time:.2f} ms per move")
+    scene.kernel.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--moves", type=int, default=60)
+    app = QApplication(sys.argv[:1])
+    benchmark(parser.parse_args().moves)
@@ -0,0 +1,70 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to benchmark the time taken to paint a scene with many blocks.
+
+Usage: python benchmarks/block_paint.py [--frames FRAMES] [--device-cache]
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint:disable=wrong-import-position
+from pyflow.blocks.block import Block
+from pyflow.graphics.view import View
+from pyflow.scene.scene import Scene
+
+COLUMNS, ROWS = 20, 15
+
+
+def benchmark(frames: int, device_cache: bool):
+    """Print the mean time taken to repaint a scene full of blocks and to drag one."""
+    scene = Scene()
+    for column in range(COLUMNS):
+        for row in range(ROWS):
+            block = Block(title=f"{column}-{row}", width=300, height=150)
+            block.setPos(column * 340, row * 190)
+            block.setSelected((column + row) % 3 == 0)
+            scene.addItem(block)
+    scene.device_cache = device_cache
+    view = View(scene)
+    view.resize(1600, 1000)
+    view.show()
+    view.fitInView(scene.itemsBoundingRect())
+    QApplication.processEvents()
+
+    viewport = view.viewport()
+    viewport.repaint()
+    start = time.perf_counter()
+    for _ in range(frames):
+        viewport.repaint()
+    frame_time = (time.perf_counter() - start) / frames
+    print(f"{len(scene.blocks)} blocks: {1000 * frame_time:.2f} ms per frame")
+
+    # Drag a block diagonally over the others
+    dragged = next(iter(scene.blocks))
+    dragged.setPos(0, 0)
+    QApplication.processEvents()
+    start = time.perf_counter()
+    for _ in range(frames):
+        dragged.moveBy(40, 25)
+        QApplication.processEvents()
+    frame_time = (time.perf_counter() - start) / frames
+    print(f"Dragging a block: {1000 * frame_time:.2f} ms per frame")
+    scene.kernel.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--device-cache", action="store_true")
+    app = QApplication(sys.argv[:1])
+    arguments = parser.parse_args()
+    benchmark(arguments.frames, arguments.device_cache)
@@ -0,0 +1,81 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to benchmark the time taken to paint a scene with many edges.
+
+Usage: python benchmarks/edge_paint.py [--frames FRAMES]
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint:disable=wrong-import-position
+from pyflow.blocks.block import Block
+from pyflow.core.edge import Edge
+from pyflow.core.socket import Socket
+from pyflow.graphics.view import View
+from pyflow.scene.scene import Scene
+
+COLUMNS, ROWS = 11, 10
+
+
+def build_scene(scene: Scene):
+    """Fill a scene with columns of blocks, each one linked to the whole next column.
+
+    Returns:
+        The number of edges in the scene.
+
+    """
+    previous_column = []
+    for column in range(COLUMNS):
+        current_column = []
+        for row in range(ROWS):
+            block = Block(title=f"{column}-{row}", width=200, height=100)
+            block.setPos(column * 400, row * 200)
+            for socket_type in ("input", "output"):
+                block.add_socket(Socket(block, socket_type=socket_type))
+            scene.addItem(block)
+            current_column.append(block)
+        for source in previous_column:
+            for destination in current_column:
+                edge = Edge(
+                    source_socket=source.sockets_out[0],
+                    destination_socket=destination.sockets_in[0],
+                )
+                scene.addItem(edge)
+        previous_column = current_column
+    return len(scene.edges)
+
+
+def benchmark(frames: int):
+    """Print the mean time taken to repaint the view of the scene."""
+    scene = Scene()
+    n_edges = build_scene(scene)
+    view = View(scene)
+    view.resize(1600, 1000)
+    view.show()
+    view.fitInView(scene.itemsBoundingRect())
+    QApplication.processEvents()
+
+    viewport = view.viewport()
+    viewport.repaint()
+    start = time.perf_counter()
+    for _ in range(frames):
+        viewport.repaint()
+    frame_time = (time.perf_counter() - start) / frames
+    print(f"{n_edges} edges: {1000 * frame_time:.2f} ms per frame")
+    scene.kernel.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=50)
+    app = QApplication(sys.argv[:1])
+    benchmark(parser.parse_args().frames)
@@ -0,0 +1,53 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to benchmark the time taken to paint the background grid of a scene.
+
+Usage: python benchmarks/grid_paint.py [--frames FRAMES]
+
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint:disable=wrong-import-position
+from pyflow.scene.scene import Scene
+
+WIDTH, HEIGHT = 1600, 1000
+ZOOMS = (5, 1, 0.5, 0.2, 0.05)
+
+
+def benchmark(frames: int):
+    """Print the mean time taken to paint the background of a view at several zooms."""
+    scene = Scene()
+    image = QImage(WIDTH, HEIGHT, QImage.Format.Format_ARGB32_Premultiplied)
+    for zoom in ZOOMS:
+        painter = QPainter(image)
+        painter.setRenderHints(
+            QPainter.RenderHint.Antialiasing | QPainter.RenderHint.SmoothPixmapTransform
+        )
+        painter.scale(zoom, zoom)
+        rect = QRectF(0, 0, WIDTH / zoom, HEIGHT / zoom)
+        scene.drawBackground(painter, rect)
+        start = time.perf_counter()
+        for _ in range(frames):
+            scene.drawBackground(painter, rect)
+        frame_time = (time.perf_counter() - start) / frames
+        painter.end()
+        print(f"zoom {zoom}: {1000 * frame_time:.2f} ms per frame")
+    scene.kernel.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=20)
+    app = QApplication(sys.argv[:1])
+    benchmark(parser.parse_args().frames)
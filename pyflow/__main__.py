@@ -1,6 +1,6 @@
 # Pyflow an open-source tool for modular visual programing in python
 # Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
-# pylint:disable=wrong-import-position, protected-access
+# pylint:disable=import-outside-toplevel, protected-access
 
 """ Pyflow main module. """
 
@@ -13,30 +13,27 @@ import logging
 import asyncio
 from colorama import init, Fore, Style
 
+from pyflow import __version__
+from pyflow.logging import PyflowHandler, add_verbose_argument
+
 init()
 if os.name == "nt":  # If on windows
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from PyQt5.QtWidgets import QApplication
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from pyflow.graphics.window import Window
-from pyflow import __version__
-from pyflow.logging import PyflowHandler
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+def main():
+    """Open the Pyflow window, Qt is only imported here."""
+    from PyQt5.QtWidgets import QApplication
 
-if __name__ == "__main__":
+    from pyflow.graphics.window import Window
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-p", "--path", type=str, help="path to a file to open")
-    parser.add_argument(
-        "-v",
-        "--verbose",
-        type=str,
-        choices=logging._nameToLevel.keys(),
-        help="set logging level",
-        default="INFO",
+    parser = argparse.ArgumentParser(
+        epilog="Use `python -m pyflow run --help` to run graphs without a display."
     )
+    parser.add_argument("-p", "--path", type=str, help="path to a file to open")
+    add_verbose_argument(parser)
     args = parser.parse_args()
 
     # Debug flag will lower logging level to DEBUG
@@ -68,4 +65,13 @@ if __name__ == "__main__":
 
     wnd.setWindowTitle(f"Pyflow {__version__}")
     wnd.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["run"]:
+        # Headless runner, Qt must not be imported
+        from pyflow.runner import main as run
+
+        sys.exit(run(sys.argv[2:]))
+    sys.exit(main())
@@ -4,11 +4,12 @@
 
 """ Module for the base Block."""
 
-from typing import TYPE_CHECKING, List, Optional, OrderedDict, Tuple, Union
+from typing import TYPE_CHECKING, Any, List, Optional, OrderedDict, Set, Tuple, Union
 
 from PyQt5.QtCore import QPointF, QRectF, Qt
-from PyQt5.QtGui import QBrush, QPen, QColor, QPainter, QPainterPath
+from PyQt5.QtGui import QBrush, QPen, QColor, QFont, QPainter, QPainterPath, QPicture
 from PyQt5.QtWidgets import (
+    QApplication,
     QGraphicsItem,
     QGraphicsProxyWidget,
     QGraphicsSceneMouseEvent,
@@ -24,6 +25,7 @@ if TYPE_CHECKING:
     from pyflow.scene.scene import Scene
 
 BACKGROUND_COLOR = QColor("#E3212121")
+PLACEHOLDER_COLOR = QColor("#B0B0B0")
 
 
 class Block(QGraphicsItem, Serializable):
@@ -41,6 +43,7 @@ class Block(QGraphicsItem, Serializable):
         "sockets": [],
     }
     MANDATORY_FIELDS = {"block_type", "position"}
+    TRACKS_CHANGES = True
 
     def __init__(
         self,
@@ -81,6 +84,7 @@ class Block(QGraphicsItem, Serializable):
 
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges)
 
         self.setAcceptHoverEvents(True)
 
@@ -92,7 +96,10 @@ class Block(QGraphicsItem, Serializable):
         self.title_widget = Title(title, parent_widget=self.root, parent_block=super())
         self.title_widget.setAttribute(Qt.WA_TranslucentBackground)
 
+        self.title_widget.textChanged.connect(self.mark_dirty)
+
         self.splitter = Splitter(self, Qt.Vertical, self.root)
+        self.splitter.splitterMoved.connect(self.mark_dirty)
 
         self.size_grip = SizeGrip(self, self.root)
 
@@ -110,14 +117,35 @@ class Block(QGraphicsItem, Serializable):
         self.moved = False
         self.metadata = {}
 
+        # A block outside of the views of a virtualized scene hides its widgets
+        # and paints a placeholder instead, see Scene.virtualized and Scene.low_detail
+        self.materialized = True
+        self._placeholder = QPicture()
+        self._placeholder_data = None
+
+        # Paths painted around the widgets, see chrome_paths
+        self._chrome_key = None
+        self._chrome_paths = (QPainterPath(), QPainterPath())
+
     def scene(self) -> "Scene":
         """Get the current Scene containing the block."""
         return super().scene()
 
     def boundingRect(self) -> QRectF:
-        """Get the the block bounding box."""
+        """Get the the block bounding box, including the outlines drawn around it."""
+        margin = 2.5 * self.pen_width
+        return self.rect().adjusted(-margin, -margin, margin, margin)
+
+    def rect(self) -> QRectF:
+        """Get the area covered by the block."""
         return QRectF(0, 0, self.width, self.height).normalized()
 
+    def shape(self) -> QPainterPath:
+        """Get the area where the block can be clicked, without its outlines."""
+        path = QPainterPath()
+        path.addRect(self.rect())
+        return path
+
     def paint(
         self,
         painter: QPainter,
@@ -125,31 +153,48 @@ class Block(QGraphicsItem, Serializable):
         widget: Optional[QWidget] = None,
     ):
         """Paint the block."""
+        scene = self.scene()
+        if scene is not None and scene.low_detail:
+            self.paint_low_detail(painter, option)
+            return
+
+        path_content, path_selection = self.chrome_paths()
 
         # content
-        path_content = QPainterPath()
-        path_content.setFillRule(Qt.FillRule.WindingFill)
-        path_content.addRoundedRect(
-            0, 0, self.width, self.height, self.edge_size, self.edge_size
-        )
         painter.setPen(Qt.PenStyle.NoPen)
         painter.setBrush(self._brush_background)
-        painter.drawPath(path_content.simplified())
+        painter.drawPath(path_content)
+
+        if not self.materialized:
+            self.paint_placeholder(painter)
 
         # outline
-        path_outline = QPainterPath()
-        path_outline.addRoundedRect(
-            0, 0, self.width, self.height, self.edge_size, self.edge_size
-        )
-        painter.setPen(self.pen_outline)
         painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawPath(path_outline.simplified())
+        if self.pen_outline.color().alpha() > 0:
+            painter.setPen(self.pen_outline)
+            painter.drawPath(path_content)
 
         # selection inner outline
         if self.isSelected():
-            path_in_outline = QPainterPath()
-            outline_width = self.pen_outline.widthF()
-            path_in_outline.addRoundedRect(
+            painter.setPen(self._pen_outline_selected)
+            painter.drawPath(path_selection)
+
+    def chrome_paths(self) -> Tuple[QPainterPath, QPainterPath]:
+        """Get the paths of the block content and of its selection outline.
+
+        They are only built again when the size of the block or of its outline changes.
+
+        """
+        outline_width = self.pen_outline.widthF()
+        chrome_key = (self.width, self.height, self.edge_size, outline_width)
+        if chrome_key != self._chrome_key:
+            path_content = QPainterPath()
+            path_content.setFillRule(Qt.FillRule.WindingFill)
+            path_content.addRoundedRect(
+                0, 0, self.width, self.height, self.edge_size, self.edge_size
+            )
+            path_selection = QPainterPath()
+            path_selection.addRoundedRect(
                 -2 * outline_width,
                 -2 * outline_width,
                 self.width + 4 * outline_width,
@@ -157,9 +202,117 @@ class Block(QGraphicsItem, Serializable):
                 self.edge_size + 2 * outline_width,
                 self.edge_size + 2 * outline_width,
             )
-            painter.setPen(self._pen_outline_selected)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawPath(path_in_outline.simplified())
+            self._chrome_key = chrome_key
+            self._chrome_paths = (
+                path_content.simplified(),
+                path_selection.simplified(),
+            )
+        return self._chrome_paths
+
+    def paint_low_detail(self, painter: QPainter, option: QStyleOptionGraphicsItem):
+        """Paint the block as a simple rectangle with its title, when zoomed out."""
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        pen = self._pen_outline_selected if self.isSelected() else self.pen_outline
+        painter.setPen(pen)
+        painter.setBrush(self._brush_background)
+        painter.drawRect(self.rect())
+
+        # Keep the title readable whatever the zoom, as long as it fits in the block
+        zoom = option.levelOfDetailFromTransform(painter.worldTransform())
+        font = QFont()
+        font.setPixelSize(max(1, int(min(12 / max(zoom, 0.01), self.height / 2))))
+        painter.setFont(font)
+        painter.setPen(PLACEHOLDER_COLOR)
+        margin = self.edge_size
+        painter.drawText(
+            self.rect().adjusted(margin, margin, -margin, -margin),
+            Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+            self.title,
+        )
+
+    def paint_placeholder(self, painter: QPainter):
+        """Paint the title and the content of the block, from its serialized data.
+
+        The drawing is recorded and replayed until the block changes.
+
+        """
+        data = self.cached_serialize()
+        if data is not self._placeholder_data:
+            self._placeholder_data = data
+            self._placeholder = QPicture()
+            recorder = QPainter(self._placeholder)
+            recorder.setPen(PLACEHOLDER_COLOR)
+            font = QFont()
+            font.setPointSize(10)
+            recorder.setFont(font)
+            margin = int(self.edge_size * 2)
+            recorder.drawText(
+                QRectF(margin, self.edge_size, self.width - 2 * margin, 2 * margin),
+                Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                data["title"],
+            )
+            recorder.drawText(
+                QRectF(
+                    margin,
+                    self.edge_size + 2 * margin,
+                    self.width - 2 * margin,
+                    self.height - 2 * self.edge_size - 2 * margin,
+                ),
+                Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+                self.placeholder_text(data),
+            )
+            recorder.end()
+        painter.drawPicture(0, 0, self._placeholder)
+
+    def placeholder_text(self, data: OrderedDict) -> str:
+        """Text shown by the placeholder of the block, from its serialized data."""
+        return ""
+
+    def materialize(self):
+        """Show the widgets of the block instead of its placeholder."""
+        if not self.materialized:
+            self.materialized = True
+            self.holder.show()
+            self.update()
+
+    def virtualize(self):
+        """Hide the widgets of the block and paint a placeholder instead.
+
+        Blocks whose widgets have the focus stay materialized.
+
+        """
+        focused = QApplication.focusWidget()
+        if self.materialized and not (
+            focused is not None and self.root.isAncestorOf(focused)
+        ):
+            self.materialized = False
+            self.holder.hide()
+            self.update()
+
+    def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: Any) -> Any:
+        """Mark the block as changed when it moves, materialize it when it is needed."""
+        if change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
+            self.mark_dirty()
+            scene = self.scene()
+            if scene is not None:
+                # The sockets are sorted by the position of the blocks they link,
+                # which only changes with the blocks not dragged along with it
+                neighbors = self.neighbors()
+                if self.isSelected() and scene.mouseGrabberItem() is not None:
+                    neighbors = {block for block in neighbors if not block.isSelected()}
+                    if neighbors:
+                        neighbors.add(self)
+                else:
+                    neighbors.add(self)
+                scene.schedule_sockets_update(neighbors)
+        if change in (
+            QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged,
+            QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged,
+        ):
+            scene = self.scene()
+            if scene is not None and scene.virtualized:
+                scene.update_virtualization(self)
+        return super().itemChange(change, value)
 
     def add_socket(self, socket: Socket):
         """Add a socket to the block."""
@@ -167,6 +320,7 @@ class Block(QGraphicsItem, Serializable):
             self.sockets_in.append(socket)
         else:
             self.sockets_out.append(socket)
+        self.mark_dirty()
         self.update_sockets()
 
     def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent):
@@ -181,11 +335,6 @@ class Block(QGraphicsItem, Serializable):
         super().mouseMoveEvent(event)
         self.moved = True
 
-        # Update the position of the sockets of this block
-        # and the block it is connected to
-        self.update_sockets()
-        self.update_neighbors_sockets()
-
     def remove(self):
         """Remove the block from the scene containing it."""
         scene = self.scene()
@@ -257,21 +406,32 @@ class Block(QGraphicsItem, Serializable):
         self.sockets_out.sort(key=x_end_position)
 
         for socket in self.sockets_in + self.sockets_out:
-            socket.setPos(*self.get_socket_pos(socket))
-
-    def update_neighbors_sockets(self):
-        """Update the sockets positions of all neighboring blocks."""
+            position = QPointF(*self.get_socket_pos(socket))
+            if socket.pos() != position:
+                socket.setPos(position)
+                self.mark_dirty()
+
+    def neighbors(self) -> Set["Block"]:
+        """Blocks linked to this block by an edge."""
+        neighbors = set()
         for socket in self.sockets_in:
             for edge in socket.edges:
                 if edge.source_socket is not None:
-                    edge.source_socket.block.update_sockets()
+                    neighbors.add(edge.source_socket.block)
         for socket in self.sockets_out:
             for edge in socket.edges:
                 if edge.destination_socket is not None:
-                    edge.destination_socket.block.update_sockets()
+                    neighbors.add(edge.destination_socket.block)
+        return neighbors
+
+    def update_neighbors_sockets(self):
+        """Update the sockets positions of all neighboring blocks."""
+        for block in self.neighbors():
+            block.update_sockets()
 
     def update_all(self):
         """Update sockets and title."""
+        self.mark_dirty()
         self.update_sockets()
         self.update_splitter()
         self.update_title()
@@ -294,7 +454,9 @@ class Block(QGraphicsItem, Serializable):
 
     @width.setter
     def width(self, value: float):
+        self.prepareGeometryChange()
         self.root.setGeometry(0, 0, int(value), self.root.height())
+        self.mark_dirty()
 
     @property
     def height(self):
@@ -303,7 +465,9 @@ class Block(QGraphicsItem, Serializable):
 
     @height.setter
     def height(self, value: float):
+        self.prepareGeometryChange()
         self.root.setGeometry(0, 0, self.root.width(), int(value))
+        self.mark_dirty()
 
     @property
     def pen_outline(self) -> QPen:
@@ -353,19 +517,23 @@ class Block(QGraphicsItem, Serializable):
         if "splitter_pos" in data:
             self.splitter.setSizes(data["splitter_pos"])
 
-        if len(data["sockets"]) > 0:
-            # Remove old sockets
-            for socket in self.sockets_in + self.sockets_out:
+        # Keep the sockets that are still there, along with their edges
+        sockets = {socket.id: socket for socket in self.sockets_in + self.sockets_out}
+        kept = {socket_data["id"] for socket_data in data["sockets"]}
+        for socket_id, socket in sockets.items():
+            if not restore_id or socket_id not in kept:
                 socket.remove()
 
-            # Deserialize new sockets
-            for socket_data in data["sockets"]:
+        for socket_data in data["sockets"]:
+            socket = sockets.get(socket_data["id"]) if restore_id else None
+            if socket is None:
                 socket = Socket(block=self)
                 socket.deserialize(socket_data, hashmap, restore_id)
-
                 self.add_socket(socket)
+            else:
+                socket.deserialize(socket_data, hashmap, restore_id)
 
-                if hashmap is not None:
-                    hashmap.update({socket_data["id"]: socket})
+            if hashmap is not None:
+                hashmap.update({socket_data["id"]: socket})
 
         self.update_all()
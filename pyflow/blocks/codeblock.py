@@ -3,22 +3,28 @@
 
 """ Module for the base Code Block."""
 
-from typing import TYPE_CHECKING, OrderedDict, Tuple
+from typing import TYPE_CHECKING, Dict, List, OrderedDict, Tuple
 
 from ansi2html import Ansi2HTMLConverter
-from PyQt5.QtGui import QColor, QPen
-from PyQt5.QtWidgets import QPushButton, QTextEdit
+from PyQt5.QtCore import QPoint, Qt, QUrl
+from PyQt5.QtGui import QColor, QDesktopServices, QPen
+from PyQt5.QtWidgets import QLabel, QPushButton
 
 from pyflow.blocks.block import Block
 from pyflow.core.edge import Edge
 from pyflow.blocks.executableblock import ExecutableBlock, ExecutableState
+from pyflow.blocks.outputpanel import OutputPanel
 from pyflow.blocks.pyeditor import PythonEditor
 from pyflow.core.add_button import AddEdgeButton, AddNewBlockButton
+from pyflow.core.outputs import OutputBuffer, message_to_output, stream_output
+from pyflow.core.profiler import format_duration
 
 ansi2html_converter = Ansi2HTMLConverter()
 
 if TYPE_CHECKING:
     from PyQt5.QtWidgets import QGraphicsSceneHoverEvent
+    from pyflow.core.kernel import Kernel
+    from pyflow.core.profiler import BlockProfile
 
 
 class CodeBlock(ExecutableBlock):
@@ -31,8 +37,20 @@ class CodeBlock(ExecutableBlock):
     The following is always true:
     output_panel_height + source_panel_height + edge_size*2 + title_height == height
 
+    The block keeps every output of its last run, printed text and rich outputs
+    with all their MIME types, and serializes them like jupyter notebooks do.
+
+    Printed text is streamed into the output panel: only new lines are converted
+    and appended. Only the last OUTPUT_MAX_LINES lines are kept, older lines
+    are spilled to disk and can be opened from the context menu of the panel.
+    The limits can be changed per block with the "output_max_lines"
+    and "output_max_chars" metadata.
+
     """
 
+    OUTPUT_MAX_LINES = 10000
+    OUTPUT_MAX_CHARS = 4 * 2**20
+
     DEFAULT_DATA = {
         **Block.DEFAULT_DATA,
         "source": "",
@@ -49,9 +67,12 @@ class CodeBlock(ExecutableBlock):
 
         super().__init__(block_type="CodeBlock", **kwargs)
         self.source_editor = PythonEditor(self)
+        self.source_editor.textChanged.connect(self.mark_dirty)
 
         self._source = ""
-        self._stdout = ""
+        self.output_buffer = OutputBuffer(self.OUTPUT_MAX_LINES, self.OUTPUT_MAX_CHARS)
+        # True if the outputs must be cleared once the next output arrives
+        self._clear_pending = False
 
         self.source = source
 
@@ -61,7 +82,6 @@ class CodeBlock(ExecutableBlock):
 
         self.output_closed = True
         self._splitter_size = [1, 1]
-        self._cached_stdout = ""
         self.blocks_to_run = []
 
         self._pen_outlines = {
@@ -82,6 +102,7 @@ class CodeBlock(ExecutableBlock):
         self.run_all_button = self.init_run_all_button()
         self.add_edge_button = self.init_add_edge_button()
         self.add_newblock_button = self.init_add_newblock_button()
+        self.profile_badge = self.init_profile_badge()
 
         # Add splitter between source_editor and panel
         self.splitter.addWidget(self.source_editor)
@@ -98,15 +119,29 @@ class CodeBlock(ExecutableBlock):
 
     def init_output_panel(self):
         """Initialize the output display widget: QLabel."""
-        output_panel = QTextEdit()
-        output_panel.setReadOnly(True)
+        output_panel = OutputPanel(self)
         output_panel.setFont(self.source_editor.font())
         style_sheet = (
             f'QTextEdit {{ background-color: "{self.output_panel_background_color}"; }}'
         )
         output_panel.setStyleSheet(style_sheet)
+        output_panel.setContextMenuPolicy(Qt.CustomContextMenu)
+        output_panel.customContextMenuRequested.connect(self.show_output_menu)
         return output_panel
 
+    def show_output_menu(self, pos: QPoint):
+        """Show the context menu of the output panel."""
+        menu = self.output_panel.createStandardContextMenu()
+        show_full_output = menu.addAction("Show full output")
+        show_full_output.setEnabled(self.output_buffer.is_truncated)
+        show_full_output.triggered.connect(self.show_full_output)
+        menu.exec_(self.output_panel.mapToGlobal(pos))
+
+    def show_full_output(self):
+        """Open the full printed output, spilled lines included, in a text viewer."""
+        path = self.output_buffer.full_output_path()
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+
     def init_run_button(self):
         """Initialize the run button."""
         run_button = QPushButton(">", self.root)
@@ -124,6 +159,16 @@ class CodeBlock(ExecutableBlock):
 
         return run_all_button
 
+    def init_profile_badge(self):
+        """Initialize the badge showing the run time of the last execution."""
+        profile_badge = QLabel(self.root)
+        profile_badge.setFixedHeight(int(3 * self.edge_size))
+        profile_badge.setStyleSheet(
+            "QLabel { color: #B0B0B0; background-color: #40000000; padding: 0 4px; }"
+        )
+        profile_badge.hide()
+        return profile_badge
+
     def init_add_edge_button(self):
         """Initialize the add edge button."""
         add_edge_button = AddEdgeButton(block=self)
@@ -160,17 +205,17 @@ class CodeBlock(ExecutableBlock):
         self.add_newblock_button.set_highlight(False)
         return super().hoverLeaveEvent(event)
 
-    def run_code(self):
+    def run_code(self, kernel: "Kernel" = None):
         """Run the code in the block."""
 
-        # Reset stdout
-        self._cached_stdout = ""
+        # The first output of the run replaces the previous output
+        self._clear_pending = True
 
         # Set button text to ...
         self.run_button.setText("...")
         self.run_all_button.setText("...")
 
-        super().run_code()  # actually run the code
+        super().run_code(kernel)  # actually run the code
 
     def execution_finished(self):
         """Reset the text of the run buttons after it was executed."""
@@ -184,6 +229,14 @@ class CodeBlock(ExecutableBlock):
         self.run_button.setText(">")
         self.run_all_button.setText(">>")
 
+    def display_profile(self, profile: "BlockProfile"):
+        """Show the run time of the last execution in the title bar."""
+        self.profile_badge.setText(format_duration(profile.run_time))
+        self.profile_badge.setToolTip(profile.summary())
+        self.profile_badge.adjustSize()
+        self.profile_badge.show()
+        self.update_title()
+
     def link(self, block: "ExecutableBlock"):
         """Link a block to the current one."""
         # Add sockets to the new block and the current one
@@ -235,18 +288,27 @@ class CodeBlock(ExecutableBlock):
         self.update_sockets()
 
     def update_title(self):
-        """Change the geometry of the title widget."""
+        """Change the geometry of the title widget and of the profile badge."""
+        badge_width = 0
+        if not self.profile_badge.isHidden():
+            badge_width = self.profile_badge.width() + int(self.edge_size)
+            self.profile_badge.move(
+                int(self.width - self.edge_size * 2 - self.run_button.width())
+                - self.profile_badge.width(),
+                int(self.edge_size / 2),
+            )
         self.title_widget.setGeometry(
             int(self.edge_size) + self.run_button.width(),
             int(self.edge_size / 2),
-            int(self.width - self.edge_size * 3 - self.run_button.width()),
+            int(self.width - self.edge_size * 3 - self.run_button.width())
+            - badge_width,
             int(self.title_widget.height()),
         )
 
     def update_output_panel(self):
         """Change the geometry of the output panel."""
         # Close output panel if no output
-        if self.stdout == "":
+        if not self.has_outputs_to_show:
             self.previous_splitter_size = self.splitter.sizes()
             self.output_closed = True
             self.splitter.setSizes([1, 0])
@@ -290,6 +352,10 @@ class CodeBlock(ExecutableBlock):
         self.update_add_edge_button()
         self.update_add_newblock_button()
 
+    def placeholder_text(self, data: OrderedDict) -> str:
+        """Source code shown by the placeholder of the block."""
+        return data.get("source", "")
+
     @property
     def source(self) -> str:
         """Source code."""
@@ -299,9 +365,11 @@ class CodeBlock(ExecutableBlock):
     def source(self, value: str):
         if value != self._source:
             # If text has changed, set self and all output blocks to not run
-            output_blocks, _ = self.custom_bfs(self, reverse=True)
-            for block in output_blocks + [self]:
-                block.run_state = ExecutableState.IDLE
+            scene = self.scene()
+            if scene is not None:
+                for block in scene.graph.descendants(self):
+                    block.run_state = ExecutableState.IDLE
+            self.run_state = ExecutableState.IDLE
             self.source_editor.setText(value)
             self._source = value
 
@@ -312,29 +380,57 @@ class CodeBlock(ExecutableBlock):
 
     @property
     def stdout(self) -> str:
-        """Access the content of the output panel of the block."""
-        return self._stdout
+        """Text printed by the block."""
+        return self.output_buffer.text
 
     @stdout.setter
     def stdout(self, value: str):
-        self._stdout = value
-        if hasattr(self, "output_panel"):
-            if value.startswith("<img>"):
-                display_text = self.b64_to_html(value[5:])
-            elif value.startswith("<div>"):
-                display_text = value
+        """Replace the outputs of the block by some printed text.
+
+        For compatibility, "<img>" followed by a base64 png or "<div>" followed by html
+        replace the outputs by the image or the html.
+
+        """
+        if value.startswith("<img>"):
+            self.outputs = [self.image_output(value[5:])]
+        elif value.startswith("<div>"):
+            self.outputs = [
+                {"output_type": "display_data", "data": {"text/html": value}}
+            ]
+        else:
+            self.outputs = [stream_output(value)]
+
+    @property
+    def outputs(self) -> List[Dict]:
+        """Outputs of the block, in the format of the outputs of jupyter notebooks."""
+        return self.output_panel.outputs(self.output_buffer)
+
+    @outputs.setter
+    def outputs(self, outputs: List[Dict]):
+        self.clear_outputs()
+        for output in outputs:
+            if output["output_type"] in ("display_data", "execute_result"):
+                self.handle_display(output)
+            elif output["output_type"] == "stream":
+                self.append_stdout(self.output_panel.join_lines(output["text"]))
             else:
-                display_text = self.str_to_html(value)
-            self.output_panel.setText(display_text)
-            # If output panel is closed and there is output, open it
-            if self.output_closed and value != "":
-                self.output_closed = False
-                self.splitter.setSizes(self._splitter_size)
-            # If output panel is open and there is no output, close it
-            elif not self.output_closed and value == "":
-                self._splitter_size = self.splitter.sizes()
-                self.output_closed = True
-                self.splitter.setSizes([1, 0])
+                self.append_stdout(message_to_output(output)[0])
+        self.update_output_visibility()
+
+    @property
+    def has_outputs_to_show(self) -> bool:
+        """True if the block has any output to show."""
+        return self.stdout != "" or self.output_panel.has_displays
+
+    def update_output_visibility(self):
+        """Open the output panel if there is output, close it otherwise."""
+        if self.output_closed and self.has_outputs_to_show:
+            self.output_closed = False
+            self.splitter.setSizes(self._splitter_size)
+        elif not self.output_closed and not self.has_outputs_to_show:
+            self._splitter_size = self.splitter.sizes()
+            self.output_closed = True
+            self.splitter.setSizes([1, 0])
 
     @staticmethod
     def str_to_html(text: str) -> str:
@@ -350,33 +446,77 @@ class CodeBlock(ExecutableBlock):
         )
         return text
 
-    def handle_stdout(self, value: str):
-        """Handle the stdout signal."""
-        # If there is a new line
-        # Save every line but the last one
+    def append_stdout(self, value: str):
+        """Append printed text to the output panel, converting only the new text.
 
-        if value.find("\n") != -1:
-            lines = value.split("\n")
-            self._cached_stdout += "\n".join(lines[:-1]) + "\n"
-            value = lines[-1]
+        Every complete line is kept, the last line is replaced by the next text.
 
-        # Update the last line only
-        self.stdout = self._cached_stdout + value
+        """
+        self.output_buffer.max_lines = self.metadata.get(
+            "output_max_lines", self.OUTPUT_MAX_LINES
+        )
+        self.output_buffer.max_chars = self.metadata.get(
+            "output_max_chars", self.OUTPUT_MAX_CHARS
+        )
+        added, spilled = self.output_buffer.append(value)
+        self.output_panel.append_lines(added, spilled, self.output_buffer.last_line)
+        self.mark_dirty()
+
+    def clear_outputs(self):
+        """Remove every output, without closing the output panel."""
+        self._clear_pending = False
+        self.output_buffer.clear()
+        self.output_panel.clear()
+        self.mark_dirty()
+
+    def handle_clear(self, wait: bool):
+        """Handle the clear signal, removing the outputs of the block."""
+        if wait:
+            self._clear_pending = True
+        else:
+            self.clear_outputs()
+            self.update_output_visibility()
+
+    def handle_stdout(self, value: str):
+        """Handle the stdout signal."""
+        if self._clear_pending:
+            self.clear_outputs()
+        self.append_stdout(value)
+        self.update_output_visibility()
+
+    def handle_display(self, output: Dict):
+        """Handle the display signal: show a rich output after the previous outputs."""
+        if self._clear_pending:
+            self.clear_outputs()
+        self.output_panel.end_line(self.output_buffer.end_line())
+        self.output_panel.add_display(output)
+        self.mark_dirty()
+        self.update_output_visibility()
+
+    def update_display(self, output: Dict):
+        """Replace the content of a display shown by the block."""
+        self.output_panel.update_display(output)
+        self.mark_dirty()
 
     @staticmethod
     def b64_to_html(image: str) -> str:
         """Transform a base64 encoded image into a html image."""
         return f'<img src="data:image/png;base64,{image}">'
 
+    @staticmethod
+    def image_output(image: str) -> Dict:
+        """Output displaying a base64 encoded png image."""
+        return {"output_type": "display_data", "data": {"image/png": image}}
+
     def handle_image(self, image: str):
         """Handle the image signal."""
-        self.stdout = "<img>" + image
+        self.handle_display(self.image_output(image))
 
     def serialize(self):
         """Serialize the code block."""
         base_dict = super().serialize()
         base_dict["source"] = self.source
-        base_dict["stdout"] = self.stdout
+        base_dict["outputs"] = self.outputs
         return base_dict
 
     def deserialize(
@@ -386,7 +526,13 @@ class CodeBlock(ExecutableBlock):
 
         self.complete_with_default(data)
 
-        for dataname in ("source", "stdout"):
-            if dataname in data:
-                setattr(self, dataname, data[dataname])
+        if "source" in data:
+            self.source = data["source"]
+        # Graphs saved before outputs were kept only have the printed text
+        if "outputs" in data:
+            # Blocks updated in place by the history keep the outputs they show
+            if data["outputs"] != self.outputs:
+                self.outputs = data["outputs"]
+        elif "stdout" in data:
+            self.stdout = data["stdout"]
         super().deserialize(data, hashmap, restore_id)
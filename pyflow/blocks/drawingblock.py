@@ -105,6 +105,7 @@ class DrawingBlock(ExecutableBlock):
         )
         self.run_button.setFixedSize(int(8 * self.edge_size), int(3 * self.edge_size))
         self.run_button.clicked.connect(self.draw_area.clearDrawing)
+        self.run_button.clicked.connect(self.mark_dirty)
         self.holder.setWidget(self.root)
 
     @property
@@ -125,6 +126,7 @@ class DrawingBlock(ExecutableBlock):
 
     def valueChanged(self):
         """Called when the content of the drawing block changes."""
+        self.mark_dirty()
         # Make sure that the slider is initialized before trying to run it.
         if self.scene() is not None:
             self.run_right()
@@ -7,7 +7,7 @@ An abstract block that allows for execution, like CodeBlocks and Sliders.
 
 """
 
-from typing import List, OrderedDict, Set, Union
+from typing import TYPE_CHECKING, Dict, List, OrderedDict, Set, Union
 from abc import abstractmethod
 from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
@@ -17,6 +17,10 @@ from pyflow.core.socket import Socket
 from pyflow.core.edge import Edge
 from pyflow.core.executable import Executable, ExecutableState
 
+if TYPE_CHECKING:
+    from pyflow.core.kernel import Kernel
+    from pyflow.core.profiler import BlockProfile
+
 
 class ExecutableBlock(Block, Executable):
 
@@ -45,6 +49,9 @@ class ExecutableBlock(Block, Executable):
         # Controls the duration of the visual flow animation
         self.transmitting_duration = 500
 
+        # Kernel the block was last sent to, if it is not the kernel of the scene
+        self._kernel: "Kernel" = None
+
         if type(self) == ExecutableBlock:
             raise RuntimeError("ExecutableBlock should not be instanciated directly")
 
@@ -62,6 +69,18 @@ class ExecutableBlock(Block, Executable):
                 return True
         return False
 
+    def input_blocks(self) -> List["ExecutableBlock"]:
+        """Blocks connected to the inputs of the block by an active edge."""
+        scene = self.scene()
+        if scene is not None:
+            return scene.graph.input_blocks(self)
+        return [
+            edge.source_socket.block
+            for socket in self.sockets_in
+            for edge in socket.edges
+            if edge.source_socket.is_on and edge.destination_socket.is_on
+        ]
+
     def create_new_input_socket(self) -> Socket:
         """Create a new input socket and returns it."""
         socket = Socket(self, socket_type="input", flow_type="exe")
@@ -74,42 +93,66 @@ class ExecutableBlock(Block, Executable):
         self.add_socket(socket)
         return socket
 
-    def run_code(self):
-        """Run the code in the block."""
+    @property
+    def kernel(self) -> "Kernel":
+        """Kernel running the block, the kernel of the scene by default."""
+        if self._kernel is not None:
+            return self._kernel
+        return self.scene().kernel
+
+    def run_code(self, kernel: "Kernel" = None):
+        """Run the code in the block.
+
+        Args:
+            kernel: Kernel to run the code on, the kernel of the scene if None.
+
+        """
         # Queue the code to execute
         code = self.source
         if self.scene():
-            kernel = self.scene().kernel
-            kernel.execution_queue.append((self, code))
-
-            if kernel.busy is False:
-                kernel.run_queue()
+            self._kernel = kernel
             self.run_state = ExecutableState.PENDING
+            self.kernel.enqueue(self, code)
 
     def execution_finished(self):
         """Reset the state of the block after it was executed."""
         if self.run_state != ExecutableState.CRASHED:
             self.run_state = ExecutableState.DONE
         self.blocks_to_run = []
+        self._notify_scheduler()
 
     def execution_canceled(self):
         """Reset the state of the block after its execution was canceled."""
         if self.run_state != ExecutableState.CRASHED:
             self.run_state = ExecutableState.IDLE
         self.blocks_to_run = []
+        self._notify_scheduler()
 
-    def _interrupt_execution(self):
-        """Interrupt an execution, reset the blocks in the queue."""
-        for block, _ in self.scene().kernel.execution_queue:
+    def _notify_scheduler(self):
+        """Let the branch runs waiting for this block know that it is over."""
+        scene = self.scene()
+        if scene is not None:
+            scene.branch_scheduler.block_done(self)
+
+    def display_profile(self, profile: "BlockProfile"):
+        """Show the timings of the last execution of the block, if it can."""
+
+    def _cancel_queue(self):
+        """Reset the blocks in the queue."""
+        for block, _ in self.kernel.execution_queue:
             # Reset the blocks that have not been run
             block.execution_canceled()
         # Clear kernel execution queue
-        self.scene().kernel.execution_queue = []
-        # Interrupt the kernel
-        self.scene().kernel.kernel_manager.interrupt_kernel()
+        self.kernel.execution_queue = []
         # Clear local execution queue
         self.blocks_to_run = []
 
+    def _interrupt_execution(self):
+        """Interrupt an execution, reset the blocks in the queue."""
+        self._cancel_queue()
+        # Interrupt the kernel
+        self.kernel.interrupt()
+
     def transmitting_animation_in(self):
         """
         Animate the visual flow
@@ -136,76 +179,52 @@ class ExecutableBlock(Block, Executable):
         """
         Graph traversal in BFS to find the blocks that are connected to the start_node
 
+        The blocks are taken from the execution graph of the scene,
+        the traversal only gives the order in which blocks and edges are animated.
+
         Args:
             start_node (Block): The block to start the traversal from
             reverse (bool): If True, traverse in the direction of outputs
 
         Returns:
-            list: Blocks to run in topological order (reversed)
+            list: Blocks to run in topological order
             list: each element is a list of blocks/edges to animate in order
         """
+        scene = start_node.scene()
+        if scene is None:
+            return [], [[start_node]]
+        graph = scene.graph
+
+        if not reverse:
+            blocks_to_run = graph.sort(graph.ancestors(start_node))
+            next_edges, next_end = graph.input_edges, "source_socket"
+        else:
+            blocks_to_run = graph.sort(graph.descendants(start_node))
+            next_edges, next_end = graph.output_edges, "destination_socket"
 
-        def gather_edges_to_visit(sockets: List[Socket]):
-            """Get list of next edges to visit given a list of sockets.
-
-            Args:
-                sockets (List[Socket]): List of sockets to search edges on.
-
-            Returns:
-                List[Edge]: List of edges connected to sockets given.
-            """
-            edges_to_visit = []
-            for socket in sockets:
-                for edge in socket.edges:
-                    if edge.source_socket.is_on and edge.destination_socket.is_on:
-                        edges_to_visit.append(edge)
-            return edges_to_visit
-
-        # Blocks to run in topological order
-        blocks_to_run: List["ExecutableBlock"] = []
         # List of lists of blocks/edges to animate in order
         to_transmit: List[List[Union["ExecutableBlock", Edge]]] = [[start_node]]
 
-        # Set to make sure to never execute the same block twice
+        # Set to make sure to never animate the same block twice
         visited: Set["ExecutableBlock"] = set([])
 
         blocks_to_visit: List["ExecutableBlock"] = [start_node]
         while blocks_to_visit:
-            # Remove duplicates
-            blocks_to_visit = list(set(blocks_to_visit))
-
-            # Remove duplicates
+            # Remove duplicates and visited blocks
             to_visit_set = set(blocks_to_visit)
             to_visit_set.difference_update(visited)
-            blocks_to_visit = list(to_visit_set)
-
-            # Update the visited block set
             visited.update(to_visit_set)
 
             # Gather connected edges
             edges_to_visit: List[Edge] = []
-            for block in blocks_to_visit:
-                blocks_to_run.append(block)
-                if not reverse:
-                    next_sockets = block.sockets_in
-                else:
-                    next_sockets = block.sockets_out
-                edges_to_visit += gather_edges_to_visit(next_sockets)
+            for block in to_visit_set:
+                edges_to_visit += next_edges(block)
             to_transmit.append(edges_to_visit)
 
             # Gather connected blocks
-            blocks_to_visit = []
-            for edge in edges_to_visit:
-                if not reverse:
-                    next_blocks = edge.source_socket.block
-                else:
-                    next_blocks = edge.destination_socket.block
-                blocks_to_visit.append(next_blocks)
+            blocks_to_visit = [getattr(edge, next_end).block for edge in edges_to_visit]
             to_transmit.append(blocks_to_visit)
 
-        # Remove start node
-        blocks_to_run.pop(0)
-
         return blocks_to_run, to_transmit
 
     def right_traversal(self):
@@ -219,14 +238,14 @@ class ExecutableBlock(Block, Executable):
         """
 
         def gather_next_blocks_and_edges(
-            sockets: List[Socket],
+            edges: List[Edge],
             visited: Set[Union[Block, Edge]] = None,
             to_visit: Set[Block] = None,
         ):
-            """Gather next blocks and edges to run given a list of sockets.
+            """Gather next blocks and edges to run given a list of active edges.
 
             Args:
-                sockets (List[Socket]): List of sockets to search next blocks and edges on.
+                edges (List[Edge]): List of edges to search next blocks and edges on.
                 visited (Set[Union[Block, Edge]], optional): Already visited blocks and edges.
                     Defaults to None.
                 to_visit (Set[Block], optional): List of next blocks to visit. Defaults to None.
@@ -240,29 +259,25 @@ class ExecutableBlock(Block, Executable):
             next_blocks = []
             next_edges = []
 
-            for socket in sockets:
-                for edge in socket.edges:
-                    if not (
-                        edge not in visited
-                        and edge.source_socket.is_on
-                        and edge.destination_socket.is_on
-                    ):
-                        continue
+            for edge in edges:
+                if edge in visited:
+                    continue
 
-                    next_edges.append(edge)
-                    visited.add(edge)
+                next_edges.append(edge)
+                visited.add(edge)
 
-                    next_block = edge.destination_socket.block
-                    to_visit.add(next_block)
-                    visited.add(next_block)
+                next_block = edge.destination_socket.block
+                to_visit.add(next_block)
+                visited.add(next_block)
 
-                    if next_block not in visited:
-                        next_blocks.append(next_block)
+                if next_block not in visited:
+                    next_blocks.append(next_block)
 
             return next_blocks, next_edges
 
         # Result
         to_transmit: List[List[Union["ExecutableBlock", Edge]]] = [[self]]
+        graph = self.scene().graph
 
         # To check if a block has been visited
         visited: Set["ExecutableBlock"] = set([])
@@ -279,7 +294,7 @@ class ExecutableBlock(Block, Executable):
             for block in to_visit_input.copy():
                 # Check input edges and blocks
                 new_blocks, new_edges = gather_next_blocks_and_edges(
-                    block.sockets_in, visited, to_visit_input
+                    graph.input_edges(block), visited, to_visit_input
                 )
                 next_blocks += new_blocks
                 next_edges += new_edges
@@ -287,7 +302,7 @@ class ExecutableBlock(Block, Executable):
             for block in to_visit_output.copy():
                 # Check output edges and blocks
                 new_blocks, new_edges = gather_next_blocks_and_edges(
-                    block.sockets_out, visited, to_visit_output
+                    graph.output_edges(block), visited, to_visit_output
                 )
                 next_blocks += new_blocks
                 next_edges += new_edges
@@ -305,13 +320,25 @@ class ExecutableBlock(Block, Executable):
 
     def run_blocks(self):
         """Run a list of blocks."""
-        for block in self.blocks_to_run[::-1] + [self]:
-            if block.run_state not in {
+        graph = self.scene().graph
+        blocks = [
+            block
+            for block in graph.sort(set(self.blocks_to_run) | {self})
+            if block.run_state
+            not in {
                 ExecutableState.PENDING,
                 ExecutableState.RUNNING,
                 ExecutableState.DONE,
-            }:
-                block.run_code()
+            }
+        ]
+        kernel = self.scene().kernel
+        if kernel.has_checkpoints:
+            blocks = kernel.checkpoints.restore(kernel, blocks, target=self)
+        scheduler = self.scene().branch_scheduler
+        if scheduler.enabled and scheduler.run(blocks):
+            return
+        for block in blocks:
+            block.run_code()
 
     def run_left(self):
         """Run all of the block's dependencies and then run the block."""
@@ -346,17 +373,14 @@ class ExecutableBlock(Block, Executable):
         # Create transmitting queue
         self.transmitting_queue = self.right_traversal()
 
-        # Gather outputs
-        blocks_to_run, _ = self.custom_bfs(self, reverse=True)
-        self.blocks_to_run = [self] + blocks_to_run
+        # Gather outputs, they have to be run again
+        graph = self.scene().graph
+        outputs = graph.descendants(self)
+        for block in outputs:
+            block.run_state = ExecutableState.IDLE
 
-        # For each output found
-        for block in self.blocks_to_run.copy()[::-1]:
-            # Gather dependencies
-            if block is not self:
-                block.run_state = ExecutableState.IDLE
-            new_blocks_to_run, _ = self.custom_bfs(block)
-            self.blocks_to_run += new_blocks_to_run
+        # Gather the dependencies of the outputs
+        self.blocks_to_run = graph.sort(graph.upstream(outputs | {self}))
 
         # Set delay so that the transmitting animation has fixed total duration
         self.transmitting_delay = int(
@@ -366,9 +390,15 @@ class ExecutableBlock(Block, Executable):
         self.transmitting_animation_in()
 
     def error_occured(self):
-        """Interrupt the kernel if an error occured"""
+        """Cancel the blocks queued after this one if an error occured"""
         self.run_state = ExecutableState.CRASHED
-        self._interrupt_execution()
+        if self.kernel.pipelined:
+            # The kernel aborts the executions it already received by itself
+            self.blocks_to_run = []
+        else:
+            # The failed execution is the only one sent to the kernel,
+            # interrupting the kernel could only interrupt its reply
+            self._cancel_queue()
 
     @property
     @abstractmethod
@@ -387,6 +417,33 @@ class ExecutableBlock(Block, Executable):
     def handle_image(self, image: str):
         """Handle the image signal."""
 
+    def handle_display(self, output: Dict):
+        """Handle the display signal, showing a rich output.
+
+        Args:
+            output: Output in the format of the outputs of jupyter notebooks.
+
+        """
+        image = output.get("data", {}).get("image/png")
+        if image is not None:
+            self.handle_image(image)
+
+    def update_display(self, output: Dict):
+        """Replace the content of a display shown by the block.
+
+        Args:
+            output: Update of the display, as a notebook output.
+
+        """
+
+    def handle_clear(self, wait: bool):
+        """Handle the clear signal, removing the outputs of the block.
+
+        Args:
+            wait: If True, the outputs are only removed once the next output arrives.
+
+        """
+
     def serialize(self):
         """Return a serialized version of this block."""
         return super().serialize()
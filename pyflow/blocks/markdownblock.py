@@ -13,13 +13,19 @@ from markdown import markdown
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.Qsci import QsciLexerMarkdown, QsciScintilla
 from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtWidgets import QWidget
 from pyflow.blocks.block import Block
 from pyflow.blocks.mdeditor import MarkdownEditor
 from pyflow.graphics.theme_manager import theme_manager
 
 
 class MarkdownBlock(Block):
-    """A block that is able to render markdown text."""
+    """A block that is able to render markdown text.
+
+    The web view rendering the markdown is only created once the block
+    is materialized, see Block.materialize.
+
+    """
 
     def __init__(self, **kwargs):
         """
@@ -46,17 +52,26 @@ class MarkdownBlock(Block):
 
         self.splitter.addWidget(self.editor)
 
-        self.rendered_markdown = QWebEngineView()
+        self.rendered_markdown: QWebEngineView = None
         self.output_panel_background_color = "#1E1E1E"
-        self.rendered_markdown.page().setBackgroundColor(
-            QColor(self.output_panel_background_color)
-        )
 
-        self.splitter.addWidget(self.rendered_markdown)
+        # Takes the place of the rendered markdown until it is created
+        self.splitter.addWidget(QWidget())
         self.holder.setWidget(self.root)
 
         self.setAcceptHoverEvents(True)
 
+    def materialize(self):
+        """Show the widgets of the block, creating the rendered markdown if needed."""
+        super().materialize()
+        if self.rendered_markdown is None:
+            self.rendered_markdown = QWebEngineView()
+            self.rendered_markdown.page().setBackgroundColor(
+                QColor(self.output_panel_background_color)
+            )
+            self.splitter.replaceWidget(1, self.rendered_markdown).deleteLater()
+            self.render_markdown()
+
     def move_splitter_up(self):
         """Move the splitter to the top of the block.
 
@@ -102,6 +117,13 @@ class MarkdownBlock(Block):
 
     def valueChanged(self):
         """Update markdown rendering when the content of the markdown editor changes."""
+        self.mark_dirty()
+        self.render_markdown()
+
+    def render_markdown(self):
+        """Render the content of the markdown editor, if the block is materialized."""
+        if self.rendered_markdown is None:
+            return
         t = self.editor.text()
 
         dark_theme = f'''
@@ -115,6 +137,10 @@ class MarkdownBlock(Block):
 
         self.rendered_markdown.setHtml(f"{dark_theme}{markdown(t)}")
 
+    def placeholder_text(self, data: OrderedDict) -> str:
+        """Markdown source shown by the placeholder of the block."""
+        return data.get("text", "")
+
     @property
     def text(self) -> str:
         """The content of the markdown block."""
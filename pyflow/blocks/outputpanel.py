@@ -0,0 +1,331 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the output panel of the CodeBlocks.
+
+The document of the panel is a sequence of segments, one per output:
+printed text, one text block per line, or a rich output.
+It always ends with a text block holding the last printed line,
+which is replaced by the next printed text.
+
+Images are only decoded when they are painted. The document keeps every image
+it painted, so it is rebuilt once enough images were removed or replaced,
+for example by a display updated in a loop.
+
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from ansi2html import Ansi2HTMLConverter
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QTextCursor, QTextDocument
+from PyQt5.QtWidgets import QTextEdit
+
+from pyflow.core.image_cache import IMAGE_MIME_TYPES, image_cache
+from pyflow.core.outputs import RICH_MIME_TYPES, stream_output
+
+if TYPE_CHECKING:
+    from pyflow.blocks.codeblock import CodeBlock
+    from pyflow.core.outputs import OutputBuffer
+
+ansi2html_line_converter = Ansi2HTMLConverter(inline=True)
+
+IMAGE_SCHEME = "pyflow-image"
+
+
+class OutputSegment:
+
+    """Part of the output panel showing a single output."""
+
+    def __init__(self, bundle: Dict = None, display_id: str = None):
+        """Part of the output panel showing a single output.
+
+        Args:
+            bundle: Rich output shown by the segment, None for printed text.
+            display_id: Id of the display shown by the segment, if it can be updated.
+
+        """
+        self.bundle = bundle
+        self.display_id = display_id
+        # Number of text blocks of the document used by the segment
+        self.blocks = 0
+        # Key of the image shown by the segment, if any
+        self.image_key: Optional[str] = None
+
+    @property
+    def is_text(self) -> bool:
+        """True if the segment shows printed text, one text block per line."""
+        return self.bundle is None
+
+
+class OutputPanel(QTextEdit):
+
+    """Read-only panel showing the outputs of a CodeBlock."""
+
+    def __init__(self, block: "CodeBlock", max_displays: int = 100):
+        """Read-only panel showing the outputs of a CodeBlock.
+
+        Args:
+            block: Block the panel shows the outputs of.
+            max_displays: Maximum number of rich outputs shown, the oldest are removed.
+
+        """
+        super().__init__()
+        self.block = block
+        self.max_displays = max_displays
+        self.setReadOnly(True)
+        self.segments: List[OutputSegment] = []
+        # Encoded images shown in the panel, decoded only when they are painted
+        self.images: Dict[str, Tuple[str, str]] = {}
+        # Number of images the document kept since it was last rebuilt
+        self.released_images = 0
+
+    @property
+    def has_displays(self) -> bool:
+        """True if the panel shows rich outputs."""
+        return any(not segment.is_text for segment in self.segments)
+
+    def clear(self):
+        """Remove every output."""
+        super().clear()
+        self.segments = []
+        self.images = {}
+        self.released_images = 0
+
+    def append_lines(self, lines: List[str], spilled: int, last_line: str):
+        """Append printed text, converting only the new lines.
+
+        Args:
+            lines: New complete lines.
+            spilled: Number of the oldest printed lines to remove.
+            last_line: Last printed line, replacing the previous one.
+
+        """
+        self.remove_lines(spilled)
+        if not self.segments or not self.segments[-1].is_text:
+            self.segments.append(OutputSegment())
+        cursor = self._tail_cursor()
+        for line in lines:
+            cursor.insertHtml(self.line_to_html(line))
+            cursor.insertBlock()
+        self.segments[-1].blocks += len(lines)
+        if last_line:
+            cursor.insertHtml(self.line_to_html(last_line))
+
+    def end_line(self, spilled: int):
+        """Complete the last printed line, so that it is not replaced anymore.
+
+        Args:
+            spilled: Number of the oldest printed lines to remove.
+
+        """
+        cursor = self._tail_cursor(select=False)
+        if not cursor.atBlockStart():
+            cursor.insertBlock()
+            self.segments[-1].blocks += 1
+        self.remove_lines(spilled)
+
+    def add_display(self, bundle: Dict):
+        """Append a rich output."""
+        bundle = dict(bundle)
+        display_id = bundle.pop("transient", {}).get("display_id")
+        segment = OutputSegment(bundle, display_id)
+        self._tail_cursor()
+        segment.blocks = self._insert_html(
+            self.document().blockCount() - 1, self._render(segment)
+        )
+        self.segments.append(segment)
+
+        displays = [segment for segment in self.segments if not segment.is_text]
+        if len(displays) > self.max_displays:
+            self.remove_segment(displays[0])
+
+    def update_display(self, update: Dict):
+        """Replace the content of the displays with the id of an update, in place."""
+        display_id = update.get("transient", {}).get("display_id")
+        for segment in self.segments:
+            if segment.is_text or segment.display_id != display_id:
+                continue
+            segment.bundle = {
+                "output_type": segment.bundle["output_type"],
+                "data": dict(update.get("data", {})),
+                "metadata": dict(update.get("metadata", {})),
+            }
+            self._release_image(segment)
+            first_block = self._first_block(segment)
+            blocks = self._insert_html(first_block, self._render(segment))
+            self._remove_blocks(first_block + blocks, segment.blocks)
+            segment.blocks = blocks
+        self._rebuild_if_needed()
+
+    def remove_lines(self, count: int):
+        """Remove the oldest printed lines."""
+        for segment in list(self.segments):
+            if count <= 0:
+                break
+            if not segment.is_text:
+                continue
+            removed = min(count, segment.blocks)
+            self._remove_blocks(self._first_block(segment), removed)
+            segment.blocks -= removed
+            count -= removed
+            if segment.blocks == 0 and segment is not self.segments[-1]:
+                self.segments.remove(segment)
+
+    def remove_segment(self, segment: OutputSegment):
+        """Remove an output from the panel."""
+        self._remove_blocks(self._first_block(segment), segment.blocks)
+        self.segments.remove(segment)
+        self._release_image(segment)
+        self._rebuild_if_needed()
+
+    def rebuild(self):
+        """Rebuild the document from the segments, forgetting the images it kept."""
+        buffer = self.block.output_buffer
+        segments = self.segments
+        super().clear()
+        self.segments = []
+        self.released_images = 0
+        lines = iter(buffer.lines)
+        for segment in segments:
+            if segment.is_text:
+                self.segments.append(OutputSegment())
+                cursor = self._tail_cursor()
+                for _ in range(segment.blocks):
+                    cursor.insertHtml(self.line_to_html(next(lines)))
+                    cursor.insertBlock()
+                self.segments[-1].blocks = segment.blocks
+            else:
+                segment.blocks = self._insert_html(
+                    self.document().blockCount() - 1, self._render(segment)
+                )
+                self.segments.append(segment)
+        if buffer.last_line:
+            self._tail_cursor().insertHtml(self.line_to_html(buffer.last_line))
+
+    def _render(self, segment: OutputSegment) -> str:
+        """Html of a rich output, registering the image it shows if any."""
+        segment.image_key = None
+        for mime_type in RICH_MIME_TYPES:
+            content = segment.bundle.get("data", {}).get(mime_type)
+            if content is not None and mime_type in IMAGE_MIME_TYPES:
+                content = self.join_lines(content)
+                segment.image_key = image_cache().key(content)
+                self.images[segment.image_key] = (content, mime_type)
+                break
+        return self.bundle_to_html(segment.bundle, segment.image_key)
+
+    def _release_image(self, segment: OutputSegment):
+        """Forget the image of a segment if no other segment shows it."""
+        key = segment.image_key
+        if key is None or any(
+            other is not segment and other.image_key == key for other in self.segments
+        ):
+            return
+        self.images.pop(key, None)
+        self.released_images += 1
+
+    def _rebuild_if_needed(self):
+        """Rebuild the document once it kept more removed images than shown ones."""
+        if self.released_images > max(16, len(self.images)):
+            self.rebuild()
+
+    def outputs(self, buffer: "OutputBuffer") -> List[Dict]:
+        """Notebook outputs shown in the panel.
+
+        Args:
+            buffer: Buffer holding the printed text shown in the panel.
+
+        """
+        outputs = []
+        lines = iter(buffer.lines)
+        for segment in self.segments:
+            if segment.is_text:
+                text = "".join(next(lines) + "\n" for _ in range(segment.blocks))
+                if segment is self.segments[-1]:
+                    text += buffer.last_line
+                if text:
+                    outputs.append(stream_output(text))
+            else:
+                outputs.append(segment.bundle)
+        return outputs
+
+    def _first_block(self, segment: OutputSegment) -> int:
+        """Number of the first text block of a segment."""
+        index = self.segments.index(segment)
+        return sum(other.blocks for other in self.segments[:index])
+
+    def _insert_html(self, block_number: int, html: str) -> int:
+        """Insert some html in its own text blocks, before the given text block.
+
+        Returns:
+            The number of text blocks inserted.
+
+        """
+        document = self.document()
+        cursor = QTextCursor(document)
+        cursor.setPosition(document.findBlockByNumber(block_number).position())
+        block_count = document.blockCount()
+        cursor.insertHtml(html)
+        cursor.insertBlock()
+        return document.blockCount() - block_count
+
+    def _remove_blocks(self, first: int, count: int):
+        """Remove some text blocks from the document."""
+        if count <= 0:
+            return
+        document = self.document()
+        cursor = QTextCursor(document)
+        cursor.setPosition(document.findBlockByNumber(first).position())
+        cursor.setPosition(
+            document.findBlockByNumber(first + count).position(),
+            QTextCursor.KeepAnchor,
+        )
+        cursor.removeSelectedText()
+
+    def _tail_cursor(self, select: bool = True) -> QTextCursor:
+        """Cursor at the end of the document, selecting the last printed line."""
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        if select:
+            cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        return cursor
+
+    @staticmethod
+    def line_to_html(line: str) -> str:
+        """Format a printed line so that it can be appended to the panel."""
+        line = line.replace("\x08", "").replace("\r", "")
+        html = ansi2html_line_converter.convert(line, full=False)
+        return f'<span style="color: #AAAAAA; white-space: pre-wrap;">{html}</span>'
+
+    def bundle_to_html(self, bundle: Dict, image_key: str = None) -> str:
+        """Html showing the richest representation of an output the panel supports.
+
+        Args:
+            bundle: Output to show.
+            image_key: Key of the image of the output, if it shows an image.
+
+        """
+        if image_key is not None:
+            return f'<img src="{IMAGE_SCHEME}:{image_key}">'
+        data = bundle.get("data", {})
+        if "text/html" in data:
+            return self.join_lines(data["text/html"])
+        return self.line_to_html(self.join_lines(data.get("text/plain", "")))
+
+    @staticmethod
+    def join_lines(content: Union[str, List[str]]) -> str:
+        """Content of a MIME bundle, which notebooks may split into lines."""
+        return "".join(content) if isinstance(content, list) else content
+
+    def loadResource(self, resource_type: int, name: QUrl) -> Any:
+        """Decode the images of the panel when they are first painted."""
+        if (
+            resource_type == QTextDocument.ImageResource
+            and name.scheme() == IMAGE_SCHEME
+            and name.path() in self.images
+        ):
+            content, mime_type = self.images[name.path()]
+            return image_cache().get(content, mime_type, key=name.path())
+        return super().loadResource(resource_type, name)
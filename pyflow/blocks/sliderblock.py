@@ -44,11 +44,13 @@ class SliderBlock(ExecutableBlock):
         self.layout.addLayout(self.variable_layout)
 
         self.slider.valueChanged.connect(self.valueChanged)
+        self.variable_text.textChanged.connect(self.mark_dirty)
 
         self.holder.setWidget(self.root)
 
     def valueChanged(self):
         """This is called when the value of the slider changes."""
+        self.mark_dirty()
         self.variable_value.setText(f"{self.value}")
         # Make sure that the slider is initialized before trying to run it.
         if self.scene() is not None:
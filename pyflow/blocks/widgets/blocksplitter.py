@@ -7,7 +7,7 @@ The Splitter contains multiple areas inside a block
 and allows the user to resize those areas.
 """
 
-from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtGui import QMouseEvent, QResizeEvent
 from PyQt5.QtWidgets import QSplitter, QSplitterHandle, QWidget
 
 
@@ -30,6 +30,11 @@ class Splitter(QSplitter):
         super().__init__(orientation, parent)
         self.block = block
 
+    def resizeEvent(self, event: QResizeEvent):
+        """Mark the block as changed, the sizes of its areas change with it."""
+        self.block.mark_dirty()
+        super().resizeEvent(event)
+
     def createHandle(self):
         """Return the middle handle of the splitter."""
         return SplitterHandle(self.orientation(), self)
@@ -54,20 +54,23 @@ class AddButton(QGraphicsItem):
             self._brush = self._block_hover_brush
         else:
             self._brush = self._normal_brush
+        self.update()
 
     def hoverEnterEvent(self, event: "QGraphicsSceneHoverEvent") -> None:
         """Handle the event when the mouse enters the button."""
         self._brush = self._hover_brush
+        self.update()
         return super().hoverEnterEvent(event)
 
     def hoverLeaveEvent(self, event: "QGraphicsSceneHoverEvent") -> None:
         """Handle the event when the mouse leaves the button."""
         self._brush = self._normal_brush
+        self.update()
         return super().hoverLeaveEvent(event)
 
     def boundingRect(self) -> QRectF:
-        """Get the button bounding box."""
-        r = self.radius
+        """Get the button bounding box, including its outline."""
+        r = self.radius + self._pen.widthF() / 2
         return QRectF(-r, -r, 2 * r, 2 * r)
 
 
@@ -0,0 +1,179 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the CheckpointStore.
+
+A block is checkpointed when its metadata has a "checkpoint" entry,
+the list of the variables to save, or an empty list to save every variable.
+Once such a block has run, the kernel dumps the variables into a memory-mapped
+file named after the content-addressed key of the block (see ExecutionCache.key).
+
+When blocks must be run again, for example after a kernel restart,
+the nearest checkpoints are loaded instead of running the blocks they cover.
+
+"""
+
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from pyflow.core.execution_cache import ExecutionCache
+from pyflow.core.executable import ExecutableState
+from pyflow.core.kernel_listener import Execution
+from pyflow.core.namespace import dump_directory, load_code, parse_report
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.blocks.executableblock import ExecutableBlock
+    from pyflow.core.kernel import Kernel
+
+LOGGER = get_logger(__name__)
+
+
+def checkpoint_names(block: "ExecutableBlock") -> Optional[List[str]]:
+    """Variables to checkpoint after the given block, None if it is not checkpointed."""
+    return getattr(block, "metadata", {}).get("checkpoint")
+
+
+class Checkpoint:
+
+    """Variables saved after a block was run."""
+
+    def __init__(self, path: str, names: List[str], size: int):
+        """Variables saved after a block was run.
+
+        Args:
+            path: Memory-mapped file holding the variables.
+            names: Names of the saved variables.
+            size: Size of the file in bytes.
+
+        """
+        self.path = path
+        self.names = names
+        self.size = size
+
+
+class CheckpointStore:
+
+    """Checkpoints of the kernel namespace, keyed by the blocks they were taken after."""
+
+    def __init__(self, directory: str = None):
+        """Checkpoints of the kernel namespace, keyed by the blocks they were taken after.
+
+        Args:
+            directory: Directory to store the checkpoints in, a temporary one if None.
+
+        """
+        self.checkpoints: Dict[str, Checkpoint] = {}
+        self._remove_directory = None
+        if directory is None:
+            directory, self._remove_directory = dump_directory(self)
+        self.directory = directory
+        # Keep restore executions alive until they are finished
+        self.restores: List[Execution] = []
+
+    def path(self, key: str) -> str:
+        """Path of the file holding the checkpoint of the given key."""
+        return os.path.join(self.directory, f"{key}.mmap")
+
+    def add(self, key: str, dump: Execution):
+        """Record a checkpoint once the kernel dumped it at `path(key)`.
+
+        Args:
+            key: Key of the checkpointed block.
+            dump: Execution that dumped the variables.
+
+        """
+        report = parse_report(dump)
+        checkpoint = Checkpoint(
+            self.path(key), report.get("names", []), report.get("bytes", 0)
+        )
+        self.checkpoints[key] = checkpoint
+        LOGGER.info(
+            "Checkpointed %d variables (%d bytes)",
+            len(checkpoint.names),
+            checkpoint.size,
+        )
+
+    def discard(self, key: str):
+        """Remove the checkpoint of the given key if there is one."""
+        checkpoint = self.checkpoints.pop(key, None)
+        if checkpoint is not None and os.path.exists(checkpoint.path):
+            os.remove(checkpoint.path)
+
+    def close(self):
+        """Remove every checkpoint, and the directory if it is a temporary one."""
+        for key in list(self.checkpoints):
+            self.discard(key)
+        if self._remove_directory is not None:
+            self._remove_directory()
+
+    def restore(
+        self,
+        kernel: "Kernel",
+        blocks: List["ExecutableBlock"],
+        target: "ExecutableBlock" = None,
+    ) -> List["ExecutableBlock"]:
+        """Load the nearest checkpoints of some blocks instead of running them.
+
+        Blocks covered by a checkpoint, the checkpointed block and its ancestors,
+        are marked as done while the checkpoint is loaded into the kernel.
+
+        Args:
+            kernel: Kernel to load the checkpoints into.
+            blocks: Blocks to run, in topological order.
+            target: Block that must be run even if it is checkpointed.
+
+        Returns:
+            The blocks that still have to be run, in the same order.
+
+        """
+        keys: Dict["ExecutableBlock", str] = {}
+        to_run = set(blocks)
+        covered: Set["ExecutableBlock"] = set()
+        for block in reversed(blocks):
+            if block is target or block in covered or not self.checkpoints:
+                continue
+            checkpoint = self.checkpoints.get(ExecutionCache.key(block, keys))
+            if checkpoint is None or not os.path.exists(checkpoint.path):
+                continue
+
+            restored = self._ancestors(block, to_run)
+            covered.update(restored)
+            for other in restored:
+                other.run_state = ExecutableState.DONE
+            LOGGER.info(
+                "Restoring %s from a checkpoint instead of running %d blocks",
+                block.title,
+                len(restored),
+            )
+            load = Execution(load_code(checkpoint.path), silent=True)
+            load.signals.finished.connect(
+                lambda load=load, restored=restored: self._restored(load, restored)
+            )
+            self.restores.append(load)
+            kernel.submit(load)
+        return [block for block in blocks if block not in covered]
+
+    @staticmethod
+    def _ancestors(
+        block: "ExecutableBlock", to_run: Set["ExecutableBlock"]
+    ) -> List["ExecutableBlock"]:
+        """The given block and its ancestors among the blocks to run."""
+        ancestors = [block]
+        to_visit = [block]
+        while to_visit:
+            for other in to_visit.pop().input_blocks():
+                if other in to_run and other not in ancestors:
+                    ancestors.append(other)
+                    to_visit.append(other)
+        return ancestors
+
+    def _restored(self, load: Execution, restored: List["ExecutableBlock"]):
+        """Reset the blocks covered by a checkpoint that could not be loaded."""
+        self.restores.remove(load)
+        if load.status != "ok":
+            LOGGER.error(
+                "Could not restore a checkpoint, its blocks must be run again."
+            )
+            for block in restored:
+                block.run_state = ExecutableState.IDLE
@@ -5,11 +5,12 @@
 
 from __future__ import annotations
 
-from typing import Optional, OrderedDict
+from typing import Any, Optional, OrderedDict
 
 from PyQt5.QtCore import QPointF, Qt
 from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
 from PyQt5.QtWidgets import (
+    QGraphicsItem,
     QGraphicsPathItem,
     QStyleOptionGraphicsItem,
     QWidget,
@@ -26,6 +27,7 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
 
     DEFAULT_DATA = {"path_type": "bezier"}
     MANDATORY_FIELDS = {"source", "destination"}
+    TRACKS_CHANGES = True
 
     def __init__(
         self,
@@ -80,10 +82,15 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
             ExecutableState.PENDING: self._pen_pending,
         }
 
+        # The item pen is not used to paint but sets the width of the bounding rect
+        self.setPen(self._pen)
+
         self.setFlag(QGraphicsPathItem.GraphicsItemFlag.ItemIsSelectable)
         self.setZValue(-1)
 
         self.path_type = path_type
+        # Ends and type of the current path, to only rebuild it when they change
+        self._path_key = None
 
         self.source_socket = source_socket
         self.destination_socket = destination_socket
@@ -117,14 +124,19 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
             self.remove_from_sockets()
             scene.removeItem(self)
 
+    def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: Any) -> Any:
+        """Update the path when the edge enters a scene, its sockets may have moved."""
+        if change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            self.update_path()
+        return super().itemChange(change, value)
+
     def paint(
         self,
         painter: QPainter,
         option: QStyleOptionGraphicsItem,  # pylint:disable=unused-argument
         widget: Optional[QWidget] = None,  # pylint:disable=unused-argument
     ):
-        """Paint the edge."""
-        self.update_path()
+        """Paint the edge along its cached path."""
         if self.isSelected():
             pen = self._pen_selected
         elif self.destination_socket is None:
@@ -133,20 +145,36 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
             pen = self.state_pens[self.run_state]
         painter.setPen(pen)
         painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawPath(self.path())
+        scene = self.scene()
+        if scene is not None and scene.low_detail:
+            # Zoomed out, a straight line is enough
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+            painter.drawLine(self.source, self.destination)
+        else:
+            painter.drawPath(self.path())
 
     def update_path(self):
-        """Update the edge path depending on the path_type."""
-        path = QPainterPath(self.source)
+        """Update the edge path depending on the path_type.
+
+        The path is only rebuilt when its ends or its type changed. It is called when
+        the edge sockets change or move, so painting the edge can use the cached path.
+
+        """
+        source, destination = self.source, self.destination
+        sx, sy = source.x(), source.y()
+        dx, dy = destination.x(), destination.y()
+        path_key = (self.path_type, sx, sy, dx, dy)
+        if path_key == self._path_key:
+            return
+        path = QPainterPath(source)
         if self.path_type == "direct":
-            path.lineTo(self.destination)
+            path.lineTo(destination)
         elif self.path_type == "bezier":
-            sx, sy = self.source.x(), self.source.y()
-            dx, dy = self.destination.x(), self.destination.y()
             mid_dist = (dy - sy) / 2
             path.cubicTo(sx, sy + mid_dist, dx, dy - mid_dist, dx, dy)
         else:
             raise NotImplementedError(f"Unknowed path type: {self.path_type}")
+        self._path_key = path_key
         self.setPath(path)
 
     @property
@@ -172,9 +200,14 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
     @source_socket.setter
     def source_socket(self, value: Socket):
         self._source_socket = value
+        self.mark_dirty()
+        self.update()
         if value is not None:
             self.source_socket.add_edge(self, is_destination=False)
             self.source = value.scenePos()
+        scene = self.scene()
+        if scene is not None and not scene.graph.update_edge(self):
+            self.remove()
 
     @property
     def destination(self) -> QPointF:
@@ -199,9 +232,14 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
     @destination_socket.setter
     def destination_socket(self, value: Socket):
         self._destination_socket = value
+        self.mark_dirty()
+        self.update()
         if value is not None:
             self.destination_socket.add_edge(self, is_destination=True)
             self.destination = value.scenePos()
+        scene = self.scene()
+        if scene is not None and not scene.graph.update_edge(self):
+            self.remove()
 
     def serialize(self) -> OrderedDict:
         return OrderedDict(
@@ -254,6 +292,7 @@ class Edge(QGraphicsPathItem, Serializable, Executable):
         self.complete_with_default(data)
 
         self.path_type = data["path_type"]
+        self.mark_dirty()
         try:
             self.source_socket = hashmap[data["source"]["socket"]]
 
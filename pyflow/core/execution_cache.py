@@ -0,0 +1,174 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the ExecutionCache.
+
+This module provides `execution_cache()`,
+a method that returns a handle to the execution cache of the application.
+
+The execution cache is content-addressed: the key of a block is a hash of its source
+and of the keys of the blocks connected to its inputs. An entry holds the outputs
+of the block and a file with the variables the block assigned in the kernel,
+so that a cache hit can restore both without running the block again.
+
+"""
+
+import atexit
+import functools
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from pyflow.core.namespace import dump_directory
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.blocks.executableblock import ExecutableBlock
+
+LOGGER = get_logger(__name__)
+
+
+class CacheEntry:
+
+    """Outputs and namespace delta of a cached execution."""
+
+    def __init__(self, path: str, outputs: List[Tuple[Any, str]], size: int):
+        """Outputs and namespace delta of a cached execution.
+
+        Args:
+            path: File holding the variables assigned by the execution.
+            outputs: Outputs of the execution, as (output, output_type).
+            size: Size of the entry in bytes.
+
+        """
+        self.path = path
+        self.outputs = outputs
+        self.size = size
+
+
+class ExecutionCache:
+
+    """Size-bounded LRU cache of block executions."""
+
+    def __init__(self, max_bytes: int = 512 * 2**20, directory: str = None):
+        """Size-bounded LRU cache of block executions.
+
+        Args:
+            max_bytes: Maximum total size of the cached outputs and variables.
+            directory: Directory to store the variables in, a temporary one if None.
+
+        """
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._remove_directory = None
+        if directory is None:
+            directory, self._remove_directory = dump_directory(self)
+        self.directory = directory
+
+    @staticmethod
+    def key(block: "ExecutableBlock", keys: Dict["ExecutableBlock", str] = None) -> str:
+        """Content-addressed key of a block.
+
+        Args:
+            block: Block to compute the key of.
+            keys: Keys already computed, filled with the keys of the upstream blocks.
+
+        """
+        keys = {} if keys is None else keys
+        if block not in keys:
+            upstream = sorted(
+                ExecutionCache.key(other, keys) for other in block.input_blocks()
+            )
+            content = "\n".join([block.source] + upstream)
+            keys[block] = hashlib.sha256(content.encode()).hexdigest()
+        return keys[block]
+
+    def path(self, key: str) -> str:
+        """Path of the file holding the variables of the given key."""
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get the entry of the given key, None if it is not cached."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: str, outputs: List[Tuple[Any, str]]):
+        """Add an entry, its variables must already be written at `path(key)`.
+
+        Least recently used entries are evicted to make room for the new one.
+
+        Args:
+            key: Key of the executed block.
+            outputs: Outputs of the execution, as (output, output_type),
+                where the output is printed text or a notebook output.
+
+        """
+        path = self.path(key)
+        self.discard(key, remove_file=False)
+        # Rich outputs are MIME bundles, their size is the size of their json
+        size = os.path.getsize(path) + sum(
+            len(json.dumps(output)) for output, _ in outputs
+        )
+        if size > self.max_bytes:
+            LOGGER.debug("Not caching %s, %d bytes is too large", key[:8], size)
+            os.remove(path)
+            return
+        while self.entries and self.size + size > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+        self.entries[key] = CacheEntry(path, outputs, size)
+        self.size += size
+
+    def discard(self, key: str, remove_file: bool = True):
+        """Remove the entry of the given key, and its variables if they were written."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+        path = self.path(key)
+        if remove_file and os.path.exists(path):
+            os.remove(path)
+
+    def clear(self):
+        """Remove every entry."""
+        for key in list(self.entries):
+            self.discard(key)
+
+    def close(self):
+        """Remove every entry, and the directory of the cache if it is a temporary one.
+
+        Also done at exit if the cache is never closed.
+
+        """
+        self.clear()
+        if self._remove_directory is not None:
+            self._remove_directory()
+
+    def report(self) -> Dict[str, float]:
+        """Return statistics about the cache usage."""
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_size": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def execution_cache() -> ExecutionCache:
+    """Retreive the execution cache of the application."""
+    cache = ExecutionCache()
+    atexit.register(cache.close)
+    return cache
@@ -0,0 +1,120 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the ImageCache.
+
+This module provides `image_cache()`,
+a method that returns a handle to the image cache of the application.
+
+Images displayed by the blocks are decoded once into QPixmaps,
+shared between every block and keyed by a hash of their encoded content.
+
+"""
+
+import atexit
+import base64
+import functools
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt5.QtCore import QByteArray, Qt
+from PyQt5.QtGui import QPainter, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+
+from pyflow.logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+IMAGE_MIME_TYPES = ("image/png", "image/jpeg", "image/svg+xml")
+
+
+class ImageCache:
+
+    """Size-bounded LRU cache of decoded images."""
+
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        """Size-bounded LRU cache of decoded images.
+
+        Args:
+            max_bytes: Maximum total size of the decoded images.
+
+        """
+        self.max_bytes = max_bytes
+        self.pixmaps: "OrderedDict[str, QPixmap]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data: str) -> str:
+        """Key of an encoded image, a hash of its content."""
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def pixmap_size(pixmap: QPixmap) -> int:
+        """Size of a decoded image in bytes."""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, data: str, mime_type: str, key: str = None) -> Optional[QPixmap]:
+        """Decoded image, decoding it if it is not in the cache.
+
+        Args:
+            data: Encoded image: base64 for bitmaps, xml for svg.
+            mime_type: MIME type of the image.
+            key: Key of the image if already computed.
+
+        Returns:
+            The decoded image, None if it could not be decoded.
+
+        """
+        key = self.key(data) if key is None else key
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self.pixmaps.move_to_end(key)
+            return pixmap
+
+        self.misses += 1
+        pixmap = self.decode(data, mime_type)
+        if pixmap is None:
+            return None
+        size = self.pixmap_size(pixmap)
+        if size <= self.max_bytes:
+            self.pixmaps[key] = pixmap
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.pixmaps.popitem(last=False)
+                self.size -= self.pixmap_size(evicted)
+        return pixmap
+
+    @staticmethod
+    def decode(data: str, mime_type: str) -> Optional[QPixmap]:
+        """Decode an image, None if it could not be decoded."""
+        pixmap = QPixmap()
+        if mime_type == "image/svg+xml":
+            renderer = QSvgRenderer(QByteArray(data.encode("utf-8")))
+            if not renderer.isValid():
+                return None
+            pixmap = QPixmap(renderer.defaultSize())
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            renderer.render(painter)
+            painter.end()
+        elif not pixmap.loadFromData(base64.b64decode(data)):
+            return None
+        return pixmap
+
+    def clear(self):
+        """Forget every decoded image."""
+        self.pixmaps.clear()
+        self.size = 0
+
+
+@functools.lru_cache(maxsize=None)
+def image_cache() -> ImageCache:
+    """Retreive the image cache of the application."""
+    cache = ImageCache()
+    # Release the pixmaps explicitly rather than when the module is torn down
+    atexit.register(cache.clear)
+    return cache
@@ -3,31 +3,153 @@
 
 """ Module to create and manage ipython kernels."""
 
-import queue
-from typing import TYPE_CHECKING, List, Tuple
-from jupyter_client.manager import start_new_kernel
+from functools import partial
+from time import time
+from weakref import WeakSet
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from jupyter_client.manager import KernelManager
 from pyflow.blocks.executableblock import ExecutableState
 
-from pyflow.core.worker import Worker
+from pyflow.core.checkpoint import CheckpointStore, checkpoint_names
+from pyflow.core.execution_cache import CacheEntry, ExecutionCache
+from pyflow.core.kernel_pool import KernelPool, kernel_pool
+from pyflow.core.kernel_listener import Execution, KernelListener
+from pyflow.core.outputs import message_to_output
+from pyflow.core.namespace import (
+    code_names,
+    dump_code,
+    load_code,
+    parse_report,
+    snapshot_code,
+)
+from pyflow.core.profiler import ExecutionProfiler
 from pyflow.logging import log_init_time, get_logger
 
 if TYPE_CHECKING:
     from pyflow.blocks.executableblock import ExecutableBlock
+    from pyflow.core.profiler import BlockProfile
 
 LOGGER = get_logger(__name__)
 
 
 class Kernel:
 
-    """jupyter_client kernel used to execute code and return output."""
+    """jupyter_client kernel used to execute code and return output.
+
+    The ipython kernel is only attached, taken from the KernelPool,
+    the first time it is needed so that a graph that is never executed
+    never pays the cost of starting a kernel.
+
+    In pipelined mode, the whole execution queue is sent to the kernel at once
+    and the kernel aborts the remaining executions if one of them fails.
+    Otherwise, the next execution is only sent once the previous one is finished.
+
+    With an ExecutionCache, the variables assigned by each block are saved
+    after it runs, and a block found in the cache is not run again:
+    its variables are loaded back and its outputs are replayed.
+
+    The variables of checkpointed blocks are saved after they run,
+    so that they can be restored after the kernel is restarted.
+
+    When its ExecutionProfiler is enabled, the kernel records where the time
+    of each block execution goes, see `pyflow.core.profiler`.
+
+    """
 
     @log_init_time(LOGGER)
-    def __init__(self):
-        self.kernel_manager, self.client = start_new_kernel()
+    def __init__(self, pool: KernelPool = None, pipelined: bool = False):
+        self.pool = pool if pool is not None else kernel_pool()
+        self.listener: Optional[KernelListener] = None
+        self._startup_code: List[str] = []
+        # Every startup code ever given, to set up worker kernels the same way
+        self.setup_code: List[str] = []
+
+        self.pipelined = pipelined
         self.execution_queue: List[Tuple["ExecutableBlock", str]] = []
+        self.running: List[Execution] = []
         self.busy = False
 
-    def message_to_output(self, message: dict) -> Tuple[str, str]:
+        self.cache: Optional[ExecutionCache] = None
+        self._checkpoints: Optional[CheckpointStore] = None
+        # Executions saving the variables of a block
+        self.dumps: List[Execution] = []
+
+        # Blocks showing each display that can be updated, by display id
+        self.displays: Dict[str, "WeakSet[ExecutableBlock]"] = {}
+
+        self.profiler = ExecutionProfiler()
+        # Name of the kernel in the profiles
+        self.profile_lane = "kernel"
+        self.enqueue_times: Dict["ExecutableBlock", float] = {}
+
+    @property
+    def checkpoints(self) -> CheckpointStore:
+        """Checkpoints of the blocks run by the kernel, created on first use."""
+        if self._checkpoints is None:
+            self._checkpoints = CheckpointStore()
+        return self._checkpoints
+
+    @checkpoints.setter
+    def checkpoints(self, value: CheckpointStore):
+        self._checkpoints = value
+
+    @property
+    def has_checkpoints(self) -> bool:
+        """True if a checkpoint store has been created for the kernel."""
+        return self._checkpoints is not None
+
+    @property
+    def is_attached(self) -> bool:
+        """True if an ipython kernel has been attached."""
+        return self.listener is not None and self.listener.ready.is_set()
+
+    @property
+    def kernel_manager(self) -> KernelManager:
+        """Manager of the ipython kernel, blocks until a kernel is attached."""
+        self.attach()
+        self.listener.ready.wait()
+        return self.listener.kernel_manager
+
+    def attach(self):
+        """Start attaching a kernel from the pool in the background.
+
+        Executions submitted before the kernel is ready are sent once it is.
+        If no kernel could be attached, the next attach tries again.
+
+        """
+        if self.listener is not None and not self.listener.failed:
+            return
+        self.listener = KernelListener(self.pool)
+        for code in self._startup_code:
+            self.listener.submit(Execution(code, silent=True))
+        self._startup_code = []
+        self.listener.start()
+
+    def submit(self, execution: Execution):
+        """Send an execution to the kernel, attaching a kernel if needed."""
+        self.attach()
+        self.listener.submit(execution)
+
+    def add_startup_code(self, code: str):
+        """Run the given code as soon as the kernel is attached.
+
+        Args:
+            code: String representing a piece of Python code to execute
+
+        """
+        self.setup_code.append(code)
+        if self.listener is not None:
+            self.listener.submit(Execution(code, silent=True))
+        else:
+            self._startup_code.append(code)
+
+    def interrupt(self):
+        """Interrupt the kernel if it is attached."""
+        if self.is_attached:
+            self.listener.kernel_manager.interrupt_kernel()
+
+    @staticmethod
+    def message_to_output(message: dict) -> Tuple[str, str]:
         """
         Converts a message sent by the kernel into a relevant output
 
@@ -38,116 +160,257 @@ class Kernel:
             single output found in the message in that order of priority:
                 image > text data > text print > error > nothing
         """
-        message_type = "None"
-        if message is None:
-            return "", "text"
-        if "data" in message:
-            if "image/png" in message["data"]:
-                message_type = "image"
-                # output an image (from plt.plot or plt.imshow)
-                out = message["data"]["image/png"]
-            elif "text/html" in message["data"]:
-                message_type = "text"
-                # output some html text (like a pandas dataframe)
-                out = message["data"]["text/html"]
-            else:
-                message_type = "text"
-                # output data as str (for example if code="a=10\na")
-                out = message["data"]["text/plain"]
-        elif "name" in message and message["name"] == "stdout":
-            message_type = "text"
-            # output a print (print("Hello World"))
-            out = message["text"]
-        elif "traceback" in message:
-            message_type = "error"
-            # output an error
-            out = "\n".join(message["traceback"])
-        else:
-            message_type = "text"
-            out = ""
-        return out, message_type
+        return message_to_output(message)
+
+    def enqueue(self, block: "ExecutableBlock", code: str):
+        """Add code to the execution queue and run the queue if possible.
+
+        Args:
+            block: CodeBlock to send the output to
+            code: String representing a piece of Python code to execute
+        """
+        self.execution_queue.append((block, code))
+        self.enqueue_times[block] = time()
+        self.run_queue()
 
     def run_block(self, block: "ExecutableBlock", code: str):
         """
-        Runs code on a separate thread and sends the output to the block
+        Sends code to the kernel and routes the outputs to the block
         Also calls run_queue when finished
 
         Args:
             block: CodeBlock to send the output to
             code: String representing a piece of Python code to execute
         """
-        block.run_state = ExecutableState.RUNNING
-        worker = Worker(self, block, code)
-        worker.signals.stdout.connect(block.handle_stdout)
-        worker.signals.image.connect(block.handle_image)
-        worker.signals.finished.connect(self.run_queue)
-        worker.signals.finished.connect(block.execution_finished)
-        worker.signals.error.connect(block.error_occured)
-        block.scene().threadpool.start(worker)
+        enqueue_time = self.enqueue_times.pop(block, time())
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(block)
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.restore_block(block, code, entry)
+                return
+            # The variables the block uses are fingerprinted to see in place changes
+            self.submit(Execution(snapshot_code(code_names(code) or ()), silent=True))
 
-    def run_queue(self):
-        """Runs the next code in the queue."""
-        self.busy = True
-        if not self.execution_queue:
-            self.busy = False
-            return None
-        block, code = self.execution_queue.pop(0)
-        self.run_block(block, code)
+        execution = Execution(code)
+        profile = self.profiler.profile(
+            block, execution, enqueue_time, self.profile_lane
+        )
+        execution.signals.started.connect(
+            lambda: setattr(block, "run_state", ExecutableState.RUNNING)
+        )
+        handle_stdout = block.handle_stdout
+        handle_display = partial(self.route_display, block)
+        if profile is not None:
+            handle_stdout = profile.deliver(handle_stdout)
+            handle_display = profile.deliver(handle_display)
+        execution.signals.stdout.connect(handle_stdout)
+        execution.signals.display.connect(handle_display)
+        execution.signals.clear.connect(block.handle_clear)
+        execution.signals.error.connect(block.error_occured)
+        execution.signals.finished.connect(
+            lambda: self.execution_finished(block, execution, profile)
+        )
+        self.running.append(execution)
+        self.submit(execution)
 
-    def execute(self, code: str) -> str:
+        if key is not None:
+            self.submit_dump(
+                dump_code(self.cache.path(key), since_snapshot=True),
+                execution,
+                lambda dump: self.cache_dumped(key, execution, dump),
+            )
+        names = checkpoint_names(block)
+        if names is not None:
+            key = ExecutionCache.key(block) if key is None else key
+            self.submit_dump(
+                dump_code(self.checkpoints.path(key), names or None),
+                execution,
+                lambda dump: self.checkpoints.add(key, dump),
+            )
+
+    def route_display(self, block: "ExecutableBlock", output: Dict):
+        """Show a rich output in a block, or update a display wherever it is shown.
+
+        Args:
+            block: Block whose execution sent the output
+            output: Display or update of a display, as a notebook output
         """
-        Executes code in the kernel and returns the output of the last message sent by the kernel
+        display_id = output.get("transient", {}).get("display_id")
+        if output["output_type"] == "update_display_data":
+            for other in list(self.displays.get(display_id, ())):
+                other.update_display(output)
+            return
+        if display_id is not None:
+            self.displays.setdefault(display_id, WeakSet()).add(block)
+        block.handle_display(output)
+
+    def submit_dump(
+        self, code: str, execution: Execution, callback: Callable[[Execution], None]
+    ):
+        """Save variables once an execution is over.
 
         Args:
-            code: String representing a piece of Python code to execute
+            code: Code dumping the variables, see `pyflow.core.namespace`
+            execution: Execution to wait for, the dump is aborted by the kernel
+                if the execution fails
+            callback: Called with the dump execution once the variables are saved
+        """
+        dump = Execution(code, silent=True)
+        dump.signals.finished.connect(
+            lambda: self.dump_finished(dump, execution, callback)
+        )
+        self.dumps.append(dump)
+        self.submit(dump)
 
-        Return:
-            output from the last message sent by the kernel
+    def dump_finished(
+        self,
+        dump: Execution,
+        execution: Execution,
+        callback: Callable[[Execution], None],
+    ):
+        """Call back once variables are saved after a successful execution."""
+        if dump not in self.dumps:
+            # Dropped by a restart
+            return
+        self.dumps.remove(dump)
+        if execution.status == dump.status == "ok":
+            callback(dump)
+
+    def execution_finished(
+        self,
+        block: "ExecutableBlock",
+        execution: Execution,
+        profile: "BlockProfile" = None,
+    ):
+        """Notify the block that its execution is over and run the queue."""
+        if execution not in self.running:
+            # Dropped by a restart
+            return
+        self.running.remove(execution)
+        if profile is not None:
+            profile.finish()
+        if execution.is_aborted:
+            block.execution_canceled()
+        else:
+            block.execution_finished()
+            if profile is not None:
+                block.display_profile(profile)
+        self.run_queue()
+
+    def restore_block(self, block: "ExecutableBlock", code: str, entry: CacheEntry):
+        """Load the cached variables of a block and replay its outputs.
+
+        Args:
+            block: Block found in the cache
+            code: Source of the block, run if the variables cannot be loaded
+            entry: Cache entry of the block
         """
-        _ = self.client.execute(code)
-        done = False
-        while not done:
-            # Check for messages, break the loop when the kernel stops sending messages
-            new_message, done = self.get_message()
-            if not done:
-                message = new_message
-        return self.message_to_output(message)[0]
+        load = Execution(load_code(entry.path), silent=True)
+        load.signals.started.connect(
+            lambda: setattr(block, "run_state", ExecutableState.RUNNING)
+        )
+        load.signals.finished.connect(
+            lambda: self.block_restored(block, code, entry, load)
+        )
+        self.running.append(load)
+        self.submit(load)
+
+    def block_restored(
+        self, block: "ExecutableBlock", code: str, entry: CacheEntry, load: Execution
+    ):
+        """Replay the outputs of a block restored from the cache and run the queue."""
+        if load not in self.running:
+            # Dropped by a restart
+            return
+        self.running.remove(load)
+        if load.is_aborted:
+            block.execution_canceled()
+        elif load.status != "ok":
+            LOGGER.warning("Could not restore %s from the cache.", block.title)
+            if self.cache is not None:
+                self.cache.discard(self.cache.key(block))
+            self.execution_queue.insert(0, (block, code))
+        else:
+            for output, output_type in entry.outputs:
+                if output_type == "display":
+                    self.route_display(block, output)
+                elif output_type == "clear":
+                    block.handle_clear(output)
+                else:
+                    block.handle_stdout(output)
+            block.execution_finished()
+        self.run_queue()
+
+    def cache_dumped(self, key: str, execution: Execution, dump: Execution):
+        """Add the execution of a block to the cache once its variables are saved.
+
+        Executions that changed variables which could not be saved are not cached,
+        since they could not be restored.
 
-    def get_message(self) -> Tuple[str, bool]:
         """
-        Get message in the jupyter kernel
+        if self.cache is None:
+            return
+        skipped = parse_report(dump).get("skipped")
+        if skipped:
+            LOGGER.info("Not caching an execution changing %s", skipped)
+            self.cache.discard(key)
+            return
+        self.cache.store(key, execution.outputs)
+
+    def run_queue(self):
+        """Runs the next code in the queue, or all of it in pipelined mode."""
+        while self.execution_queue and (self.pipelined or not self.running):
+            block, code = self.execution_queue.pop(0)
+            self.run_block(block, code)
+        self.busy = bool(self.running)
+
+    def execute(self, code: str) -> str:
+        """
+        Executes code in the kernel and returns the output of the last message sent by the kernel
+
+        Blocks until the execution is finished, so it should not be used from the GUI thread.
 
         Args:
             code: String representing a piece of Python code to execute
 
         Return:
-            Tuple of:
-                - output from the last message sent by the kernel
-                - boolean repesenting if the kernel as any other message to send.
+            output from the last message sent by the kernel
         """
-        done = False
-        try:
-            message = self.client.get_iopub_msg()["content"]
-            if "execution_state" in message and message["execution_state"] == "idle":
-                done = True
-        except queue.Empty:
-            message = None
-            done = True
-        return message, done
+        execution = Execution(code)
+        self.submit(execution)
+        execution.wait()
+        if not execution.outputs:
+            return ""
+        return execution.outputs[-1][0]
 
-    def update_output(self) -> Tuple[str, str, bool]:
-        """
-        Returns the current output of the kernel
+    def restart(self):
+        """Replace the ipython kernel by a new one from the pool.
+
+        Executions in progress or in the queue are dropped,
+        the startup code is run again on the new kernel.
 
-        Return:
-            current output of the kernel; done: bool, True if the kernel has no message to send
         """
-        message, done = self.get_message()
-        out, output_type = self.message_to_output(message)
-        return out, output_type, done
+        for block, _ in self.execution_queue:
+            block.execution_canceled()
+        self.execution_queue = []
+        self.enqueue_times = {}
+        self.displays = {}
+        self.running = []
+        self.dumps = []
+        self.busy = False
+        self.shutdown()
+        self._startup_code = list(self.setup_code)
+
+    def shutdown(self):
+        """Shut down the ipython kernel if one is attached."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def __del__(self):
         """
         Shuts down the kernel
         """
-        self.kernel_manager.shutdown_kernel()
+        self.shutdown()
@@ -0,0 +1,422 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to listen to the messages of an ipython kernel on a dedicated thread.
+
+Every execution request is registered under the msg_id of the request,
+messages sent by the kernel are routed to the execution given in their parent_header.
+
+"""
+
+import asyncio
+import threading
+from time import time
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from jupyter_client.asynchronous import AsyncKernelClient
+from jupyter_client.manager import KernelManager
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from pyflow.core.outputs import (
+    OUTPUT_MESSAGE_TYPES,
+    is_rich,
+    message_to_bundle,
+    message_to_output,
+)
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.core.kernel_pool import KernelPool
+
+LOGGER = get_logger(__name__)
+
+
+class ExecutionSignals(QObject):
+    """Defines the signals available from an execution."""
+
+    started = pyqtSignal()
+    stdout = pyqtSignal(str)
+    display = pyqtSignal(dict)
+    clear = pyqtSignal(bool)
+    finished = pyqtSignal()
+    error = pyqtSignal()
+
+
+class Execution:
+
+    """Execution request of a piece of code in an ipython kernel.
+
+    Printed text is coalesced on the listener thread: stream messages are
+    accumulated for `batch_interval` seconds, or up to `batch_size` characters,
+    and delivered as a single stdout signal. Updates of a display
+    are coalesced the same way, only the last update of each display is delivered.
+    Any other output first delivers what was accumulated before it,
+    so that outputs stay ordered.
+
+    """
+
+    batch_interval = 0.03
+    batch_size = 2**16
+
+    def __init__(self, code: str, silent: bool = False, stop_on_error: bool = True):
+        """Execution request of a piece of code in an ipython kernel.
+
+        Must be created on the GUI thread so that its signals are delivered there.
+
+        Args:
+            code: String representing a piece of Python code to execute.
+            silent: If True, the kernel does not broadcast the execution nor store history.
+            stop_on_error: If True, executions already queued in the kernel
+                are aborted if this one raises an error.
+
+        """
+        self.code = code
+        self.silent = silent
+        self.stop_on_error = stop_on_error
+        self.msg_id: Optional[str] = None
+        self.signals = ExecutionSignals()
+
+        # Timestamps taken on the listener thread, as soon as messages arrive
+        self.submit_time: Optional[float] = None
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        # Arrival time of each output not yet handled on the GUI thread,
+        # only recorded for profiled executions, see `pyflow.core.profiler`
+        self.received_times: Optional[Deque[float]] = None
+
+        # Printed text not delivered yet, and the arrival time of its first chunk
+        self._stream_text = ""
+        self._stream_time: Optional[float] = None
+        # Last update of each display not delivered yet, with its arrival time
+        self._updates: Dict[str, Tuple[dict, float]] = {}
+        self.flush_scheduled = False
+
+        # Outputs to replay the execution, without the outputs that were cleared
+        self.outputs: List[Tuple[Any, str]] = []
+        self._update_indexes: Dict[str, int] = {}
+        self._wait_clear: Optional[int] = None
+        self.status: Optional[str] = None
+        self._idle = False
+        self._replied = False
+        self.done = threading.Event()
+
+    def handle_message(self, message: dict):
+        """Handle an IOPub message sent by the kernel in response to this execution."""
+        message_type, content = message["msg_type"], message["content"]
+        if message_type not in OUTPUT_MESSAGE_TYPES:
+            return
+        if message_type == "clear_output":
+            self.flush()
+            self._record(content.get("wait", False), "clear")
+            self.signals.clear.emit(content.get("wait", False))
+            return
+
+        output, output_type = message_to_output(content)
+        display_id = content.get("transient", {}).get("display_id")
+        if message_type == "update_display_data" or (
+            message_type in ("display_data", "execute_result")
+            and (is_rich(content) or display_id is not None)
+        ):
+            # Keep every representation of rich outputs
+            output = message_to_bundle(message_type, content)
+            output_type = "display"
+        self._record(output, output_type)
+        if message_type == "stream":
+            self._stream(output)
+            return
+        if message_type == "update_display_data":
+            self._updates.pop(display_id, None)
+            self._updates[display_id] = (output, time())
+            return
+        self.flush()
+        self._received(time())
+        if output_type == "text":
+            self.signals.stdout.emit(output)
+        elif output_type == "display":
+            self.signals.display.emit(output)
+        elif output_type == "error":
+            self.signals.error.emit()
+            self.signals.stdout.emit(output)
+
+    def _received(self, received_time: float):
+        """Record the arrival time of an output if the execution is profiled."""
+        if self.received_times is not None:
+            self.received_times.append(received_time)
+
+    def _record(self, output: Any, output_type: str):
+        """Record an output to replay, forgetting the outputs it clears."""
+        if output_type == "clear":
+            if output:
+                # Outputs are only cleared once the next output arrives
+                self._wait_clear = len(self.outputs)
+            else:
+                self.outputs, self._update_indexes = [], {}
+        elif self._wait_clear is not None:
+            del self.outputs[: self._wait_clear + 1]
+            self._wait_clear = None
+            self._update_indexes = {
+                recorded["transient"]["display_id"]: index
+                for index, (recorded, recorded_type) in enumerate(self.outputs)
+                if recorded_type == "display"
+                and recorded["output_type"] == "update_display_data"
+            }
+
+        if output_type == "display" and output["output_type"] == "update_display_data":
+            # Only the last update of a display is replayed
+            display_id = output["transient"]["display_id"]
+            if display_id in self._update_indexes:
+                self.outputs[self._update_indexes[display_id]] = (output, output_type)
+                return
+            self._update_indexes[display_id] = len(self.outputs)
+        self.outputs.append((output, output_type))
+
+    def _stream(self, text: str):
+        """Accumulate printed text until it is flushed."""
+        if self._stream_time is None:
+            self._stream_time = time()
+        # Blocks replace the last line of their output by the next text printed
+        last_line_start = self._stream_text.rfind("\n") + 1
+        self._stream_text = self._stream_text[:last_line_start] + text
+        if len(self._stream_text) >= self.batch_size:
+            self.flush()
+
+    @property
+    def has_pending_outputs(self) -> bool:
+        """True if some printed text or display updates were not delivered yet."""
+        return self._stream_time is not None or bool(self._updates)
+
+    def flush(self):
+        """Deliver the printed text and the display updates accumulated so far."""
+        self.flush_scheduled = False
+        if self._stream_time is not None:
+            self._received(self._stream_time)
+            text = self._stream_text
+            self._stream_text, self._stream_time = "", None
+            self.signals.stdout.emit(text)
+        updates, self._updates = self._updates, {}
+        for update, received_time in updates.values():
+            self._received(received_time)
+            self.signals.display.emit(update)
+
+    def handle_busy(self):
+        """Handle the kernel starting to work on this execution."""
+        self.start_time = time()
+        self.signals.started.emit()
+
+    def handle_idle(self):
+        """Handle the kernel going back to idle after this execution."""
+        self.end_time = time()
+        self.flush()
+        self._idle = True
+        self._check_finished()
+
+    def handle_reply(self, message: dict):
+        """Handle the execute_reply sent by the kernel on the shell channel."""
+        self.status = message["content"]["status"]
+        self._replied = True
+        self._check_finished()
+
+    def _check_finished(self):
+        """Finish the execution when both the reply and the idle status were received."""
+        if self._idle and self._replied and not self.done.is_set():
+            self.done.set()
+            self.signals.finished.emit()
+
+    def abort(self):
+        """Finish the execution as aborted, without it ever reaching a kernel."""
+        self.flush()
+        self.status = "aborted"
+        self._idle = self._replied = True
+        self._check_finished()
+
+    @property
+    def is_aborted(self) -> bool:
+        """True if the kernel aborted this execution because a previous one failed."""
+        return self.status == "aborted"
+
+    @property
+    def is_finished(self) -> bool:
+        """True if the kernel is done with this execution."""
+        return self.done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the execution is finished.
+
+        Must not be used on the GUI thread for executions connected to the GUI.
+
+        Returns:
+            True if the execution finished before the timeout.
+
+        """
+        return self.done.wait(timeout)
+
+
+class KernelListener(threading.Thread):
+
+    """Long-lived thread sending executions to a kernel and routing its messages."""
+
+    # Maximum time to wait for a kernel from the pool, in seconds
+    acquire_timeout = 60
+
+    def __init__(self, pool: "KernelPool"):
+        """Long-lived thread sending executions to a kernel and routing its messages.
+
+        The ipython kernel is taken from the given pool once the thread is started,
+        so starting the listener never blocks.
+
+        Args:
+            pool: KernelPool to take the ipython kernel from.
+
+        """
+        super().__init__(daemon=True)
+        self.pool = pool
+        self.kernel_manager: Optional[KernelManager] = None
+        self.client: Optional[AsyncKernelClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.first_execute_delay: Optional[float] = None
+        self.ready = threading.Event()
+        # Set if no kernel could be attached, executions are then aborted
+        self.failed = False
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._pending: List[Execution] = []
+        self._executions: Dict[str, Execution] = {}
+
+    def submit(self, execution: Execution):
+        """Send an execution to the kernel, as soon as the kernel is ready.
+
+        Can be called from any thread.
+
+        """
+        execution.submit_time = time()
+        with self._lock:
+            failed = self.failed
+            if not failed and self.loop is None:
+                self._pending.append(execution)
+                return
+        if failed:
+            execution.abort()
+            return
+        self.loop.call_soon_threadsafe(self._send, execution)
+
+    def _send(self, execution: Execution):
+        """Send the execution request, must be called on the listener thread."""
+        execution.msg_id = self.client.execute(
+            execution.code,
+            silent=execution.silent,
+            store_history=not execution.silent,
+            stop_on_error=execution.stop_on_error,
+        )
+        self._executions[execution.msg_id] = execution
+        if self.first_execute_delay is None and not execution.silent:
+            self.first_execute_delay = time() - execution.submit_time
+            self.pool.record_first_execute(self.first_execute_delay)
+
+    def run(self):
+        """Attach to a kernel and route its messages forever."""
+        try:
+            kernel_manager, blocking_client = self.pool.acquire(
+                timeout=self.acquire_timeout
+            )
+        except Exception:  # pylint:disable=broad-except
+            LOGGER.exception("Could not attach a kernel.")
+            with self._lock:
+                self.failed = True
+                pending, self._pending = self._pending, []
+            for execution in pending:
+                execution.abort()
+            return
+        # The blocking client is only used by the pool to wait for the kernel
+        blocking_client.stop_channels()
+        self.kernel_manager = kernel_manager
+        if self._stopped:
+            # Stopped while waiting for the kernel
+            kernel_manager.shutdown_kernel()
+            return
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.client = AsyncKernelClient(
+            parent=kernel_manager, **kernel_manager.get_connection_info(session=True)
+        )
+        self.client.start_channels(stdin=False, hb=False, control=False)
+        loop.run_until_complete(self.client.wait_for_ready())
+
+        tasks = [
+            loop.create_task(self._read_iopub()),
+            loop.create_task(self._read_shell()),
+        ]
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                for execution in self._pending:
+                    loop.call_soon(self._send, execution)
+                self._pending = []
+                self.loop = loop
+        if not stopped:
+            self.ready.set()
+            loop.run_forever()
+
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.client.stop_channels()
+        loop.close()
+        # Shutting down takes a while, so it is done here rather than in `stop`
+        kernel_manager.shutdown_kernel()
+
+    def _route(self, message: dict) -> Optional[Execution]:
+        """Find the execution a kernel message is responding to."""
+        msg_id = message["parent_header"].get("msg_id")
+        return self._executions.get(msg_id)
+
+    def _forget_if_finished(self, execution: Execution):
+        """Stop routing messages to a finished execution."""
+        if execution.is_finished:
+            self._executions.pop(execution.msg_id, None)
+
+    async def _read_iopub(self):
+        """Route IOPub messages to the execution that caused them."""
+        while True:
+            message = await self.client.get_iopub_msg()
+            execution = self._route(message)
+            if execution is None:
+                # Output of an unknown or already finished execution
+                continue
+            if message["msg_type"] == "status":
+                state = message["content"]["execution_state"]
+                if state == "busy":
+                    execution.handle_busy()
+                elif state == "idle":
+                    execution.handle_idle()
+                    self._forget_if_finished(execution)
+            else:
+                execution.handle_message(message)
+                if execution.has_pending_outputs and not execution.flush_scheduled:
+                    execution.flush_scheduled = True
+                    self.loop.call_later(execution.batch_interval, execution.flush)
+
+    async def _read_shell(self):
+        """Route execute replies to the execution that caused them."""
+        while True:
+            message = await self.client.get_shell_msg()
+            execution = self._route(message)
+            if execution is not None and message["msg_type"] == "execute_reply":
+                execution.handle_reply(message)
+                self._forget_if_finished(execution)
+
+    def stop(self):
+        """Stop listening and shut down the kernel.
+
+        Does not block: the kernel is shut down on the listener thread,
+        as soon as it is attached if the listener is still waiting for it.
+
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
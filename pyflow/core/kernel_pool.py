@@ -0,0 +1,223 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the KernelPool.
+
+This module provides `kernel_pool()`,
+a method that returns a handle to the kernel pool of the application.
+
+The kernel pool starts ipython kernels in the background so that
+a Scene can get a ready kernel without freezing the GUI.
+"""
+
+import atexit
+import functools
+import queue
+import threading
+from collections import deque
+from time import time
+from typing import Deque, Dict, List, Tuple
+
+from jupyter_client.manager import start_new_kernel, KernelManager
+from jupyter_client.blocking import BlockingKernelClient
+
+from pyflow.logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+KernelHandle = Tuple[KernelManager, BlockingKernelClient]
+
+
+class KernelPool:
+
+    """Pool of idle ipython kernels spawned in the background."""
+
+    def __init__(self, size: int = 1):
+        """Pool of idle ipython kernels spawned in the background.
+
+        Args:
+            size: Number of idle kernels to keep ready.
+
+        """
+        self.size = size
+        # Larger sizes requested for a while, see `reserve`
+        self.reservations: List[int] = []
+        self._idle: Deque[KernelHandle] = deque()
+        # Spawn failures, at most one for each `acquire` waiting for a kernel
+        self._failures: List[Exception] = []
+        self._waiting = 0
+        self._spawning = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+
+        self.spawn_times: List[float] = []
+        self.first_execute_delays: List[float] = []
+
+    @property
+    def idle_count(self) -> int:
+        """Number of kernels ready to be handed out."""
+        return len(self._idle)
+
+    @property
+    def target_size(self) -> int:
+        """Number of idle kernels to keep ready, taking reservations into account."""
+        return max([self.size, *self.reservations])
+
+    def reserve(self, size: int):
+        """Keep at least `size` kernels ready until the reservation is released.
+
+        Args:
+            size: Number of idle kernels to keep ready.
+
+        """
+        self.reservations.append(size)
+        self.fill()
+
+    def release(self, size: int):
+        """Release a reservation, shutting down the kernels no longer needed.
+
+        Args:
+            size: Size given to `reserve`.
+
+        """
+        self.reservations.remove(size)
+        extra = []
+        with self._lock:
+            while len(self._idle) > self.target_size:
+                extra.append(self._idle.pop())
+        for handle in extra:
+            # Shutting down a kernel takes a while
+            threading.Thread(
+                target=self._shutdown_kernel, args=(handle,), daemon=True
+            ).start()
+
+    @staticmethod
+    def _shutdown_kernel(handle: KernelHandle):
+        """Shut down an idle kernel."""
+        kernel_manager, client = handle
+        client.stop_channels()
+        kernel_manager.shutdown_kernel(now=True)
+
+    def fill(self):
+        """Start spawning kernels until `target_size` kernels are idle or spawning."""
+        with self._lock:
+            missing = self.target_size - len(self._idle) - self._spawning
+            for _ in range(max(0, missing)):
+                self._start_spawn()
+
+    def _start_spawn(self):
+        """Spawn a new kernel on a background thread. Must be called with the lock."""
+        if self._closed:
+            return
+        self._spawning += 1
+        thread = threading.Thread(target=self._spawn, daemon=True)
+        thread.start()
+
+    def _spawn(self):
+        """Start a kernel and put it in the idle queue."""
+        start_time = time()
+        try:
+            handle = start_new_kernel()
+        except Exception as error:  # pylint:disable=broad-except
+            LOGGER.exception("Could not start a new kernel.")
+            with self._lock:
+                self._spawning -= 1
+                # Only an acquire waiting for this spawn gets the error
+                if not self._closed and self._waiting > len(self._failures):
+                    self._failures.append(error)
+                    self._available.notify()
+            return
+
+        spawn_time = time() - start_time
+        with self._lock:
+            self._spawning -= 1
+            self.spawn_times.append(spawn_time)
+            if not self._closed:
+                self._idle.append(handle)
+                self._available.notify()
+                LOGGER.debug("Spawned a kernel in %.3fs", spawn_time)
+                return
+        handle[0].shutdown_kernel(now=True)
+
+    def acquire(self, timeout: float = None) -> KernelHandle:
+        """Take a ready kernel out of the pool.
+
+        Blocks until a kernel is ready if the pool is empty,
+        then starts refilling the pool in the background.
+
+        Args:
+            timeout: Maximum time to wait for a kernel, wait forever if None.
+
+        Returns:
+            The kernel manager and a started client of the kernel.
+
+        Raises:
+            queue.Empty: If no kernel was ready before the timeout.
+            Exception: The error raised by the spawn of the kernel, if it failed.
+
+        """
+        deadline = None if timeout is None else time() + timeout
+        with self._lock:
+            self._waiting += 1
+            try:
+                while not self._idle:
+                    if self._failures:
+                        raise self._failures.pop(0)
+                    # Every waiting acquire needs a kernel on its way
+                    if self._spawning < self._waiting:
+                        self._start_spawn()
+                    remaining = None if deadline is None else deadline - time()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Empty
+                    self._available.wait(remaining)
+                handle = self._idle.popleft()
+            finally:
+                self._waiting -= 1
+                # Errors no acquire is waiting for anymore are dropped
+                del self._failures[self._waiting :]
+        self.fill()
+        return handle
+
+    def record_first_execute(self, delay: float):
+        """Record the time a Scene waited for its first execution to start.
+
+        Args:
+            delay: Time between the first execution request and the execution start.
+
+        """
+        self.first_execute_delays.append(delay)
+        LOGGER.info("Time to first execute: %.3fs", delay)
+
+    def report(self) -> Dict[str, float]:
+        """Return statistics about the kernel spawns and first executions."""
+
+        def mean(values: List[float]) -> float:
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            "size": self.target_size,
+            "idle": self.idle_count,
+            "spawned": len(self.spawn_times),
+            "mean_spawn_time": mean(self.spawn_times),
+            "first_executes": len(self.first_execute_delays),
+            "mean_time_to_first_execute": mean(self.first_execute_delays),
+            "max_time_to_first_execute": max(self.first_execute_delays, default=0.0),
+        }
+
+    def shutdown(self):
+        """Shut down every idle kernel and stop spawning new ones."""
+        with self._lock:
+            self._closed = True
+            self._failures.clear()
+            while self._idle:
+                self._shutdown_kernel(self._idle.popleft())
+
+
+@functools.lru_cache(maxsize=None)
+def kernel_pool() -> KernelPool:
+    """Retreive the kernel pool of the application, filling it on first access."""
+    pool = KernelPool()
+    pool.fill()
+    atexit.register(pool.shutdown)
+    return pool
@@ -0,0 +1,209 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to move variables between ipython kernels.
+
+Provides the code to send to a kernel to dump some of its variables into
+a memory-mapped file and to load them back into another kernel. Variables are
+pickled with cloudpickle when it is installed in the kernel, or with pickle.
+Modules are not pickled but imported again when loaded.
+
+Both snippets print a json report on stdout, read with `parse_report`.
+
+A snapshot of the namespace can be taken before running some code, to only dump
+the variables that the code (re)assigned. The values of the names used by the code
+are also fingerprinted, so that the objects it modified in place are dumped too.
+Objects that cannot be fingerprinted are seen as changed.
+
+"""
+
+import ast
+import json
+import shutil
+import tempfile
+import weakref
+from typing import TYPE_CHECKING, Iterable, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from pyflow.core.kernel_listener import Execution
+
+# Variables defined by ipython in the user namespace
+IPYTHON_NAMES = ("In", "Out", "exit", "quit", "get_ipython", "open")
+
+SNAPSHOT_CODE = """\
+def _pyflow_fingerprint(value):
+    import hashlib, pickle
+    try:
+        import cloudpickle as pickler
+    except ImportError:
+        pickler = pickle
+    try:
+        return hashlib.blake2b(pickler.dumps(value)).hexdigest()
+    except Exception:
+        return None
+_pyflow_snapshot = {{
+    "ids": {{
+        name: id(value)
+        for name, value in globals().items() if not name.startswith("_")
+    }},
+    "fingerprints": {{
+        name: _pyflow_fingerprint(globals()[name])
+        for name in {names!r} if name in globals()
+    }},
+}}
+"""
+
+DUMP_CODE = """\
+def _pyflow_dump(path, names, since_snapshot):
+    import json, mmap, pickle, time, types
+    try:
+        import cloudpickle as pickler
+    except ImportError:
+        pickler = pickle
+    start = time.time()
+    namespace = globals()
+    if names is None:
+        names = [
+            name for name in namespace
+            if not name.startswith("_") and name not in {ipython_names!r}
+        ]
+    if since_snapshot:
+        snapshot = namespace.pop("_pyflow_snapshot", {{"ids": {{}}, "fingerprints": {{}}}})
+        fingerprint = namespace.pop("_pyflow_fingerprint", None)
+        def changed(name):
+            if snapshot["ids"].get(name) != id(namespace[name]):
+                return True
+            if name not in snapshot["fingerprints"]:
+                return False
+            before = snapshot["fingerprints"][name]
+            return before is None or before != fingerprint(namespace[name])
+        names = [name for name in names if name in namespace and changed(name)]
+    modules, values, skipped = {{}}, {{}}, []
+    for name in names:
+        if name not in namespace:
+            continue
+        value = namespace[name]
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+            continue
+        try:
+            values[name] = pickler.dumps(value)
+        except Exception:
+            skipped.append(name)
+    payload = pickle.dumps({{"modules": modules, "values": values}})
+    with open(path, "wb+") as file:
+        file.truncate(len(payload))
+        with mmap.mmap(file.fileno(), len(payload)) as memory:
+            memory[:] = payload
+    print(json.dumps({{
+        "names": sorted(values) + sorted(modules),
+        "skipped": skipped,
+        "bytes": len(payload),
+        "seconds": time.time() - start,
+    }}))
+_pyflow_dump({path!r}, {names!r}, {since_snapshot!r})
+del _pyflow_dump
+"""
+
+LOAD_CODE = """\
+def _pyflow_load(path):
+    import importlib, json, mmap, pickle, time
+    start = time.time()
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+            payload = pickle.loads(memory)
+    namespace = globals()
+    for name, module in payload["modules"].items():
+        namespace[name] = importlib.import_module(module)
+    for name, value in payload["values"].items():
+        namespace[name] = pickle.loads(value)
+    print(json.dumps({{"seconds": time.time() - start}}))
+_pyflow_load({path!r})
+del _pyflow_load
+"""
+
+
+def dump_directory(owner: object) -> Tuple[str, weakref.finalize]:
+    """Create a temporary directory to dump variables into.
+
+    Args:
+        owner: Object using the directory.
+
+    Returns:
+        The path of the directory, and a finalizer removing it when called.
+        The directory is also removed once the owner is garbage collected, or at exit.
+
+    """
+    directory = tempfile.mkdtemp(prefix="pyflow-")
+    return directory, weakref.finalize(
+        owner, shutil.rmtree, directory, ignore_errors=True
+    )
+
+
+def code_names(source: str) -> Optional[Set[str]]:
+    """Names used by a piece of code, None if it cannot be parsed."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+
+def snapshot_code(names: Iterable[str] = ()) -> str:
+    """Code recording the variables of the kernel namespace for `dump_code`.
+
+    Args:
+        names: Names of the variables to fingerprint, the variables
+            the code to run may modify in place.
+
+    """
+    return SNAPSHOT_CODE.format(names=sorted(names))
+
+
+def dump_code(
+    path: str, names: Optional[Iterable[str]] = None, since_snapshot: bool = False
+) -> str:
+    """Code dumping variables of the kernel namespace into a file.
+
+    Args:
+        path: Path of the file to write.
+        names: Names of the variables to dump, all user variables if None.
+        since_snapshot: If True, only dump the variables assigned or modified
+            since the last `snapshot_code` was run.
+
+    """
+    if names is not None:
+        names = sorted(names)
+    return DUMP_CODE.format(
+        path=path,
+        names=names,
+        since_snapshot=since_snapshot,
+        ipython_names=IPYTHON_NAMES,
+    )
+
+
+def load_code(path: str) -> str:
+    """Code loading variables dumped by `dump_code` into the kernel namespace.
+
+    Args:
+        path: Path of the file to read.
+
+    """
+    return LOAD_CODE.format(path=path)
+
+
+def parse_report(execution: "Execution") -> dict:
+    """Read the json report printed by a dump or load execution.
+
+    Returns:
+        The report, empty if the execution did not print one.
+
+    """
+    for output, output_type in reversed(execution.outputs):
+        if output_type != "text":
+            continue
+        try:
+            return json.loads(output)
+        except ValueError:
+            continue
+    return {}
@@ -0,0 +1,266 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module to convert kernel messages into block outputs.
+
+Rich outputs are kept as MIME bundles, in the format of the outputs of jupyter
+notebooks: {"output_type": "display_data", "data": {mime_type: data}, "metadata": {}}.
+
+Does not depend on Qt, so that graphs can be run without a display.
+
+"""
+
+import atexit
+import functools
+import os
+import shutil
+import tempfile
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Types of the IOPub messages that hold an output of an execution
+OUTPUT_MESSAGE_TYPES = (
+    "stream",
+    "display_data",
+    "update_display_data",
+    "execute_result",
+    "error",
+    "clear_output",
+)
+
+# MIME types that are displayed as rich outputs instead of printed text
+RICH_MIME_TYPES = ("image/png", "image/jpeg", "image/svg+xml", "text/html")
+
+
+def message_to_output(message: dict) -> Tuple[str, str]:
+    """
+    Converts a message sent by the kernel into a relevant output
+
+    Args:
+        message: dict representing the a message sent by the kernel
+
+    Return:
+        single output found in the message in that order of priority:
+            image > text data > text print > error > nothing
+    """
+    message_type = "None"
+    if message is None:
+        return "", "text"
+    if "data" in message:
+        if "image/png" in message["data"]:
+            message_type = "image"
+            # output an image (from plt.plot or plt.imshow)
+            out = message["data"]["image/png"]
+        elif "text/html" in message["data"]:
+            message_type = "text"
+            # output some html text (like a pandas dataframe)
+            out = message["data"]["text/html"]
+        else:
+            message_type = "text"
+            # output data as str (for example if code="a=10\na")
+            out = message["data"]["text/plain"]
+    elif "name" in message and message["name"] == "stdout":
+        message_type = "text"
+        # output a print (print("Hello World"))
+        out = message["text"]
+    elif "traceback" in message:
+        message_type = "error"
+        # output an error
+        out = "\n".join(message["traceback"])
+    else:
+        message_type = "text"
+        out = ""
+    return out, message_type
+
+
+def is_rich(content: dict) -> bool:
+    """True if the content of a display message has a rich representation."""
+    data = content.get("data", {})
+    return any(mime_type in data for mime_type in RICH_MIME_TYPES)
+
+
+def message_to_bundle(message_type: str, content: dict) -> Dict:
+    """Convert a display message into a notebook output.
+
+    Args:
+        message_type: Type of the message sent by the kernel.
+        content: Content of the message.
+
+    Returns:
+        The output, with every representation of the displayed object.
+
+    """
+    bundle = {
+        "output_type": message_type,
+        "data": dict(content.get("data", {})),
+        "metadata": dict(content.get("metadata", {})),
+    }
+    if "execution_count" in content:
+        bundle["execution_count"] = content["execution_count"]
+    if "transient" in content:
+        # Not saved in notebooks, holds the id of the display to update
+        bundle["transient"] = dict(content["transient"])
+    return bundle
+
+
+def stream_output(text: str) -> Dict:
+    """Notebook output of some printed text."""
+    return {"output_type": "stream", "name": "stdout", "text": text}
+
+
+def append_output(outputs: List[Dict], output: Dict):
+    """Append an output to the outputs of a block.
+
+    Printed text following printed text is merged into the same output,
+    replacing its last line like `append_stdout`.
+
+    """
+    if output["output_type"] == "stream" and outputs:
+        last = outputs[-1]
+        if last["output_type"] == "stream":
+            last_line_start = last["text"].rfind("\n") + 1
+            last["text"] = last["text"][:last_line_start] + output["text"]
+            return
+    outputs.append(output)
+
+
+def append_stdout(cached_stdout: str, value: str) -> Tuple[str, str]:
+    """Append some text to the stdout of a block.
+
+    Every complete line is kept, the last line is replaced by the next output.
+
+    Args:
+        cached_stdout: Complete lines already printed by the block.
+        value: Text to append.
+
+    Returns:
+        The new complete lines and the new stdout of the block.
+
+    """
+    if value.find("\n") != -1:
+        lines = value.split("\n")
+        cached_stdout += "\n".join(lines[:-1]) + "\n"
+        value = lines[-1]
+    return cached_stdout, cached_stdout + value
+
+
+@functools.lru_cache(maxsize=None)
+def spill_directory() -> str:
+    """Directory holding the outputs that no longer fit in memory, removed at exit."""
+    directory = tempfile.mkdtemp(prefix="pyflow-outputs-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    return directory
+
+
+class OutputBuffer:
+
+    """Ring buffer of the text printed by a block.
+
+    Follows the same rules as `append_stdout`, but only keeps the last complete lines
+    in memory, within a number of lines and a number of characters.
+    Older lines are spilled to a file on disk so that the full output can still be read.
+
+    """
+
+    def __init__(self, max_lines: int = 10000, max_chars: int = 4 * 2**20):
+        """Ring buffer of the text printed by a block.
+
+        Args:
+            max_lines: Maximum number of complete lines kept in memory.
+            max_chars: Maximum size in characters of the lines kept in memory.
+
+        """
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.lines: Deque[str] = deque()
+        self.last_line = ""
+        self.size = 0
+        self.spilled_lines = 0
+        self.spill_path: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Text kept in memory, the last line included."""
+        if not self.lines:
+            return self.last_line
+        return "\n".join(self.lines) + "\n" + self.last_line
+
+    @property
+    def is_truncated(self) -> bool:
+        """True if some lines were spilled to disk."""
+        return self.spilled_lines > 0
+
+    def append(self, value: str) -> Tuple[List[str], int]:
+        """Append some text, the last line is replaced by the next text appended.
+
+        Args:
+            value: Text to append.
+
+        Returns:
+            The new complete lines that are kept in memory,
+            and the number of lines that were kept before and were spilled.
+
+        """
+        new_lines = value.split("\n")
+        self.last_line = new_lines.pop()
+        kept_before = len(self.lines)
+        self.lines.extend(new_lines)
+        self.size += sum(len(line) + 1 for line in new_lines)
+
+        spilled = []
+        while self.lines and (
+            len(self.lines) > self.max_lines or self.size > self.max_chars
+        ):
+            line = self.lines.popleft()
+            self.size -= len(line) + 1
+            spilled.append(line)
+        if spilled:
+            self._spill(spilled)
+
+        spilled_before = min(len(spilled), kept_before)
+        added = new_lines[max(0, len(spilled) - kept_before) :]
+        return added, spilled_before
+
+    def end_line(self) -> int:
+        """Complete the last line, so that it is not replaced by the next text.
+
+        Returns:
+            The number of lines that were kept before and were spilled.
+
+        """
+        if not self.last_line:
+            return 0
+        _, spilled = self.append(self.last_line + "\n")
+        return spilled
+
+    def _spill(self, lines: List[str]):
+        """Write lines that no longer fit in memory to the spill file."""
+        if self.spill_path is None:
+            handle, self.spill_path = tempfile.mkstemp(
+                suffix=".txt", dir=spill_directory()
+            )
+            os.close(handle)
+        with open(self.spill_path, "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        self.spilled_lines += len(lines)
+
+    def full_output_path(self) -> str:
+        """Write the full output to a file, spilled lines included, and return its path."""
+        handle, path = tempfile.mkstemp(suffix=".txt", dir=spill_directory())
+        os.close(handle)
+        with open(path, "w", encoding="utf-8") as file:
+            if self.spill_path is not None:
+                with open(self.spill_path, "r", encoding="utf-8") as spill:
+                    shutil.copyfileobj(spill, file)
+            file.write(self.text)
+        return path
+
+    def clear(self):
+        """Forget every line, spilled lines included."""
+        self.lines.clear()
+        self.last_line = ""
+        self.size = 0
+        self.spilled_lines = 0
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
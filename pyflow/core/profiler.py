@@ -0,0 +1,237 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the ExecutionProfiler.
+
+When enabled, the kernel records for each block it runs:
+
+    - queue: time between the block being enqueued and the kernel starting it,
+    - run: time the kernel spent executing the block,
+    - transfer: time between outputs arriving from the kernel and being handled,
+    - render: time the block spent displaying its outputs on the GUI thread.
+
+The profiles can be exported as a Chrome trace (chrome://tracing or Perfetto).
+
+"""
+
+import json
+from collections import deque
+from time import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.blocks.executableblock import ExecutableBlock
+    from pyflow.core.kernel_listener import Execution
+
+LOGGER = get_logger(__name__)
+
+
+class BlockProfile:
+
+    """Timings of a single execution of a block."""
+
+    def __init__(
+        self,
+        block: "ExecutableBlock",
+        execution: "Execution",
+        enqueue_time: float,
+        lane: str = "kernel",
+    ):
+        """Timings of a single execution of a block.
+
+        The execution is only referenced until it is finished, see `finish`.
+
+        Args:
+            block: Block that was executed.
+            execution: Execution of the block, holding the kernel timestamps.
+            enqueue_time: Time the block was added to the execution queue.
+            lane: Name of the kernel that ran the block.
+
+        """
+        self.block_id = getattr(block, "id", None)
+        self.title = getattr(block, "title", "")
+        self.execution: Optional["Execution"] = execution
+        execution.received_times = deque()
+        self._received_times = execution.received_times
+        self.kernel_start_time: Optional[float] = None
+        self.kernel_end_time: Optional[float] = None
+        self.enqueue_time = enqueue_time
+        self.lane = lane
+        self.transfer_time = 0.0
+        self.render_time = 0.0
+        # (received, handled, rendered) times of each output
+        self.deliveries: List[Tuple[float, float, float]] = []
+
+    def deliver(self, handler: Callable[[Any], None]) -> Callable[[Any], None]:
+        """Wrap an output handler of the block to time the outputs it handles."""
+
+        def timed_handler(output: Any):
+            handled = time()
+            received = (
+                self._received_times.popleft() if self._received_times else handled
+            )
+            handler(output)
+            rendered = time()
+            self.transfer_time += handled - received
+            self.render_time += rendered - handled
+            self.deliveries.append((received, handled, rendered))
+
+        return timed_handler
+
+    def finish(self):
+        """Keep the kernel timestamps of the finished execution and release it."""
+        if self.execution is not None:
+            self.kernel_start_time = self.execution.start_time
+            self.kernel_end_time = self.execution.end_time
+            self.execution = None
+
+    @property
+    def start_time(self) -> float:
+        """Time the kernel started the execution, the enqueue time if it never did."""
+        start_time = self.kernel_start_time
+        if self.execution is not None:
+            start_time = self.execution.start_time
+        return self.enqueue_time if start_time is None else start_time
+
+    @property
+    def end_time(self) -> float:
+        """Time the kernel finished the execution."""
+        end_time = self.kernel_end_time
+        if self.execution is not None:
+            end_time = self.execution.end_time
+        return self.start_time if end_time is None else end_time
+
+    @property
+    def queue_time(self) -> float:
+        """Time spent waiting in the execution queue, in seconds."""
+        return max(0.0, self.start_time - self.enqueue_time)
+
+    @property
+    def run_time(self) -> float:
+        """Time spent executing in the kernel, in seconds."""
+        return max(0.0, self.end_time - self.start_time)
+
+    def summary(self) -> str:
+        """Multi-line breakdown of the timings."""
+        return "\n".join(
+            [
+                f"queue: {format_duration(self.queue_time)}",
+                f"run: {format_duration(self.run_time)}",
+                f"transfer: {format_duration(self.transfer_time)}",
+                f"render: {format_duration(self.render_time)}",
+            ]
+        )
+
+
+def format_duration(seconds: float) -> str:
+    """Short human-readable duration."""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.0f}ms"
+    return f"{seconds:.2f}s"
+
+
+class ExecutionProfiler:
+
+    """Collect the timings of block executions and export them as a trace."""
+
+    def __init__(self, enabled: bool = False, max_profiles: int = 10000):
+        """Collect the timings of block executions and export them as a trace.
+
+        Args:
+            enabled: If False, no execution is profiled.
+            max_profiles: Maximum number of profiles kept, the oldest are dropped.
+
+        """
+        self.enabled = enabled
+        self.max_profiles = max_profiles
+        self.profiles: List[BlockProfile] = []
+
+    def profile(
+        self,
+        block: "ExecutableBlock",
+        execution: "Execution",
+        enqueue_time: float,
+        lane: str = "kernel",
+    ) -> Optional[BlockProfile]:
+        """Start profiling the execution of a block, None if profiling is disabled."""
+        if not self.enabled:
+            return None
+        profile = BlockProfile(block, execution, enqueue_time, lane)
+        self.profiles.append(profile)
+        if len(self.profiles) > self.max_profiles:
+            del self.profiles[0]
+        return profile
+
+    def clear(self):
+        """Forget every profile."""
+        self.profiles = []
+
+    def trace(self) -> dict:
+        """Chrome trace of the profiled executions.
+
+        Each kernel, the output transfers and the GUI get their own lane.
+
+        """
+        if not self.profiles:
+            return {"traceEvents": [], "displayTimeUnit": "ms"}
+        origin = min(profile.enqueue_time for profile in self.profiles)
+        lanes: Dict[str, int] = {}
+
+        def lane_id(name: str) -> int:
+            return lanes.setdefault(name, len(lanes) + 1)
+
+        def event(
+            profile: BlockProfile, category: str, lane: str, start: float, end: float
+        ):
+            return {
+                "name": profile.title or str(profile.block_id),
+                "cat": category,
+                "ph": "X",
+                "pid": 1,
+                "tid": lane_id(lane),
+                "ts": round((start - origin) * 1e6, 3),
+                "dur": round(max(0.0, end - start) * 1e6, 3),
+                "args": {"block": profile.block_id},
+            }
+
+        events = []
+        for profile in self.profiles:
+            events.append(
+                event(
+                    profile,
+                    "queue",
+                    f"{profile.lane} queue",
+                    profile.enqueue_time,
+                    profile.start_time,
+                )
+            )
+            events.append(
+                event(
+                    profile, "run", profile.lane, profile.start_time, profile.end_time
+                )
+            )
+            for received, handled, rendered in profile.deliveries:
+                events.append(event(profile, "transfer", "transfer", received, handled))
+                events.append(event(profile, "render", "GUI", handled, rendered))
+
+        events += [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": lane},
+            }
+            for lane, tid in lanes.items()
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str):
+        """Write the Chrome trace of the profiled executions to a json file."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.trace(), file)
+        LOGGER.info("Exported %d profiles to %s", len(self.profiles), path)
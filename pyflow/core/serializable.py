@@ -3,7 +3,7 @@
 
 """ Module for the Serializable base class """
 
-from typing import Any, Dict, OrderedDict
+from typing import Any, Dict, Optional, OrderedDict
 
 
 class Serializable:
@@ -12,9 +12,32 @@ class Serializable:
 
     MANDATORY_FIELDS: OrderedDict = {}
     DEFAULT_DATA: Dict[str, Any] = {}
+    # True if the object marks itself dirty whenever its serialized state changes
+    TRACKS_CHANGES = False
 
     def __init__(self):
         self.id = id(self)
+        # True if the object changed since it was last serialized
+        self.dirty = True
+        self._serialized: Optional[OrderedDict] = None
+
+    def mark_dirty(self):
+        """Mark the object as changed, so that it is serialized again."""
+        self.dirty = True
+
+    def cached_serialize(self) -> OrderedDict:
+        """Serialize the object, reusing the last serialized state if it did not change.
+
+        Only objects tracking their changes are cached. The serialized state
+        is shared between the calls, so it must not be modified.
+
+        """
+        if not self.TRACKS_CHANGES:
+            return self.serialize()
+        if self.dirty or self._serialized is None:
+            self._serialized = self.serialize()
+            self.dirty = False
+        return self._serialized
 
     def serialize(self) -> OrderedDict:
         """Serialize the object as an ordered dictionary."""
@@ -4,7 +4,7 @@
 """ Module for base Sockets."""
 
 from __future__ import annotations
-from typing import List, Optional, OrderedDict, TYPE_CHECKING
+from typing import Any, List, Optional, OrderedDict, TYPE_CHECKING
 import math
 
 from PyQt5.QtCore import QPoint, QPointF, QRectF
@@ -72,6 +72,8 @@ class Socket(QGraphicsItem, Serializable):
         self._off_brush = QBrush(QColor(off_color))
 
         self.is_on = True
+        # Edges follow the socket when it or its block moves
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsScenePositionChanges)
 
         self.metadata = {
             "radius": radius,
@@ -93,6 +95,13 @@ class Socket(QGraphicsItem, Serializable):
                 return
         self.edges.append(edge)
 
+    def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: Any) -> Any:
+        """Update the path of the socket edges when the socket moves in the scene."""
+        if change == QGraphicsItem.GraphicsItemChange.ItemScenePositionHasChanged:
+            for edge in self.edges:
+                edge.update_path()
+        return super().itemChange(change, value)
+
     def clear_edge(self):
         """Remove all edges from the socket"""
         for edge in self.edges:
@@ -116,6 +125,7 @@ class Socket(QGraphicsItem, Serializable):
         else:
             if self in self.block.sockets_out:
                 self.block.sockets_out.remove(self)
+        self.block.mark_dirty()
         self.block.update_sockets()
 
         scene = self.scene()
@@ -150,13 +160,19 @@ class Socket(QGraphicsItem, Serializable):
             painter.drawEllipse(int(-r), int(-r), int(2 * r), int(2 * r))
 
     def boundingRect(self) -> QRectF:
-        """Get the socket bounding box."""
-        r = self.radius
+        """Get the socket bounding box, including its outline."""
+        r = self.radius + self._pen.widthF() / 2
         return QRectF(-r, -r, 2 * r, 2 * r)
 
     def toggle(self):
         """Toggle the state of the socket."""
         self.is_on = not self.is_on
+        self.update()
+        scene = self.scene()
+        if scene is not None and not scene.graph.update_socket(self):
+            # Turning the socket on would create a cycle
+            self.is_on = not self.is_on
+            scene.graph.update_socket(self)
 
     def serialize(self) -> OrderedDict:
         metadata = OrderedDict(sorted(self.metadata.items()))
@@ -182,3 +198,4 @@ class Socket(QGraphicsItem, Serializable):
         self._pen.setColor(QColor(self.metadata["linecolor"]))
         self._pen.setWidth(int(self.metadata["linewidth"]))
         self._brush.setColor(QColor(self.metadata["color"]))
+        self.update()
@@ -9,12 +9,20 @@ import pathlib
 from typing import List, Optional, Tuple
 
 from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
-from PyQt5.QtGui import QKeyEvent, QMouseEvent, QPainter, QWheelEvent, QContextMenuEvent
-from PyQt5.QtWidgets import QGraphicsView, QMenu, QApplication
+from PyQt5.QtGui import (
+    QContextMenuEvent,
+    QKeyEvent,
+    QMouseEvent,
+    QPainter,
+    QResizeEvent,
+    QWheelEvent,
+)
+from PyQt5.QtWidgets import QGraphicsView, QInputDialog, QMenu, QApplication
 from PyQt5.sip import isdeleted
 from pyflow.blocks.codeblock import CodeBlock
 from pyflow.blocks.executableblock import ExecutableBlock
 from pyflow.core.add_button import AddEdgeButton, AddNewBlockButton
+from pyflow.core.checkpoint import checkpoint_names
 
 from pyflow.scene import Scene
 from pyflow.core.socket import Socket
@@ -28,6 +36,7 @@ BLOCKFILES_PATH = os.path.join(BLOCK_PATH, "blockfiles")
 
 EPS: float = 1e-10  # To check if blocks are of size 0
 ZOOM_INCREMENT = 1.2
+VIRTUALIZATION_MARGIN = 200  # Margin around the viewport where blocks stay materialized
 LOGGER = get_logger(__name__)
 
 
@@ -45,6 +54,13 @@ class View(QGraphicsView):
         "EDITING": MODE_EDITING,
     }
 
+    UPDATE_MODES = {
+        "full": QGraphicsView.ViewportUpdateMode.FullViewportUpdate,
+        "bounding_rect": QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate,
+        "smart": QGraphicsView.ViewportUpdateMode.SmartViewportUpdate,
+        "minimal": QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate,
+    }
+
     def __init__(
         self,
         scene: Scene,
@@ -52,16 +68,35 @@ class View(QGraphicsView):
         zoom_step: float = 1.25,
         zoom_min: float = 0.05,
         zoom_max: float = 5,
+        *,
+        low_detail_zoom: float = 0.35,
+        update_mode: str = "smart",
     ):
+        """View for the Window.
+
+        Args:
+            scene: Scene to display.
+            parent: Parent widget of the view.
+            zoom_step: Factor applied to the zoom at each step.
+            zoom_min: Minimal zoom.
+            zoom_max: Maximal zoom.
+            low_detail_zoom: Zoom below which items are drawn with less details.
+            update_mode: How the viewport is repainted after a change,
+                one of the keys of View.UPDATE_MODES.
+
+        """
         super().__init__(parent=parent)
         self.mode = self.MODE_NOOP
         self.zoom = 1
         self.zoom_step, self.zoom_min, self.zoom_max = zoom_step, zoom_min, zoom_max
+        # Below this zoom, blocks and edges are drawn with less details
+        self.low_detail_zoom = low_detail_zoom
 
         self.edge_drag = None
         self.lastMousePos = QPointF(0, 0)
         self._currentSelectedBlock = None
 
+        self.update_mode = update_mode
         self.init_ui()
         self.setScene(scene)
 
@@ -74,8 +109,8 @@ class View(QGraphicsView):
             | QPainter.RenderHint.TextAntialiasing
             | QPainter.RenderHint.SmoothPixmapTransform
         )
-        # Better Update
-        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        # Only repaint the regions that changed, unless told otherwise
+        self.set_update_mode(self.update_mode)
         # Remove scroll bars
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -84,10 +119,49 @@ class View(QGraphicsView):
         # Selection box
         self.setDragMode(QGraphicsView.DragMode.RubberBandDrag)
 
+    def set_update_mode(self, update_mode: str):
+        """Set how the viewport is repainted after a change.
+
+        Args:
+            update_mode: One of the keys of View.UPDATE_MODES.
+
+        """
+        if update_mode not in self.UPDATE_MODES:
+            raise ValueError(f"Unknown viewport update mode: {update_mode}")
+        self.update_mode = update_mode
+        self.setViewportUpdateMode(self.UPDATE_MODES[update_mode])
+
     def scene(self) -> Scene:
         """Get current Scene."""
         return super().scene()
 
+    def update_visible_rect(self):
+        """Tell the scene which area is visible, with a margin in viewport pixels."""
+        scene = self.scene()
+        if scene is None:
+            return
+        rect = (
+            self.viewport()
+            .rect()
+            .adjusted(
+                -VIRTUALIZATION_MARGIN,
+                -VIRTUALIZATION_MARGIN,
+                VIRTUALIZATION_MARGIN,
+                VIRTUALIZATION_MARGIN,
+            )
+        )
+        scene.set_visible_rect(self.mapToScene(rect).boundingRect())
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        """Update the visible area of the scene when the view scrolls."""
+        super().scrollContentsBy(dx, dy)
+        self.update_visible_rect()
+
+    def resizeEvent(self, event: QResizeEvent):
+        """Update the visible area of the scene when the view is resized."""
+        super().resizeEvent(event)
+        self.update_visible_rect()
+
     def mousePressEvent(self, event: QMouseEvent):
         """Dispatch Qt's mousePress events to corresponding functions below."""
         if event.button() == Qt.MouseButton.MiddleButton:
@@ -168,13 +242,12 @@ class View(QGraphicsView):
             True if the event was handled, False otherwise.
         """
 
-        items = self.scene().items()
+        code_blocks: List[Block] = list(self.scene().blocks)
 
         # If items are selected, overwride the behvaior
         if len(self.scene().selectedItems()) > 0:
             items = self.scene().selectedItems()
-
-        code_blocks: List[Block] = [i for i in items if isinstance(i, Block)]
+            code_blocks = [i for i in items if isinstance(i, Block)]
 
         if not code_blocks:
             return False
@@ -233,11 +306,7 @@ class View(QGraphicsView):
         if n_selected_items > 1:
             return False
 
-        code_blocks = [
-            i
-            for i in self.scene().items()
-            if isinstance(i, Block) and not i.isSelected()
-        ]
+        code_blocks = [i for i in self.scene().blocks if not i.isSelected()]
 
         reference = None
         if n_selected_items == 1 and isinstance(self.scene().selectedItems()[0], Block):
@@ -406,12 +475,40 @@ class View(QGraphicsView):
         for filepath, block_name in self.retreiveBlockTypes():
             actionPool.append((filepath, menu.addAction(block_name)))
 
+        block = self.get_block_below_mouse(event.pos())
+        checkpointAction = None
+        if isinstance(block, ExecutableBlock):
+            menu.addSeparator()
+            checkpointAction = menu.addAction("Checkpoint variables...")
+
         selectedAction = menu.exec_(self.mapToGlobal(event.pos()))
+        if checkpointAction is not None and selectedAction == checkpointAction:
+            self.editCheckpoint(block)
         for filepath, action in actionPool:
             if action == selectedAction:
                 p = self.mapToScene(event.pos())
                 self.scene().create_block_from_file(filepath, p.x(), p.y())
 
+    def editCheckpoint(self, block: ExecutableBlock):
+        """Ask for the variables to checkpoint after the given block runs."""
+        names = checkpoint_names(block)
+        text, accepted = QInputDialog.getText(
+            self,
+            "Checkpoint variables",
+            "Variables to save after the block runs, separated by commas.\n"
+            "Use * for every variable, leave empty to remove the checkpoint.",
+            text="" if names is None else ", ".join(names) or "*",
+        )
+        if not accepted:
+            return
+        names = [name.strip() for name in text.split(",") if name.strip()]
+        if not names:
+            block.metadata.pop("checkpoint", None)
+        else:
+            block.metadata["checkpoint"] = [] if names == ["*"] else names
+        block.mark_dirty()
+        self.scene().history.checkpoint("Edited block checkpoint", set_modified=True)
+
     def wheelEvent(self, event: QWheelEvent):
         """Handles zooming with mouse wheel events."""
         if Qt.Modifier.CTRL == int(event.modifiers()):
@@ -438,6 +535,8 @@ class View(QGraphicsView):
         zoom_factor = new_zoom / self.zoom
         self.scale(zoom_factor, zoom_factor)
         self.zoom = new_zoom
+        self.scene().low_detail = new_zoom < self.low_detail_zoom
+        self.update_visible_rect()
 
     def zoomIn(self):
         """Zoom in."""
@@ -591,11 +690,12 @@ class View(QGraphicsView):
                 self.addBlock(parent)
                 return
         elif self.mode == self.MODE_EDGE_DRAG:
+            # The sockets of a block are sorted by the position of their edges ends
+            scene.schedule_sockets_update([self.edge_drag.source_socket.block])
             if action == "release":
                 block_below_mouse = self.get_block_below_mouse(event.pos())
-                if (
-                    block_below_mouse is not None
-                    and block_below_mouse is not self.edge_drag.source_socket.block
+                if block_below_mouse is not None and not scene.graph.creates_cycle(
+                    self.edge_drag.source_socket.block, block_below_mouse
                 ):
                     input_socket = block_below_mouse.create_new_input_socket()
                     self.edge_drag.destination_socket = input_socket
@@ -609,7 +709,6 @@ class View(QGraphicsView):
                 self.mode = self.MODE_NOOP
             elif action == "move":
                 self.edge_drag.destination = self.mapToScene(event.pos())
-            self.scene().update_all_blocks_sockets()
         return event
 
     def toggle_socket(self, event: QMouseEvent) -> Optional[QMouseEvent]:
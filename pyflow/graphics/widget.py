@@ -5,6 +5,7 @@
 
 import os
 
+from PyQt5.QtGui import QCloseEvent
 from PyQt5.QtWidgets import QVBoxLayout, QWidget
 from PyQt5.QtCore import Qt
 
@@ -38,6 +39,14 @@ class Widget(QWidget):
 
         self.savepath = None
 
+    def closeEvent(self, event: QCloseEvent):
+        """Shut down the kernels of the scene once the widget is closed."""
+        self.scene.branch_scheduler.shutdown()
+        self.scene.kernel.shutdown()
+        if self.scene.kernel.has_checkpoints:
+            self.scene.kernel.checkpoints.close()
+        super().closeEvent(event)
+
     def updateTitle(self):
         """Update the widget title."""
         if self.savepath is None:
@@ -20,7 +20,9 @@ from PyQt5.QtWidgets import (
 )
 
 from pyflow.graphics.widget import Widget
+from pyflow.graphics.view import View
 from pyflow.graphics.theme_manager import theme_manager
+from pyflow.core.execution_cache import execution_cache
 
 from pyflow.qss import loadStylesheets
 from pyflow.qss import __file__ as QSS_INIT_PATH
@@ -73,6 +75,12 @@ class Window(QMainWindow):
 
         # Window properties
         self.never_show_exit_prompt = False
+        self.pipelined_execution = False
+        self.parallel_branches = False
+        self.cache_results = False
+        self.profile_executions = False
+        self.virtualize_blocks = False
+        self.viewport_update_mode = "smart"
         self.readSettings()
         self.show()
 
@@ -174,6 +182,42 @@ class Window(QMainWindow):
             triggered=self.onEditRun,
         )
 
+        # Kernel
+        self._actPipelined = QAction(
+            "&Pipelined execution",
+            statusTip="Send all the blocks to run to the kernel at once",
+            checkable=True,
+            triggered=self.onKernelPipelined,
+        )
+        self._actParallel = QAction(
+            "Parallel &branches",
+            statusTip="Run independent branches of the graph on worker kernels",
+            checkable=True,
+            triggered=self.onKernelParallel,
+        )
+        self._actRestartKernel = QAction(
+            "&Restart kernel",
+            statusTip="Restart the kernel of the current graph",
+            triggered=self.onKernelRestart,
+        )
+        self._actCache = QAction(
+            "&Cache results",
+            statusTip="Restore the results of unchanged blocks instead of running them",
+            checkable=True,
+            triggered=self.onKernelCache,
+        )
+        self._actProfile = QAction(
+            "Pro&file executions",
+            statusTip="Record where the time of each block execution goes",
+            checkable=True,
+            triggered=self.onKernelProfile,
+        )
+        self._actExportTrace = QAction(
+            "&Export trace...",
+            statusTip="Save the profiled executions as a Chrome trace",
+            triggered=self.onKernelExportTrace,
+        )
+
         # View
         self._actViewItems = QAction(
             "See All Blocks",
@@ -181,6 +225,12 @@ class Window(QMainWindow):
             shortcut=" ",
             triggered=self.onMoveToItems,
         )
+        self._actVirtualize = QAction(
+            "&Virtualize Off-screen Blocks",
+            statusTip="Paint placeholders instead of the widgets of off-screen blocks",
+            checkable=True,
+            triggered=self.onViewVirtualize,
+        )
         self._actZoomIn = QAction(
             "Zoom in",
             statusTip="Zoom in",
@@ -260,12 +310,24 @@ class Window(QMainWindow):
         self.editmenu.addAction(self._actDuplicate)
         self.editmenu.addAction(self._actRun)
 
+        self.kernelmenu = self.menuBar().addMenu("&Kernel")
+        self.kernelmenu.addAction(self._actRestartKernel)
+        self.kernelmenu.addSeparator()
+        self.kernelmenu.addAction(self._actPipelined)
+        self.kernelmenu.addAction(self._actParallel)
+        self.kernelmenu.addAction(self._actCache)
+        self.kernelmenu.addSeparator()
+        self.kernelmenu.addAction(self._actProfile)
+        self.kernelmenu.addAction(self._actExportTrace)
+
         self.viewmenu = self.menuBar().addMenu("&View")
         self.thememenu = self.viewmenu.addMenu("Theme")
         self.thememenu.aboutToShow.connect(self.updateThemeMenu)
         self.viewmenu.addAction(self._actViewItems)
         self.viewmenu.addAction(self._actZoomIn)
         self.viewmenu.addAction(self._actZoomOut)
+        self.viewmenu.addSeparator()
+        self.viewmenu.addAction(self._actVirtualize)
 
         self.windowMenu = self.menuBar().addMenu("&Window")
         self.updateWindowMenu()
@@ -316,6 +378,8 @@ class Window(QMainWindow):
     def createNewMdiChild(self, filename: str = None):
         """Create a new graph subwindow loading a file if a path is given."""
         _widget = Widget()
+        self.applyKernelOptions(_widget)
+        self.applyViewOptions(_widget)
         if filename is not None:
             _widget.scene.load(filename)
             if filename.split(".")[-1] == "ipyg":
@@ -467,6 +531,81 @@ class Window(QMainWindow):
         if len(selected_blocks) == 1:
             selected_blocks[0].run_left()
 
+    def onKernelRestart(self):
+        """Restart the kernel of the current graph."""
+        current_window = self.activeMdiChild()
+        if current_window is not None:
+            current_window.scene.restart_kernel()
+
+    def onKernelPipelined(self, checked: bool):
+        """Toggle the pipelined execution of the kernels."""
+        self.pipelined_execution = checked
+        for subwindow in self.mdiArea.subWindowList():
+            if isinstance(subwindow.widget(), Widget):
+                self.applyKernelOptions(subwindow.widget())
+        self.writeSettings()
+
+    def onKernelParallel(self, checked: bool):
+        """Toggle the execution of independent branches on worker kernels."""
+        self.parallel_branches = checked
+        for subwindow in self.mdiArea.subWindowList():
+            if isinstance(subwindow.widget(), Widget):
+                self.applyKernelOptions(subwindow.widget())
+        self.writeSettings()
+
+    def onKernelCache(self, checked: bool):
+        """Toggle the cache of the results of the blocks."""
+        self.cache_results = checked
+        for subwindow in self.mdiArea.subWindowList():
+            if isinstance(subwindow.widget(), Widget):
+                self.applyKernelOptions(subwindow.widget())
+        self.writeSettings()
+
+    def onKernelProfile(self, checked: bool):
+        """Toggle the profiling of the block executions."""
+        self.profile_executions = checked
+        for subwindow in self.mdiArea.subWindowList():
+            if isinstance(subwindow.widget(), Widget):
+                self.applyKernelOptions(subwindow.widget())
+        self.writeSettings()
+
+    def onKernelExportTrace(self):
+        """Save the profiled executions of the current graph as a Chrome trace."""
+        current_window = self.activeMdiChild()
+        if current_window is None:
+            return
+        dialog = QFileDialog()
+        dialog.setDefaultSuffix(".json")
+        filename, _ = dialog.getSaveFileName(
+            self, "Export trace to file", filter="Chrome trace (*.json)"
+        )
+        if filename == "":
+            return
+        current_window.scene.kernel.profiler.export(filename)
+        success_msg = f"Exported trace at {filename}"
+        self.statusbar.showMessage(success_msg, 2000)
+        LOGGER.info(success_msg)
+
+    def applyKernelOptions(self, widget: Widget):
+        """Apply the kernel options of the window to the kernel of the given widget."""
+        widget.scene.kernel.pipelined = self.pipelined_execution
+        widget.scene.branch_scheduler.enabled = self.parallel_branches
+        widget.scene.kernel.cache = execution_cache() if self.cache_results else None
+        widget.scene.kernel.profiler.enabled = self.profile_executions
+
+    def onViewVirtualize(self, checked: bool):
+        """Toggle the placeholders of the blocks outside of the views."""
+        self.virtualize_blocks = checked
+        for subwindow in self.mdiArea.subWindowList():
+            if isinstance(subwindow.widget(), Widget):
+                self.applyViewOptions(subwindow.widget())
+        self.writeSettings()
+
+    def applyViewOptions(self, widget: Widget):
+        """Apply the view options of the window to the scene of the given widget."""
+        widget.scene.virtualized = self.virtualize_blocks
+        widget.view.set_update_mode(self.viewport_update_mode)
+
     def allWidgetsAreSaved(self):
         """Return true if all widgets are saved."""
 
@@ -533,6 +672,24 @@ class Window(QMainWindow):
             self.showMaximized()
         if settings.value("NeverShowExitPrompt", False) == "true":
             self.never_show_exit_prompt = True
+        if settings.value("PipelinedExecution", False) == "true":
+            self.pipelined_execution = True
+        self._actPipelined.setChecked(self.pipelined_execution)
+        if settings.value("ParallelBranches", False) == "true":
+            self.parallel_branches = True
+        self._actParallel.setChecked(self.parallel_branches)
+        if settings.value("CacheResults", False) == "true":
+            self.cache_results = True
+        self._actCache.setChecked(self.cache_results)
+        if settings.value("ProfileExecutions", False) == "true":
+            self.profile_executions = True
+        self._actProfile.setChecked(self.profile_executions)
+        if settings.value("VirtualizeBlocks", False) == "true":
+            self.virtualize_blocks = True
+        self._actVirtualize.setChecked(self.virtualize_blocks)
+        update_mode = settings.value("ViewportUpdateMode", "smart")
+        if update_mode in View.UPDATE_MODES:
+            self.viewport_update_mode = update_mode
         LOGGER.info("Loaded settings under Bycelium/Pyflow")
 
     def writeSettings(self):
@@ -542,6 +699,12 @@ class Window(QMainWindow):
         settings.setValue("size", self.size())
         settings.setValue("isMaximized", self.isMaximized())
         settings.setValue("NeverShowExitPrompt", self.never_show_exit_prompt)
+        settings.setValue("PipelinedExecution", self.pipelined_execution)
+        settings.setValue("ParallelBranches", self.parallel_branches)
+        settings.setValue("CacheResults", self.cache_results)
+        settings.setValue("ProfileExecutions", self.profile_executions)
+        settings.setValue("VirtualizeBlocks", self.virtualize_blocks)
+        settings.setValue("ViewportUpdateMode", self.viewport_update_mode)
         LOGGER.info("Saved settings under Bycelium/Pyflow")
 
     def setActiveSubWindow(self, window):
@@ -4,6 +4,7 @@
 """Utilitaries for logging in Pyflow."""
 
 from time import time
+import argparse
 import logging
 from functools import wraps
 from colorama import Fore, Style
@@ -42,6 +43,23 @@ def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
 
+def add_verbose_argument(parser: argparse.ArgumentParser, default: str = "INFO"):
+    """Add the -v/--verbose option, setting the logging level, to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser of the command line arguments.
+        default (str, optional): Name of the default logging level. Defaults to "INFO".
+    """
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        type=str,
+        choices=logging._nameToLevel.keys(),  # pylint:disable=protected-access
+        help="set logging level",
+        default=default,
+    )
+
+
 class PyflowHandler(logging.StreamHandler):
 
     """Custom logging handler for Pyflow."""
@@ -0,0 +1,289 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Headless runner of interactive python graphs.
+
+Runs the executable blocks of .ipyg files in a jupyter kernel in topological order
+and writes their outputs back into the files, without importing Qt:
+
+    python -m pyflow run graph.ipyg other_graph.ipyg --jobs 2
+
+"""
+
+import argparse
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Dict, List, Optional
+
+from jupyter_client.manager import start_new_kernel
+
+from pyflow.core.outputs import (
+    OUTPUT_MESSAGE_TYPES,
+    append_output,
+    is_rich,
+    message_to_bundle,
+    message_to_output,
+    stream_output,
+)
+from pyflow.logging import add_verbose_argument, get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def block_source(block: dict) -> Optional[str]:
+    """Source code run by a serialized block, None if the block is not executable."""
+    block_type = block["block_type"]
+    if block_type == "CodeBlock":
+        return block.get("source", "")
+    if block_type == "SliderBlock":
+        return f"{block.get('var_name', 'slider_value')} = {block.get('value', '0.0')}"
+    if block_type == "DrawingBlock":
+        drawing = json.loads(block["drawing"]) if "drawing" in block else []
+        return f"drawing = {repr(drawing)}"
+    return None
+
+
+def topological_order(data: dict) -> List[dict]:
+    """Executable blocks of a serialized graph, in topological order.
+
+    Blocks with no dependency between them keep the order of the file.
+
+    Raises:
+        ValueError: If the edges of the graph form a cycle.
+
+    """
+    blocks = OrderedDict(
+        (block["id"], block)
+        for block in data["blocks"]
+        if block_source(block) is not None
+    )
+    outputs: Dict[int, List[int]] = {block_id: [] for block_id in blocks}
+    in_degree = {block_id: 0 for block_id in blocks}
+    for edge in data["edges"]:
+        source, destination = edge["source"]["block"], edge["destination"]["block"]
+        if source in blocks and destination in blocks:
+            outputs[source].append(destination)
+            in_degree[destination] += 1
+
+    ready = [block_id for block_id in blocks if in_degree[block_id] == 0]
+    order = []
+    while ready:
+        block_id = ready.pop(0)
+        order.append(blocks[block_id])
+        for destination in outputs[block_id]:
+            in_degree[destination] -= 1
+            if in_degree[destination] == 0:
+                ready.append(destination)
+    if len(order) != len(blocks):
+        raise ValueError("The graph contains a cycle.")
+    return order
+
+
+class BlockResult:
+
+    """Result of the execution of a block."""
+
+    def __init__(self, block: dict, status: str, wall_time: float = 0.0):
+        """Result of the execution of a block.
+
+        Args:
+            block: Serialized block.
+            status: "ok", "error" or "skipped" if one of its inputs failed.
+            wall_time: Time spent running the block, in seconds.
+
+        """
+        self.block = block
+        self.status = status
+        self.wall_time = wall_time
+
+    def __str__(self) -> str:
+        title = self.block.get("title", self.block["id"])
+        return f"{self.wall_time:8.3f}s  {self.status:7}  {title}"
+
+
+class GraphRunner:
+
+    """Run the blocks of an interactive python graph file in a jupyter kernel."""
+
+    def __init__(self, path: str, output_path: str = None, timeout: float = None):
+        """Run the blocks of an interactive python graph file in a jupyter kernel.
+
+        Args:
+            path: Path of the .ipyg file to run.
+            output_path: Path to write the graph with its outputs to, `path` if None.
+            timeout: Maximum time to run each block, in seconds.
+
+        """
+        self.path = path
+        self.output_path = output_path if output_path is not None else path
+        self.timeout = timeout
+        with open(path, "r", encoding="utf-8") as file:
+            self.data = json.load(file)
+        self.results: List[BlockResult] = []
+        self.kernel_manager = None
+
+    @property
+    def succeeded(self) -> bool:
+        """True if every block ran without error."""
+        return all(result.status == "ok" for result in self.results)
+
+    def run(self) -> List[BlockResult]:
+        """Run every executable block, skipping the ones depending on failed blocks."""
+        order = topological_order(self.data)
+        inputs: Dict[int, List[int]] = {block["id"]: [] for block in order}
+        for edge in self.data["edges"]:
+            destination = edge["destination"]["block"]
+            if destination in inputs:
+                inputs[destination].append(edge["source"]["block"])
+
+        # Same working directory as a kernel of the GUI
+        working_directory = os.path.dirname(os.path.abspath(self.path))
+        self.kernel_manager, client = start_new_kernel(cwd=working_directory)
+        failed = set()
+        try:
+            for block in order:
+                if any(block_id in failed for block_id in inputs[block["id"]]):
+                    result = BlockResult(block, "skipped")
+                else:
+                    result = self.run_block(client, block)
+                if result.status != "ok":
+                    failed.add(block["id"])
+                self.results.append(result)
+                LOGGER.info("%s: %s", os.path.basename(self.path), result)
+        finally:
+            client.stop_channels()
+            self.kernel_manager.shutdown_kernel(now=True)
+
+        with open(self.output_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps(self.data, indent=4))
+        return self.results
+
+    def run_block(self, client, block: dict) -> BlockResult:
+        """Run a block and store its outputs like a CodeBlock would."""
+        outputs: List[dict] = []
+        displays: Dict[str, List[dict]] = {}
+        clear_pending = False
+
+        def output_hook(message: dict):
+            nonlocal clear_pending
+            message_type, content = message["msg_type"], message["content"]
+            if message_type not in OUTPUT_MESSAGE_TYPES:
+                return
+            display_id = content.get("transient", {}).get("display_id")
+            if message_type == "update_display_data":
+                for output in displays.get(display_id, []):
+                    output.update(data=content["data"], metadata=content["metadata"])
+                return
+            if message_type == "clear_output" and content.get("wait", False):
+                # Outputs are only cleared once the next output arrives
+                clear_pending = True
+                return
+            if message_type == "clear_output" or clear_pending:
+                outputs.clear()
+                displays.clear()
+                clear_pending = False
+                if message_type == "clear_output":
+                    return
+            if message_type in ("display_data", "execute_result") and (
+                is_rich(content) or display_id is not None
+            ):
+                # Like in a CodeBlock, the last line is not replaced by the next text
+                if outputs and outputs[-1]["output_type"] == "stream":
+                    if not outputs[-1]["text"].endswith("\n"):
+                        outputs[-1]["text"] += "\n"
+                output = message_to_bundle(message_type, content)
+                output.pop("transient", None)
+                displays.setdefault(display_id, []).append(output)
+                outputs.append(output)
+                return
+            output, _ = message_to_output(content)
+            append_output(outputs, stream_output(output))
+
+        start_time = time()
+        try:
+            reply = client.execute_interactive(
+                block_source(block),
+                allow_stdin=False,
+                timeout=self.timeout,
+                output_hook=output_hook,
+            )
+            status = reply["content"]["status"]
+        except TimeoutError:
+            self.kernel_manager.interrupt_kernel()
+            status = "error"
+            timeout_message = f"\nTimeout: the block ran for more than {self.timeout}s"
+            if outputs and outputs[-1]["output_type"] == "stream":
+                outputs[-1]["text"] += timeout_message
+            else:
+                outputs.append(stream_output(timeout_message))
+        wall_time = time() - start_time
+
+        if block["block_type"] == "CodeBlock":
+            # Printed text is only saved in the stream outputs
+            block.pop("stdout", None)
+            block["outputs"] = outputs
+        return BlockResult(block, "ok" if status == "ok" else "error", wall_time)
+
+
+def run_graph(path: str, output_path: str = None, timeout: float = None) -> bool:
+    """Run a graph file and print the wall time of its blocks.
+
+    Returns:
+        True if every block ran without error.
+
+    """
+    start_time = time()
+    try:
+        runner = GraphRunner(path, output_path, timeout)
+        results = runner.run()
+    except (OSError, ValueError) as error:
+        LOGGER.error("%s: %s", path, error)
+        return False
+    lines = [f"{path} ({time() - start_time:.3f}s)"]
+    lines += [f"  {result}" for result in results]
+    print("\n".join(lines), flush=True)
+    return runner.succeeded
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point of `python -m pyflow run`.
+
+    Returns:
+        The exit code, 0 if every block of every graph ran without error.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m pyflow run",
+        description="Run interactive python graphs without a display.",
+    )
+    parser.add_argument("paths", nargs="+", help="paths of the .ipyg files to run")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="number of graphs to run at once"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="path to write the graph with its outputs to, only with a single graph",
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, help="maximum time to run each block, in seconds"
+    )
+    add_verbose_argument(parser, default="WARNING")
+    args = parser.parse_args(argv)
+    if args.output is not None and len(args.paths) > 1:
+        parser.error("--output can only be used with a single graph")
+
+    logging.basicConfig(level=args.verbose.upper())
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        successes = list(
+            executor.map(
+                lambda path: run_graph(path, args.output, args.timeout), args.paths
+            )
+        )
+    return 0 if all(successes) else 1
@@ -0,0 +1,255 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the ExecutionGraph.
+
+The execution graph indexes the active edges of a scene, the edges whose sockets
+are both on, by the blocks they link. It is updated edge by edge when edges are
+added, removed, reconnected or when a socket is toggled, and caches the
+topological order, the ancestors and the descendants of the blocks until
+the next change.
+
+The graph is kept acyclic: an edge that would close a cycle is not indexed.
+The topological order is maintained online with the algorithm of Pearce and Kelly,
+so checking a new edge only visits the blocks between its ends in that order.
+
+"""
+
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.blocks.block import Block
+    from pyflow.core.edge import Edge
+    from pyflow.core.socket import Socket
+
+LOGGER = get_logger(__name__)
+
+
+class ExecutionGraph:
+
+    """Index of the blocks linked by the active edges of a scene."""
+
+    def __init__(self):
+        """Index of the blocks linked by the active edges of a scene."""
+        # Blocks linked by each active edge, from source to destination
+        self.links: Dict["Edge", Tuple["Block", "Block"]] = {}
+        # Active edges leading to and from each block, with the block at the other end
+        self._inputs: Dict["Block", Dict["Edge", "Block"]] = {}
+        self._outputs: Dict["Block", Dict["Edge", "Block"]] = {}
+
+        # Position of each linked block in a topological order, with gaps
+        self._position: Dict["Block", int] = {}
+        self._next_position = 0
+
+        self._order: Optional[List["Block"]] = None
+        self._ancestors: Dict["Block", FrozenSet["Block"]] = {}
+        self._descendants: Dict["Block", FrozenSet["Block"]] = {}
+
+    def update_edge(self, edge: "Edge") -> bool:
+        """Index an edge again after it was added to a scene, reconnected or toggled.
+
+        Returns:
+            False if the edge would create a cycle, in which case it is not indexed.
+
+        """
+        link = None
+        source, destination = edge.source_socket, edge.destination_socket
+        if (
+            edge.scene() is not None
+            and source is not None
+            and destination is not None
+            and source.is_on
+            and destination.is_on
+        ):
+            link = (source.block, destination.block)
+        if self.links.get(edge) == link:
+            return True
+        self.remove_edge(edge)
+        if link is None:
+            return True
+
+        source, destination = link
+        for block in link:
+            if block not in self._position:
+                self._position[block] = self._next_position
+                self._next_position += 1
+        if not self._reorder(source, destination):
+            LOGGER.warning(
+                "Edge from %s to %s would create a cycle.",
+                getattr(source, "title", source),
+                getattr(destination, "title", destination),
+            )
+            self._forget_unlinked(link)
+            return False
+        self.links[edge] = link
+        self._outputs.setdefault(source, {})[edge] = destination
+        self._inputs.setdefault(destination, {})[edge] = source
+        self._invalidate()
+        return True
+
+    def remove_edge(self, edge: "Edge"):
+        """Forget an edge, once it is removed from the scene."""
+        link = self.links.pop(edge, None)
+        if link is None:
+            return
+        source, destination = link
+        for index, block in ((self._outputs, source), (self._inputs, destination)):
+            del index[block][edge]
+            if not index[block]:
+                del index[block]
+        self._forget_unlinked(link)
+        self._invalidate()
+
+    def _forget_unlinked(self, blocks: Iterable["Block"]):
+        """Forget the position of the given blocks that are no longer linked."""
+        for block in blocks:
+            if block not in self._inputs and block not in self._outputs:
+                self._position.pop(block, None)
+
+    def update_socket(self, socket: "Socket") -> bool:
+        """Index the edges of a socket again, after it was toggled.
+
+        Returns:
+            False if one of the edges would create a cycle.
+
+        """
+        # Every edge is indexed again, even after one of them failed
+        results = [self.update_edge(edge) for edge in socket.edges]
+        return all(results)
+
+    def creates_cycle(self, source: "Block", destination: "Block") -> bool:
+        """Return True if an edge from source to destination would create a cycle."""
+        if source is destination:
+            return True
+        if source not in self._position or destination not in self._position:
+            return False
+        if self._position[destination] > self._position[source]:
+            return False
+        return self._affected(destination, self._outputs, source) is None
+
+    def _affected(
+        self,
+        start: "Block",
+        index: Dict["Block", Dict["Edge", "Block"]],
+        bound: "Block",
+    ) -> Optional[List["Block"]]:
+        """Blocks reachable from start, between start and bound in the current order.
+
+        Returns:
+            The blocks found, None if bound itself is reachable.
+
+        """
+        forward = index is self._outputs
+        limit = self._position[bound]
+        reached = {start}
+        to_visit = [start]
+        while to_visit:
+            for other in index.get(to_visit.pop(), {}).values():
+                if other is bound:
+                    return None
+                position = self._position[other]
+                in_range = position < limit if forward else position > limit
+                if in_range and other not in reached:
+                    reached.add(other)
+                    to_visit.append(other)
+        return list(reached)
+
+    def _reorder(self, source: "Block", destination: "Block") -> bool:
+        """Update the topological order to add an edge, if it creates no cycle."""
+        if source is destination:
+            return False
+        if self._position[destination] > self._position[source]:
+            return True
+        after = self._affected(destination, self._outputs, source)
+        if after is None:
+            return False
+        before = self._affected(source, self._inputs, destination)
+
+        # Blocks leading to the source move before the ones following the destination
+        key = self._position.__getitem__
+        before.sort(key=key)
+        after.sort(key=key)
+        positions = sorted(map(key, before + after))
+        for block, position in zip(before + after, positions):
+            self._position[block] = position
+        return True
+
+    def clear(self):
+        """Forget every edge."""
+        self.links.clear()
+        self._inputs.clear()
+        self._outputs.clear()
+        self._position.clear()
+        self._invalidate()
+
+    def _invalidate(self):
+        """Drop the cached orders and traversals."""
+        self._order = None
+        self._ancestors.clear()
+        self._descendants.clear()
+
+    def input_edges(self, block: "Block") -> List["Edge"]:
+        """Active edges leading to a block."""
+        return list(self._inputs.get(block, {}))
+
+    def output_edges(self, block: "Block") -> List["Edge"]:
+        """Active edges leading from a block."""
+        return list(self._outputs.get(block, {}))
+
+    def input_blocks(self, block: "Block") -> List["Block"]:
+        """Blocks linked to the inputs of a block, once per active edge."""
+        return list(self._inputs.get(block, {}).values())
+
+    def output_blocks(self, block: "Block") -> List["Block"]:
+        """Blocks linked to the outputs of a block, once per active edge."""
+        return list(self._outputs.get(block, {}).values())
+
+    def ancestors(self, block: "Block") -> FrozenSet["Block"]:
+        """Blocks a block depends on, directly or not."""
+        if block not in self._ancestors:
+            self._ancestors[block] = frozenset(
+                self._reachable([block], self._inputs) - {block}
+            )
+        return self._ancestors[block]
+
+    def descendants(self, block: "Block") -> FrozenSet["Block"]:
+        """Blocks depending on a block, directly or not."""
+        if block not in self._descendants:
+            self._descendants[block] = frozenset(
+                self._reachable([block], self._outputs) - {block}
+            )
+        return self._descendants[block]
+
+    def upstream(self, blocks: Iterable["Block"]) -> Set["Block"]:
+        """The given blocks and every block they depend on."""
+        return self._reachable(blocks, self._inputs)
+
+    def downstream(self, blocks: Iterable["Block"]) -> Set["Block"]:
+        """The given blocks and every block depending on them."""
+        return self._reachable(blocks, self._outputs)
+
+    @staticmethod
+    def _reachable(
+        blocks: Iterable["Block"], index: Dict["Block", Dict["Edge", "Block"]]
+    ) -> Set["Block"]:
+        """Blocks reachable from the given blocks by following an index."""
+        reached = set(blocks)
+        to_visit = list(reached)
+        while to_visit:
+            for other in index.get(to_visit.pop(), {}).values():
+                if other not in reached:
+                    reached.add(other)
+                    to_visit.append(other)
+        return reached
+
+    def topological_order(self) -> List["Block"]:
+        """Linked blocks, each one after all the blocks it depends on."""
+        if self._order is None:
+            self._order = sorted(self._position, key=self._position.__getitem__)
+        return list(self._order)
+
+    def sort(self, blocks: Iterable["Block"]) -> List["Block"]:
+        """Sort blocks in topological order, blocks without any edge coming first."""
+        return sorted(blocks, key=lambda block: self._position.get(block, -1))
@@ -3,7 +3,8 @@
 
 """ Module for the handling an OCBScene history. """
 
-from typing import TYPE_CHECKING, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 import logging
 
 from pyflow.core.history import History
@@ -13,25 +14,44 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Serialized blocks and edges of a scene, by kind then by id
+SceneState = Dict[str, Dict[int, OrderedDict]]
+# Serialized items before and after a change, None if the item did not exist
+ItemChange = Tuple[Optional[OrderedDict], Optional[OrderedDict]]
+
 
 class SceneHistory(History):
     """Helper object to handle undo/redo operations on an Scene.
 
+    Each checkpoint only stores the blocks and edges that changed since the previous
+    checkpoint, by id, with their serialized state before and after the change.
+    Items cache their serialized state until they change, so a checkpoint costs
+    time and memory in proportion to the change rather than to the scene.
+
+    Every `keyframe_interval` checkpoints, a keyframe references the state of every
+    item so that any checkpoint can be reached without replaying the whole stack.
+
     Args:
         scene: Scene reference.
         max_stack: Maximum size of the history stack (number of available undo).
+        keyframe_interval: Number of checkpoints between two keyframes.
 
     """
 
-    def __init__(self, scene: "Scene", max_stack: int = 50):
+    def __init__(
+        self, scene: "Scene", max_stack: int = 50, keyframe_interval: int = 10
+    ):
         self.scene = scene
-        self._hash: Optional[str] = None
+        self.keyframe_interval = keyframe_interval
+        # Serialized scene at the checkpoint of index `state_index`
+        self.state: SceneState = {"blocks": {}, "edges": {}}
+        self.state_index = -1
         super().__init__(max_stack)
 
     def checkpoint(
         self, description: str, set_modified=True, erase_previous_checkpoints=False
     ):
-        """Store a snapshot of the scene in the history stack.
+        """Store the changes of the scene in the history stack.
 
         Args:
             description: Description given to this checkpoint.
@@ -39,44 +59,140 @@ class SceneHistory(History):
             erase_previous_checkpoints: Whether the previous checkpoints should be erased
 
         """
-
-        serialized_scene = self.scene.serialize()
-
-        new_serialized_scene_hash = hash(str(serialized_scene))
-        if not self.should_checkpoint(new_serialized_scene_hash):
+        changes = self.changes()
+        if not self.should_checkpoint(changes):
             return
 
         if erase_previous_checkpoints:
             self.history_stack = []
 
-        self._hash = new_serialized_scene_hash
-
-        history_stamp = {
-            "description": description,
-            "snapshot": serialized_scene,
-        }
+        self.apply(self.state, changes)
+        history_stamp = {"description": description, "id": self.scene.id, **changes}
+        index = min(self.current + 1, len(self.history_stack))
+        keyframe = self.last_keyframe(index - 1)
+        if keyframe is None or index - keyframe >= self.keyframe_interval:
+            history_stamp["keyframe"] = self.copy_state(self.state)
         self.store(history_stamp)
+        self.state_index = self.current
+
         if set_modified:
             self.scene.has_been_modified = True
 
+    def changes(self) -> Dict[str, Dict[int, ItemChange]]:
+        """Blocks and edges that changed since the state of the last checkpoint.
+
+        Items that did not change give back the serialized state already stored.
+
+        """
+        changes = {"blocks": {}, "edges": {}}
+        seen = {"blocks": set(), "edges": set()}
+        indexes = {"blocks": self.scene.blocks, "edges": self.scene.edges}
+        for kind, items in indexes.items():
+            for item in items:
+                seen[kind].add(item.id)
+                previous = self.state[kind].get(item.id)
+                serialized = item.cached_serialize()
+                if serialized is not previous and serialized != previous:
+                    changes[kind][item.id] = (previous, serialized)
+
+        for kind, items in self.state.items():
+            for item_id, previous in items.items():
+                if item_id not in seen[kind]:
+                    changes[kind][item_id] = (previous, None)
+        return changes
+
+    def should_checkpoint(self, changes: Dict[str, Dict[int, ItemChange]]) -> bool:
+        """Return true if a checkpoint should be created.
+
+        This is not the case when nothing changed since the previous checkpoint.
+        This is the case if there was no previous checkpoint
+        (as it is the case when the scene is first loaded)."""
+
+        if not self.history_stack:
+            return True
+
+        return any(changes.values())
+
     def restore(self):
-        """Restore the scene using the snapshot pointed by current in the history stack."""
+        """Restore the scene to the checkpoint pointed by current in the history stack.
+
+        Only the blocks and edges changed between the state of the scene
+        and the checkpoint are updated, the other items are kept as they are.
+
+        """
 
         stamp = self.restored_data()
 
         if stamp is not None:
-            snapshot = stamp["snapshot"]
+            first, last = sorted((self.state_index, self.current))
+            changed = {"blocks": set(), "edges": set()}
+            for changes in self.history_stack[first + 1 : last + 1]:
+                for kind, ids in changed.items():
+                    ids.update(changes[kind])
+            previous_edges = [self.state["edges"].get(i) for i in changed["edges"]]
+
+            self.state = self.state_at(self.current)
+            self.state_index = self.current
             logger.debug("Restored [%s]: %s", self.current, stamp["description"])
-            self.scene.deserialize(snapshot)
 
-    def should_checkpoint(self, new_serialized_scene_hash: str) -> bool:
-        """Return true if a checkpoint should be created.
+            # The sockets of the blocks linked by the changed edges may have changed
+            for data in previous_edges + [
+                self.state["edges"].get(i) for i in changed["edges"]
+            ]:
+                if data is not None:
+                    changed["blocks"].add(data["source"]["block"])
+                    changed["blocks"].add(data["destination"]["block"])
 
-        This is not the case when the previous checkpoint is the same as the new one.
-        This is the case if there was no previous hash
-        (as it is the case when the scene is first loaded)."""
+            self.scene.id = stamp["id"]
+            self.scene.deserialize_items(
+                {i: self.state["blocks"].get(i) for i in changed["blocks"]},
+                {i: self.state["edges"].get(i) for i in changed["edges"]},
+            )
 
-        if self._hash is None:
-            return True
+    def state_at(self, index: int) -> SceneState:
+        """Serialized scene at a checkpoint of the history stack.
+
+        The changes are replayed from the state of the last checkpoint
+        or from the closest keyframe before the checkpoint, whichever is closer.
+
+        """
+        state, start = self.state, self.state_index
+        keyframe = self.last_keyframe(index)
+        if keyframe is not None and index - keyframe < abs(index - start):
+            state = self.copy_state(self.history_stack[keyframe]["keyframe"])
+            start = keyframe
+        for stamp in self.history_stack[start + 1 : index + 1]:
+            self.apply(state, stamp)
+        for stamp in reversed(self.history_stack[index + 1 : start + 1]):
+            self.apply(state, stamp, undo=True)
+        return state
+
+    def last_keyframe(self, index: int) -> Optional[int]:
+        """Index of the last keyframe at or before an index, None if there is none."""
+        for keyframe in range(index, max(-1, index - self.keyframe_interval), -1):
+            if "keyframe" in self.history_stack[keyframe]:
+                return keyframe
+        return None
+
+    @staticmethod
+    def apply(state: SceneState, changes: Dict, undo: bool = False):
+        """Apply the changes of a checkpoint to a state in place.
 
-        return self._hash != new_serialized_scene_hash
+        Args:
+            state: State to modify.
+            changes: Changes of the blocks and edges, by id.
+            undo: If True, revert the changes instead.
+
+        """
+        for kind, items in state.items():
+            for item_id, (previous, serialized) in changes[kind].items():
+                value = previous if undo else serialized
+                if value is None:
+                    items.pop(item_id, None)
+                else:
+                    items[item_id] = value
+
+    @staticmethod
+    def copy_state(state: SceneState) -> SceneState:
+        """Copy of a state, sharing the serialized items."""
+        return {kind: dict(items) for kind, items in state.items()}
@@ -3,21 +3,37 @@
 
 """ Module for the base Scene."""
 
+import collections
 import math
 import json
 from os import path
 from types import FunctionType, ModuleType
-from typing import TYPE_CHECKING, Any, List, OrderedDict, Union
-
-from PyQt5.QtCore import QLine, QRectF, QThreadPool
-from PyQt5.QtGui import QColor, QPainter, QPen
-from PyQt5.QtWidgets import QGraphicsScene
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    OrderedDict,
+    Set,
+    Union,
+)
+
+from PyQt5.QtCore import QLineF, QPointF, QRectF, QTimer
+from PyQt5.QtGui import QBrush, QColor, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsScene
 
 from pyflow.core.serializable import Serializable
 from pyflow.blocks.block import Block
+from pyflow.blocks.executableblock import ExecutableBlock
 from pyflow.core.edge import Edge
+from pyflow.core.socket import Socket
+from pyflow.core.executable import ExecutableState
+from pyflow.scene.graph import ExecutionGraph
 from pyflow.scene.history import SceneHistory
 from pyflow.core.kernel import Kernel
+from pyflow.scene.scheduler import BranchScheduler
 from pyflow.scene.from_ipynb_conversion import ipynb_to_ipyg
 from pyflow.scene.to_ipynb_conversion import ipyg_to_ipynb
 from pyflow import blocks
@@ -25,6 +41,9 @@ from pyflow.logging import log_init_time, get_logger
 
 LOGGER = get_logger(__name__)
 
+GRID_MIN_SPACING = 5  # Minimal spacing in pixels between two drawn grid lines
+GRID_CACHED_TILES = 8  # Number of sizes of the grid tile kept in cache
+
 if TYPE_CHECKING:
     from pyflow.graphics.view import View
 
@@ -53,6 +72,8 @@ class Scene(QGraphicsScene, Serializable):
         self._grid_light_color = QColor(grid_light_color)
         self.grid_size = grid_size
         self.grid_squares = grid_squares
+        # Brushes repeating a tile of the grid, by size of the tile in pixels
+        self._grid_brushes: "OrderedDict[int, QBrush]" = collections.OrderedDict()
 
         self.width, self.height = width, height
         self.setSceneRect(-self.width // 2, -self.height // 2, self.width, self.height)
@@ -61,11 +82,31 @@ class Scene(QGraphicsScene, Serializable):
         self._has_been_modified = False
         self._has_been_modified_listeners = []
 
+        # Indexes of the blocks and edges of the scene, kept by addItem and removeItem
+        self.items_by_id: Dict[int, Union[Block, Edge]] = {}
+        self.blocks: Set[Block] = set()
+        self.edges: Set[Edge] = set()
+        self.graph = ExecutionGraph()
+
+        # Area seen by the views, the blocks outside show placeholders if virtualized
+        self.visible_rect: Optional[QRectF] = None
+        self._virtualized = False
+        # True when zoomed out, every block and edge is drawn with less details
+        self._low_detail = False
+        self._device_cache = False
+
+        # Blocks whose sockets are laid out again once the pending events are handled
+        self._sockets_to_update: Set[Block] = set()
+        self._sockets_timer = QTimer()
+        self._sockets_timer.setSingleShot(True)
+        self._sockets_timer.setInterval(0)
+        self._sockets_timer.timeout.connect(self.update_scheduled_sockets)
+
         self.history = SceneHistory(self)
         self.history.checkpoint("Initialized scene", set_modified=False)
 
         self.kernel = Kernel()
-        self.threadpool = QThreadPool()
+        self.branch_scheduler = BranchScheduler(self)
 
     @property
     def has_been_modified(self):
@@ -78,6 +119,85 @@ class Scene(QGraphicsScene, Serializable):
         for callback in self._has_been_modified_listeners:
             callback()
 
+    @property
+    def virtualized(self) -> bool:
+        """True if the blocks outside of the views show a placeholder.
+
+        Their widgets are hidden until they enter the views or are selected.
+
+        """
+        return self._virtualized
+
+    @virtualized.setter
+    def virtualized(self, value: bool):
+        self._virtualized = value
+        for block in self.blocks:
+            self.update_virtualization(block)
+
+    @property
+    def low_detail(self) -> bool:
+        """True if blocks are drawn as rectangles with their title and edges as lines.
+
+        The widgets of the blocks are hidden, this is used when zoomed out.
+
+        """
+        return self._low_detail
+
+    @low_detail.setter
+    def low_detail(self, value: bool):
+        if value == self._low_detail:
+            return
+        self._low_detail = value
+        for block in self.blocks:
+            self.update_virtualization(block)
+        self.update()
+
+    def set_visible_rect(self, rect: QRectF):
+        """Set the area seen by the views, materializing the blocks entering it."""
+        self.visible_rect = rect
+        if self.virtualized:
+            for block in self.blocks:
+                self.update_virtualization(block)
+
+    @property
+    def device_cache(self) -> bool:
+        """True if blocks keep what they paint in a pixmap, at the resolution of the view.
+
+        Moving items over a block then draws the pixmap instead of painting the block.
+        It costs memory for each block seen and is disabled by default.
+
+        """
+        return self._device_cache
+
+    @device_cache.setter
+    def device_cache(self, value: bool):
+        self._device_cache = value
+        for block in self.blocks:
+            self.update_cache_mode(block)
+
+    def update_cache_mode(self, block: Block):
+        """Cache what a block paints in a pixmap if the device cache is enabled."""
+        if self.device_cache:
+            block.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+        else:
+            block.setCacheMode(QGraphicsItem.CacheMode.NoCache)
+
+    def update_virtualization(self, block: Block):
+        """Show the widgets of a block if it is needed, its placeholder otherwise."""
+        if self.low_detail:
+            block.virtualize()
+        elif (
+            not self.virtualized
+            or block.isSelected()
+            or (
+                self.visible_rect is not None
+                and self.visible_rect.intersects(block.sceneBoundingRect())
+            )
+        ):
+            block.materialize()
+        else:
+            block.virtualize()
+
     def getItemById(self, item_id: int) -> Any:
         """Return the item scene with the corresponding id.
 
@@ -87,10 +207,44 @@ class Scene(QGraphicsScene, Serializable):
         Returns:
             Any: Item with corresponding id, None if not found.
         """
+        item = self.items_by_id.get(item_id)
+        if item is not None and item.id == item_id:
+            return item
+        # Sockets are not indexed, nor items whose id changed once in the scene
         for item in self.items():
             if hasattr(item, "id") and item.id == item_id:
                 return item
 
+    def addItem(self, item: QGraphicsItem):
+        """Add an item to the scene, indexing it if it is a block or an edge."""
+        super().addItem(item)
+        if isinstance(item, Block):
+            self.blocks.add(item)
+            self.update_virtualization(item)
+            self.update_cache_mode(item)
+        elif isinstance(item, Edge):
+            self.edges.add(item)
+            if not self.graph.update_edge(item):
+                # Edges closing a cycle are rejected
+                item.remove()
+                return
+        else:
+            return
+        self.items_by_id[item.id] = item
+
+    def removeItem(self, item: QGraphicsItem):
+        """Remove an item from the scene and from the indexes."""
+        super().removeItem(item)
+        if isinstance(item, Block):
+            self.blocks.discard(item)
+        elif isinstance(item, Edge):
+            self.edges.discard(item)
+            self.graph.remove_edge(item)
+        else:
+            return
+        if self.items_by_id.get(item.id) is item:
+            del self.items_by_id[item.id]
+
     def addHasBeenModifiedListener(self, callback: FunctionType):
         """Add a callback that will trigger when the scene has been modified."""
         self._has_been_modified_listeners.append(callback)
@@ -106,44 +260,73 @@ class Scene(QGraphicsScene, Serializable):
         return selected_blocks, selected_edges
 
     def drawBackground(self, painter: QPainter, rect: QRectF):
-        """Draw the Scene background."""
-        super().drawBackground(painter, rect)
-        self.drawGrid(painter, rect)
-
-    def drawGrid(self, painter: QPainter, rect: QRectF):
-        """Draw the background grid."""
-        left = int(math.floor(rect.left()))
-        top = int(math.floor(rect.top()))
-        right = int(math.ceil(rect.right()))
-        bottom = int(math.ceil(rect.bottom()))
-
-        first_left = left - (left % self.grid_size)
-        first_top = top - (top % self.grid_size)
-
-        # Compute all lines to be drawn
-        lines_light, lines_dark = [], []
-        for x in range(first_left, right, self.grid_size):
-            if x % (self.grid_size * self.grid_squares) != 0:
-                lines_light.append(QLine(x, top, x, bottom))
-            else:
-                lines_dark.append(QLine(x, top, x, bottom))
+        """Draw the Scene background, repeating a tile of the grid."""
+        transform = painter.worldTransform()
+        tile_size = self.grid_size * self.grid_squares
+        brush = self.grid_brush(
+            tile_size * math.hypot(transform.m11(), transform.m12())
+        )
+        if brush is None:
+            super().drawBackground(painter, rect)
+            return
+        # The tile is drawn in pixels to avoid resampling it, from the scene origin
+        painter.save()
+        painter.resetTransform()
+        painter.setBrushOrigin(transform.map(QPointF(0, 0)))
+        painter.fillRect(transform.mapRect(rect).toAlignedRect(), brush)
+        painter.restore()
+
+    def grid_brush(self, tile_pixels: float) -> Optional[QBrush]:
+        """Brush drawing the background and its grid, with tiles of the given size.
+
+        A tile holds grid_squares by grid_squares cells of the grid. It is rendered
+        once for each size in pixels, and kept for the GRID_CACHED_TILES last sizes.
+        Grid lines closer than GRID_MIN_SPACING pixels are left out,
+        the light lines first, then the whole grid.
 
-        for y in range(first_top, bottom, self.grid_size):
-            if y % (self.grid_size * self.grid_squares) != 0:
-                lines_light.append(QLine(left, y, right, y))
-            else:
-                lines_dark.append(QLine(left, y, right, y))
+        Returns:
+            The brush, None if there is no grid to draw at this size.
 
-        # Draw the lines using the painter
+        """
+        pixels = round(tile_pixels)
+        if pixels < GRID_MIN_SPACING:
+            return None
+        if pixels in self._grid_brushes:
+            self._grid_brushes.move_to_end(pixels)
+        else:
+            self._grid_brushes[pixels] = QBrush(self._render_grid_tile(pixels))
+            if len(self._grid_brushes) > GRID_CACHED_TILES:
+                self._grid_brushes.popitem(last=False)
+        return self._grid_brushes[pixels]
+
+    def _render_grid_tile(self, pixels: int) -> QPixmap:
+        """Render a tile of the grid, with the given size in pixels."""
+        tile_size = self.grid_size * self.grid_squares
+        scale = pixels / tile_size
+
+        tile = QPixmap(pixels, pixels)
+        tile.fill(self._background_color)
+        painter = QPainter(tile)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.scale(scale, scale)
+
+        # The dark lines are on the borders of the tile, half of them on each side
         pen = QPen(self._grid_color)
         pen.setWidth(2)
         painter.setPen(pen)
-        painter.drawLines(*lines_dark)
-
-        pen = QPen(self._grid_light_color)
-        pen.setWidth(1)
-        painter.setPen(pen)
-        painter.drawLines(*lines_light)
+        for position in (0, tile_size):
+            painter.drawLine(QLineF(position, 0, position, tile_size))
+            painter.drawLine(QLineF(0, position, tile_size, position))
+
+        if self.grid_size * scale >= GRID_MIN_SPACING:
+            pen = QPen(self._grid_light_color)
+            pen.setWidth(1)
+            painter.setPen(pen)
+            for position in range(self.grid_size, tile_size, self.grid_size):
+                painter.drawLine(QLineF(position, 0, position, tile_size))
+                painter.drawLine(QLineF(0, position, tile_size, position))
+        painter.end()
+        return tile
 
     def save(self, filepath: str):
         """Save the scene into filepath."""
@@ -200,7 +383,7 @@ class Scene(QGraphicsScene, Serializable):
         # Add filepath to kernel path
         dir_path = repr(path.abspath(path.dirname(filepath)))
         setup_path_code = f'__import__("os").chdir({dir_path})'
-        self.kernel.execute(setup_path_code)
+        self.kernel.add_startup_code(setup_path_code)
 
     def load_from_json(self, filepath: str) -> OrderedDict:
         """
@@ -216,8 +399,22 @@ class Scene(QGraphicsScene, Serializable):
     def clear(self):
         """Clear the scene from all items."""
         self.has_been_modified = False
+        self.items_by_id.clear()
+        self.blocks.clear()
+        self.edges.clear()
+        self.graph.clear()
+        self._sockets_to_update.clear()
         return super().clear()
 
+    def restart_kernel(self):
+        """Restart the kernel, every block has to be run again."""
+        self.kernel.restart()
+        for item in self.blocks:
+            if isinstance(item, ExecutableBlock):
+                if item.run_state in (ExecutableState.PENDING, ExecutableState.RUNNING):
+                    item.execution_canceled()
+                item.run_state = ExecutableState.IDLE
+
     def create_block_from_file(self, filepath: str, x: float = 0, y: float = 0):
         """Create a new block from a .b file."""
         with open(filepath, "r", encoding="utf-8") as file:
@@ -256,29 +453,39 @@ class Scene(QGraphicsScene, Serializable):
 
     def update_all_blocks_sockets(self):
         """Update the socket position of all blocks."""
-        for item in self.items():
-            if isinstance(item, Block):
-                item.update_sockets()
+        for block in self.blocks:
+            block.update_sockets()
+
+    def schedule_sockets_update(self, blocks: Iterable[Block]):
+        """Update the socket positions of the given blocks once the pending events are handled.
+
+        The blocks scheduled while handling a batch of events, such as the mouse moves
+        of a frame, are only updated once.
+
+        """
+        self._sockets_to_update.update(blocks)
+        if self._sockets_to_update and not self._sockets_timer.isActive():
+            self._sockets_timer.start()
+
+    def update_scheduled_sockets(self):
+        """Update the socket positions of the blocks scheduled for it."""
+        blocks, self._sockets_to_update = self._sockets_to_update, set()
+        for block in blocks:
+            if block.scene() is self:
+                block.update_sockets()
 
     def views(self) -> List["View"]:
         return super().views()
 
     def serialize(self) -> OrderedDict:
         """Serialize the scene into a dict."""
-        blocks: List[Block] = []
-        edges: List[Edge] = []
-        for item in self.items():
-            if isinstance(item, Block):
-                blocks.append(item)
-            elif isinstance(item, Edge):
-                edges.append(item)
-        blocks.sort(key=lambda x: x.id)
-        edges.sort(key=lambda x: x.id)
+        blocks = sorted(self.blocks, key=lambda x: x.id)
+        edges = sorted(self.edges, key=lambda x: x.id)
         return OrderedDict(
             [
                 ("id", self.id),
-                ("blocks", [block.serialize() for block in blocks]),
-                ("edges", [edge.serialize() for edge in edges]),
+                ("blocks", [block.cached_serialize() for block in blocks]),
+                ("edges", [edge.cached_serialize() for edge in edges]),
             ]
         )
 
@@ -302,8 +509,59 @@ class Scene(QGraphicsScene, Serializable):
             hashmap.update({edge_data["id"]: edge})
 
         # Remove empty sockets
-        for item in self.items():
-            if isinstance(item, Block):
-                for socket in item.sockets_in + item.sockets_out:
-                    if not socket.edges:
-                        socket.remove()
+        for block in list(self.blocks):
+            for socket in block.sockets_in + block.sockets_out:
+                if not socket.edges:
+                    socket.remove()
+
+    def deserialize_items(
+        self,
+        blocks_data: Dict[int, Optional[OrderedDict]],
+        edges_data: Dict[int, Optional[OrderedDict]],
+    ):
+        """Add, update or remove some blocks and edges, leaving the other items as is.
+
+        Existing blocks are updated in place, so that their widgets are kept.
+        The sockets of the blocks at both ends of the given edges must be known,
+        either because the blocks are given or because they already have the sockets.
+
+        Args:
+            blocks_data: Serialized blocks by id, None for the blocks to remove.
+            edges_data: Serialized edges by id, None for the edges to remove.
+
+        """
+        items = {item.id: item for item in self.blocks | self.edges}
+
+        # Edges are created again, the sockets they link may have changed
+        for edge_id in edges_data:
+            if edge_id in items:
+                items[edge_id].remove()
+        for block_id, data in blocks_data.items():
+            if data is None and block_id in items:
+                items[block_id].remove()
+
+        hashmap = {}
+        for block_id, data in blocks_data.items():
+            if data is None:
+                continue
+            if block_id in items:
+                items[block_id].deserialize(data, hashmap)
+            else:
+                self.create_block(data, hashmap)
+
+        for data in edges_data.values():
+            if data is None:
+                continue
+            for end in ("source", "destination"):
+                block = items.get(data[end]["block"])
+                if block is not None and data[end]["block"] not in blocks_data:
+                    for socket in block.sockets_in + block.sockets_out:
+                        hashmap.setdefault(socket.id, socket)
+            edge = Edge()
+            edge.deserialize(data, hashmap)
+            self.addItem(edge)
+
+        # Remove empty sockets
+        for item in hashmap.values():
+            if isinstance(item, Socket) and not item.edges:
+                item.remove()
@@ -0,0 +1,383 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Module for the BranchScheduler.
+
+The branch scheduler runs the independent branches of a flow concurrently,
+each one on a worker kernel taken from the KernelPool.
+Once a branch is done, the variables needed by the rest of the graph are dumped
+by the worker kernel into a file and loaded into the kernel of the scene,
+then the blocks joining the branches are run on the kernel of the scene.
+
+"""
+
+import os
+import tempfile
+import weakref
+from time import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from pyflow.blocks.executableblock import ExecutableBlock, ExecutableState
+from pyflow.core.checkpoint import checkpoint_names
+from pyflow.core.kernel import Kernel
+from pyflow.core.kernel_listener import Execution
+from pyflow.core.namespace import (
+    code_names,
+    dump_code,
+    dump_directory,
+    load_code,
+    parse_report,
+)
+from pyflow.logging import get_logger
+
+if TYPE_CHECKING:
+    from pyflow.scene import Scene
+
+LOGGER = get_logger(__name__)
+
+
+def split_branches(
+    blocks: List[ExecutableBlock],
+) -> Tuple[List[List[ExecutableBlock]], List[ExecutableBlock], List[ExecutableBlock]]:
+    """Split blocks to run into independent branches.
+
+    Args:
+        blocks: Blocks to run, in topological order.
+
+    Returns:
+        The independent branches, that only depend on blocks of their own branch,
+        the other blocks that can be run right away, and the blocks joining
+        several branches, that must be run after all of them. Blocks keep
+        the order they have in `blocks`.
+
+    """
+    to_run = set(blocks)
+    inputs = {
+        block: [other for other in block.input_blocks() if other in to_run]
+        for block in blocks
+    }
+    outputs: Dict[ExecutableBlock, List[ExecutableBlock]] = {
+        block: [] for block in blocks
+    }
+    for block in blocks:
+        for other in inputs[block]:
+            outputs[other].append(block)
+
+    # Blocks with several inputs to run, and the blocks they lead to, join branches
+    joining = {block for block in blocks if len(set(inputs[block])) > 1}
+    to_visit = list(joining)
+    while to_visit:
+        for other in outputs[to_visit.pop()]:
+            if other not in joining:
+                joining.add(other)
+                to_visit.append(other)
+
+    # Connected components of the remaining blocks
+    branch_of: Dict[ExecutableBlock, int] = {}
+    components: List[Set[ExecutableBlock]] = []
+    for block in blocks:
+        if block in joining or block in branch_of:
+            continue
+        component = set()
+        to_visit = [block]
+        while to_visit:
+            current = to_visit.pop()
+            if current in component:
+                continue
+            component.add(current)
+            branch_of[current] = len(components)
+            for other in inputs[current] + outputs[current]:
+                if other not in joining:
+                    to_visit.append(other)
+        components.append(component)
+
+    def is_independent(component: Set[ExecutableBlock]) -> bool:
+        # A block with an input that is not run depends on the kernel of the scene
+        return all(
+            other in to_run for block in component for other in block.input_blocks()
+        )
+
+    branches, dependent = [], []
+    for component in components:
+        ordered = [block for block in blocks if block in component]
+        if is_independent(component):
+            branches.append(ordered)
+        else:
+            dependent += ordered
+    joined = [block for block in blocks if block in joining]
+    return branches, dependent, joined
+
+
+class BranchRun:
+
+    """Run of some branches on worker kernels, merged into the kernel of the scene."""
+
+    def __init__(
+        self,
+        scheduler: "BranchScheduler",
+        branches: List[List[ExecutableBlock]],
+        local: List[ExecutableBlock],
+        joined: List[ExecutableBlock],
+    ):
+        """Run of some branches on worker kernels, merged into the kernel of the scene.
+
+        Args:
+            scheduler: BranchScheduler starting the run.
+            branches: Independent branches to run on worker kernels.
+            local: Blocks to run right away on the kernel of the scene.
+            joined: Blocks to run on the kernel of the scene once all branches are merged.
+
+        """
+        self.scheduler = scheduler
+        self.kernel = scheduler.scene.kernel
+        self.branches = branches
+        self.local = local
+        self.joined = joined
+        # The joined blocks wait for every branch and every local block
+        self.remaining = len(branches) + len(local)
+        self.pending_local = set(local)
+        self.failed = False
+        # Keep executions alive until they are finished
+        self.executions: List[Execution] = []
+
+    def start(self):
+        """Start running every branch on its own worker kernel, and the local blocks."""
+        for block in self.joined:
+            block.run_state = ExecutableState.PENDING
+        for branch in self.branches:
+            self._start_branch(branch)
+        for block in self.local:
+            block.run_code()
+
+    def _start_branch(self, branch: List[ExecutableBlock]):
+        """Run a branch on a new worker kernel and dump its variables once done."""
+        worker = Kernel(self.kernel.pool, pipelined=True)
+        worker.cache = self.kernel.cache
+        # Checkpoints taken on the worker are restored from the scene kernel
+        if self.kernel.has_checkpoints or any(
+            checkpoint_names(block) is not None for block in branch
+        ):
+            worker.checkpoints = self.kernel.checkpoints
+        worker.profiler = self.kernel.profiler
+        worker.profile_lane = f"worker {self.branches.index(branch) + 1}"
+        for code in self.kernel.setup_code:
+            worker.add_startup_code(code)
+        for block in branch:
+            block.run_code(worker)
+
+        start_time = time()
+        path = self.scheduler.transfer_path()
+        names = self.scheduler.required_names(branch)
+        # Aborted by the worker kernel if a block of the branch fails
+        dump = Execution(dump_code(path, names), silent=True)
+        dump.signals.finished.connect(
+            lambda: self._branch_dumped(
+                branch, worker, dump, path, start_time=start_time
+            )
+        )
+        self.executions.append(dump)
+        worker.submit(dump)
+
+    def _branch_dumped(
+        self,
+        branch: List[ExecutableBlock],
+        worker: Kernel,
+        dump: Execution,
+        path: str,
+        *,
+        start_time: float,
+    ):
+        """Load the variables of a finished branch into the kernel of the scene."""
+        worker.shutdown()
+        succeeded = dump.status == "ok" and all(
+            block.run_state == ExecutableState.DONE for block in branch
+        )
+        if succeeded:
+            cost = {
+                "blocks": [block.title for block in branch],
+                "run_time": time() - start_time,
+                **parse_report(dump),
+            }
+            load = Execution(load_code(path), silent=True)
+            load.signals.finished.connect(
+                lambda: self.scheduler.record_transfer(cost, load, path)
+            )
+            self.executions.append(load)
+            # Sent before the joined blocks, so the kernel loads the variables first
+            self.kernel.submit(load)
+        else:
+            self.failed = True
+            if os.path.exists(path):
+                os.remove(path)
+        self._part_done()
+
+    def local_block_done(self, block: ExecutableBlock):
+        """Count a local block as done, once it finished or was canceled."""
+        self.pending_local.discard(block)
+        if block.run_state != ExecutableState.DONE:
+            self.failed = True
+        self._part_done()
+
+    def _part_done(self):
+        """Merge the branches once every branch and every local block is done."""
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._merge()
+
+    def _merge(self):
+        """Run the blocks joining the branches, or cancel them if a part failed."""
+        for block in self.joined:
+            if self.failed:
+                block.execution_canceled()
+            else:
+                block.run_code()
+        self.scheduler.runs.remove(self)
+
+
+class BranchScheduler:
+
+    """Scheduler running independent branches of a flow on worker kernels."""
+
+    def __init__(self, scene: "Scene", max_workers: int = None):
+        """Scheduler running independent branches of a flow on worker kernels.
+
+        Args:
+            scene: Scene of the blocks to run.
+            max_workers: Maximum number of worker kernels used by a run,
+                defaults to the number of spare cores, up to 4.
+
+        """
+        self.scene = scene
+        if max_workers is None:
+            max_workers = min(4, max(1, (os.cpu_count() or 1) - 1))
+        self.max_workers = max_workers
+        self._enabled = False
+
+        self.runs: List[BranchRun] = []
+        self.transfers: List[Dict[str, Any]] = []
+        self._transfer_dir: Optional[str] = None
+        self._remove_transfer_dir: Optional[weakref.finalize] = None
+
+    @property
+    def enabled(self) -> bool:
+        """True if independent branches are run on worker kernels."""
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        if value == self._enabled:
+            return
+        self._enabled = value
+        # Keep enough kernels ready for the workers while enabled
+        pool = self.scene.kernel.pool
+        if value:
+            pool.reserve(self.max_workers)
+        else:
+            pool.release(self.max_workers)
+
+    def block_done(self, block: ExecutableBlock):
+        """Notify the runs waiting for a block that it finished or was canceled."""
+        for branch_run in list(self.runs):
+            if block in branch_run.pending_local:
+                branch_run.local_block_done(block)
+
+    def run(self, blocks: List[ExecutableBlock]) -> bool:
+        """Run the given blocks, with independent branches on worker kernels.
+
+        Args:
+            blocks: Blocks to run, in topological order.
+
+        Returns:
+            False if there is nothing to run concurrently,
+            in which case the blocks should be run on the kernel of the scene.
+
+        """
+        branches, local, joined = split_branches(blocks)
+        if len(branches) + bool(local) < 2:
+            return False
+
+        # The longest branches are the ones worth running on other kernels
+        branches.sort(key=len, reverse=True)
+        if not local:
+            # The kernel of the scene runs a branch itself, without transfer
+            local = branches.pop()
+        offloaded = branches[: self.max_workers]
+        for branch in branches[self.max_workers :]:
+            local += branch
+
+        LOGGER.info(
+            "Running %d branches on worker kernels.",
+            len(offloaded),
+        )
+        branch_run = BranchRun(self, offloaded, local, joined)
+        self.runs.append(branch_run)
+        branch_run.start()
+        return True
+
+    def required_names(self, branch: List[ExecutableBlock]) -> Optional[Set[str]]:
+        """Names of the variables of a branch that the rest of the graph may need.
+
+        Returns:
+            Every name used by another block of the scene,
+            None if one of them cannot be parsed, to transfer every variable.
+
+        """
+        names = set()
+        for item in self.scene.blocks:
+            if not isinstance(item, ExecutableBlock) or item in branch:
+                continue
+            item_names = code_names(item.source)
+            if item_names is None:
+                return None
+            names.update(item_names)
+        return names
+
+    def transfer_path(self) -> str:
+        """Path of a new file to transfer variables through."""
+        if self._transfer_dir is None:
+            self._transfer_dir, self._remove_transfer_dir = dump_directory(self)
+        file_descriptor, path = tempfile.mkstemp(suffix=".pkl", dir=self._transfer_dir)
+        os.close(file_descriptor)
+        return path
+
+    def record_transfer(self, cost: Dict[str, Any], load: Execution, path: str):
+        """Record the cost of a finished transfer of variables.
+
+        Args:
+            cost: Report of the dump of the variables by the worker kernel.
+            load: Execution loading the variables into the kernel of the scene.
+            path: File the variables were transfered through.
+
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        cost["load_seconds"] = parse_report(load).get("seconds", 0.0)
+        cost["dump_seconds"] = cost.pop("seconds", 0.0)
+        self.transfers.append(cost)
+        LOGGER.info(
+            "Transferred %d variables (%d bytes) from %s in %.3fs (dump) + %.3fs (load)",
+            len(cost.get("names", [])),
+            cost.get("bytes", 0),
+            cost["blocks"],
+            cost["dump_seconds"],
+            cost["load_seconds"],
+        )
+        if cost.get("skipped"):
+            LOGGER.warning("Could not transfer variables %s", cost["skipped"])
+
+    def report(self) -> Dict[str, float]:
+        """Return statistics about the transfers of variables."""
+        return {
+            "transfers": len(self.transfers),
+            "bytes": sum(cost.get("bytes", 0) for cost in self.transfers),
+            "dump_time": sum(cost["dump_seconds"] for cost in self.transfers),
+            "load_time": sum(cost["load_seconds"] for cost in self.transfers),
+            "run_time": sum(cost["run_time"] for cost in self.transfers),
+        }
+
+    def shutdown(self):
+        """Release the reserved kernels and remove the transfered files."""
+        self.enabled = False
+        if self._remove_transfer_dir is not None:
+            self._remove_transfer_dir()
+            self._transfer_dir = self._remove_transfer_dir = None
@@ -0,0 +1,31 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow block module. """
+
+import pytest
+import pytest_check as check
+
+from pyflow.blocks.block import Block
+
+
+class TestChromePaths:
+
+    """Chrome paths"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, qapp):
+        self.block = Block(width=300, height=200)
+
+    def test_cache(self):
+        """should only build the paths of the block once for a given size."""
+        paths = self.block.chrome_paths()
+        check.is_(self.block.chrome_paths(), paths)
+        check.equal(paths[0].boundingRect(), self.block.rect())
+
+    def test_resize(self):
+        """should build the paths again when the block is resized."""
+        paths = self.block.chrome_paths()
+        self.block.width = 400
+        check.is_not(self.block.chrome_paths(), paths)
+        check.equal(self.block.chrome_paths()[0].boundingRect().width(), 400)
@@ -0,0 +1,22 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Fixtures shared by the unit tests of the pyflow core modules. """
+
+from typing import Callable
+
+import pytest
+from pytest_mock import MockerFixture
+
+
+@pytest.fixture
+def make_block(mocker: MockerFixture) -> Callable:
+    """Factory of mock blocks with a given source and input blocks."""
+
+    def make(source: str, inputs=()):
+        block = mocker.MagicMock()
+        block.source = source
+        block.input_blocks.return_value = list(inputs)
+        return block
+
+    return make
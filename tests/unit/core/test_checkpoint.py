@@ -0,0 +1,80 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow checkpoint module. """
+
+import os
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.checkpoint import CheckpointStore
+from pyflow.core.execution_cache import ExecutionCache
+from pyflow.core.executable import ExecutableState
+
+
+class TestCheckpointStore:
+
+    """CheckpointStore"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, tmp_path, make_block):
+        self.mocker = mocker
+        self.make_block = make_block
+        self.store = CheckpointStore(directory=str(tmp_path))
+        self.kernel = mocker.MagicMock()
+
+        # a -> b -> c -> target, other -> target
+        self.a = self.make_block("a = 1")
+        self.b = self.make_block("b = a", [self.a])
+        self.c = self.make_block("c = b", [self.b])
+        self.other = self.make_block("d = 1")
+        self.target = self.make_block("c + d", [self.c, self.other])
+        self.blocks = [self.a, self.b, self.c, self.other, self.target]
+
+    def checkpoint(self, block):
+        """Record a checkpoint taken after the given block."""
+        key = ExecutionCache.key(block)
+        with open(self.store.path(key), "wb") as file:
+            file.write(b"0")
+        dump = self.mocker.MagicMock()
+        dump.outputs = [('{"names": ["c"], "bytes": 1}', "text")]
+        self.store.add(key, dump)
+
+    def test_no_checkpoint(self):
+        """should run every block when there is no checkpoint."""
+        remaining = self.store.restore(self.kernel, self.blocks, self.target)
+        check.equal(remaining, self.blocks)
+        check.is_false(self.kernel.submit.called)
+
+    def test_restore_nearest(self):
+        """should restore the nearest checkpoint instead of its ancestors."""
+        self.checkpoint(self.a)
+        self.checkpoint(self.b)
+        remaining = self.store.restore(self.kernel, self.blocks, self.target)
+
+        check.equal(remaining, [self.c, self.other, self.target])
+        check.equal(self.kernel.submit.call_count, 1)
+        check.equal(self.a.run_state, ExecutableState.DONE)
+        check.equal(self.b.run_state, ExecutableState.DONE)
+
+    def test_changed_upstream(self):
+        """should not restore a checkpoint whose upstream source changed."""
+        self.checkpoint(self.c)
+        self.a.source = "a = 2"
+        remaining = self.store.restore(self.kernel, self.blocks, self.target)
+        check.equal(remaining, self.blocks)
+
+    def test_target(self):
+        """should always run the target block."""
+        self.checkpoint(self.target)
+        remaining = self.store.restore(self.kernel, self.blocks, self.target)
+        check.equal(remaining, self.blocks)
+
+    def test_close(self):
+        """should remove its temporary directory when closed."""
+        store = CheckpointStore()
+        directory = store.directory
+        store.close()
+        check.is_false(os.path.exists(directory))
@@ -0,0 +1,59 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow edge module. """
+
+import pytest
+from PyQt5.QtCore import QPointF
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.blocks.block import Block
+from pyflow.core.edge import Edge
+from pyflow.core.socket import Socket
+from pyflow.scene.scene import Scene
+
+
+class TestEdge:
+
+    """Edge"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.source_block, self.destination_block = Block(), Block()
+        self.source = Socket(self.source_block, socket_type="output")
+        self.destination = Socket(self.destination_block, socket_type="input")
+        self.source_block.add_socket(self.source)
+        self.destination_block.add_socket(self.destination)
+        self.scene.addItem(self.source_block)
+        self.scene.addItem(self.destination_block)
+        self.edge = Edge(source_socket=self.source, destination_socket=self.destination)
+        self.scene.addItem(self.edge)
+
+    def test_paint(self, mocker: MockerFixture):
+        """should paint the cached path without rebuilding it."""
+        set_path = mocker.spy(self.edge, "setPath")
+        painter = mocker.MagicMock()
+        self.edge.paint(painter, mocker.MagicMock())
+        self.edge.update_path()
+        check.equal(set_path.call_count, 0)
+        painter.drawPath.assert_called_once_with(self.edge.path())
+
+    def test_move_block(self):
+        """should update the path when a block of the edge moves."""
+        self.destination_block.setPos(QPointF(300, 400))
+        end = self.edge.path().currentPosition()
+        check.equal(end, self.destination.scenePos())
+
+    def test_remove_cached_serialize(self):
+        """should not keep the removed sockets in the cached serialization."""
+        for block in (self.source_block, self.destination_block):
+            check.equal(len(block.cached_serialize()["sockets"]), 1)
+
+        self.edge.remove()
+
+        for block in (self.source_block, self.destination_block):
+            check.equal(block.cached_serialize(), block.serialize())
+            check.equal(len(block.cached_serialize()["sockets"]), 0)
@@ -0,0 +1,103 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow execution cache module. """
+
+import os
+
+import pytest
+import pytest_check as check
+
+from pyflow.core.execution_cache import ExecutionCache
+
+
+class TestExecutionCache:
+
+    """ExecutionCache"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, make_block):
+        self.make_block = make_block
+        self.cache = ExecutionCache(max_bytes=100, directory=str(tmp_path))
+
+    def store(self, key: str, size: int):
+        """Store an entry of the given size."""
+        with open(self.cache.path(key), "wb") as file:
+            file.write(b"0" * size)
+        self.cache.store(key, [])
+
+    def test_key_upstream(self):
+        """should change the key of a block when an upstream source changes."""
+        upstream = self.make_block("a = 1")
+        block = self.make_block("b = a", [upstream])
+        key = ExecutionCache.key(block)
+
+        check.equal(key, ExecutionCache.key(block))
+        upstream.source = "a = 2"
+        check.not_equal(key, ExecutionCache.key(block))
+
+    def test_key_inputs_order(self):
+        """should not depend on the order of the inputs."""
+        first, second = self.make_block("a = 1"), self.make_block("b = 1")
+        check.equal(
+            ExecutionCache.key(self.make_block("a + b", [first, second])),
+            ExecutionCache.key(self.make_block("a + b", [second, first])),
+        )
+
+    def test_get(self):
+        """should return stored entries and count hits and misses."""
+        check.is_none(self.cache.get("key"))
+        self.store("key", 10)
+        entry = self.cache.get("key")
+        check.equal(entry.size, 10)
+        check.equal(self.cache.report()["hits"], 1)
+        check.equal(self.cache.report()["misses"], 1)
+
+    def test_evict_least_recently_used(self):
+        """should evict the least recently used entries when full."""
+        self.store("first", 40)
+        self.store("second", 40)
+        self.cache.get("first")
+        self.store("third", 40)
+
+        check.equal(list(self.cache.entries), ["first", "third"])
+        check.equal(self.cache.size, 80)
+        check.is_false(os.path.exists(self.cache.path("second")))
+
+    def test_too_large(self):
+        """should not store an entry larger than the cache."""
+        self.store("large", 200)
+        check.is_none(self.cache.get("large"))
+        check.is_false(os.path.exists(self.cache.path("large")))
+
+    def test_image_size(self):
+        """should count the size of the images in the outputs of an entry."""
+        image = {
+            "output_type": "display_data",
+            "data": {"image/png": "A" * 200},
+            "metadata": {},
+        }
+        with open(self.cache.path("image"), "wb") as file:
+            file.write(b"0")
+        self.cache.store("image", [("text", "text"), (image, "display")])
+        check.is_none(self.cache.get("image"))
+
+        self.cache.max_bytes = 1000
+        with open(self.cache.path("image"), "wb") as file:
+            file.write(b"0")
+        self.cache.store("image", [("text", "text"), (image, "display")])
+        check.greater(self.cache.get("image").size, 200)
+
+    def test_discard_unstored(self):
+        """should remove variables written for an entry that was not stored."""
+        with open(self.cache.path("key"), "wb") as file:
+            file.write(b"0")
+        self.cache.discard("key")
+        check.is_false(os.path.exists(self.cache.path("key")))
+
+    def test_close(self):
+        """should remove its temporary directory when closed."""
+        cache = ExecutionCache()
+        directory = cache.directory
+        cache.close()
+        check.is_false(os.path.exists(directory))
@@ -0,0 +1,54 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow image cache module. """
+
+import pytest
+import pytest_check as check
+
+from pyflow.core.image_cache import ImageCache, image_cache
+
+# 1x1 png image
+PNG = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhg"
+    "GAWjR9awAAAABJRU5ErkJggg=="
+)
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="10"></svg>'
+
+
+class TestImageCache:
+
+    """ImageCache"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, qapp):
+        self.cache = ImageCache(max_bytes=2000)
+
+    def test_decode_once(self):
+        """should decode an image only the first time it is displayed."""
+        pixmap = self.cache.get(PNG, "image/png")
+        check.equal((pixmap.width(), pixmap.height()), (1, 1))
+        check.is_(self.cache.get(PNG, "image/png"), pixmap)
+        check.equal((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_svg(self):
+        """should render svg images."""
+        pixmap = self.cache.get(SVG.format(20), "image/svg+xml")
+        check.equal((pixmap.width(), pixmap.height()), (20, 10))
+
+    def test_invalid(self):
+        """should return None for images that cannot be decoded."""
+        check.is_none(self.cache.get("bm90IGFuIGltYWdl", "image/png"))
+
+    def test_evict_least_recently_used(self):
+        """should evict the least recently used images when full."""
+        first, second, third = (SVG.format(width) for width in (20, 21, 22))
+        for svg in (first, second, first, third):
+            self.cache.get(svg, "image/svg+xml")
+        check.equal(
+            list(self.cache.pixmaps), [ImageCache.key(first), ImageCache.key(third)]
+        )
+
+    def test_shared(self):
+        """should give the same image cache to every caller."""
+        check.is_(image_cache(), image_cache())
@@ -0,0 +1,100 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow kernel module. """
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.blocks.codeblock import CodeBlock
+from pyflow.blocks.executableblock import ExecutableState
+from pyflow.core.kernel import Kernel
+from pyflow.scene.scene import Scene
+
+
+def finish(execution, status: str):
+    """Deliver the end of an execution as the kernel would."""
+    execution.handle_idle()
+    execution.handle_reply({"content": {"status": status}})
+
+
+class TestKernelCheckpoints:
+
+    """Kernel checkpoints"""
+
+    def test_lazy_store(self, mocker: MockerFixture):
+        """should only create a checkpoint store when it is first used."""
+        store_class = mocker.patch("pyflow.core.kernel.CheckpointStore")
+        kernel = Kernel(pool=mocker.MagicMock())
+        store_class.assert_not_called()
+        check.is_(kernel.checkpoints, store_class.return_value)
+        check.is_(kernel.checkpoints, store_class.return_value)
+        store_class.assert_called_once()
+
+    def test_has_checkpoints(self, mocker: MockerFixture):
+        """should tell if a checkpoint store exists without creating one."""
+        store_class = mocker.patch("pyflow.core.kernel.CheckpointStore")
+        kernel = Kernel(pool=mocker.MagicMock())
+        check.is_false(kernel.has_checkpoints)
+        store_class.assert_not_called()
+        kernel.checkpoints.path("key")
+        check.is_true(kernel.has_checkpoints)
+
+
+class TestPipelinedKernel:
+
+    """Pipelined Kernel"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.kernel = Kernel(pool=mocker.MagicMock(), pipelined=True)
+        self.scene.kernel = self.kernel
+        self.submitted = []
+        self.kernel.submit = self.submitted.append
+        self.blocks = [CodeBlock(title=name, source=f"{name} = 1") for name in "abc"]
+        for block in self.blocks:
+            self.scene.addItem(block)
+
+    def test_send_all(self):
+        """should send the whole queue to the kernel at once."""
+        for block in self.blocks:
+            block.run_code()
+        check.equal(
+            [execution.code for execution in self.submitted],
+            ["a = 1", "b = 1", "c = 1"],
+        )
+        check.equal(self.kernel.running, self.submitted)
+
+    def test_error_aborts_sent(self):
+        """should cancel the blocks the kernel aborted after a block failed."""
+        failing, first_sent, second_sent = self.blocks
+        failing.blocks_to_run = [first_sent, second_sent]
+        for block in self.blocks:
+            block.run_code()
+
+        failed, *aborted = self.submitted
+        failed.signals.error.emit()
+        check.equal(failing.blocks_to_run, [])
+        finish(failed, "error")
+        for execution in aborted:
+            finish(execution, "aborted")
+
+        check.equal(failing.run_state, ExecutableState.CRASHED)
+        check.equal(first_sent.run_state, ExecutableState.IDLE)
+        check.equal(second_sent.run_state, ExecutableState.IDLE)
+        check.equal(self.kernel.running, [])
+        check.is_false(self.kernel.busy)
+
+    def test_restart_in_flight(self):
+        """should ignore the end of executions dropped by a restart."""
+        self.blocks[0].metadata["checkpoint"] = []
+        for block in self.blocks:
+            block.run_code()
+        self.kernel.restart()
+        for execution in self.submitted:
+            finish(execution, "ok")
+        check.equal(self.kernel.running, [])
+        check.equal(self.kernel.dumps, [])
@@ -0,0 +1,207 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow kernel listener module. """
+
+import asyncio
+from collections import deque
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.kernel_listener import Execution, KernelListener
+
+
+def stream(text: str) -> dict:
+    """Stream message printing the given text."""
+    return {"msg_type": "stream", "content": {"name": "stdout", "text": text}}
+
+
+def reply(msg_id: str, status: str = "ok") -> dict:
+    """Execute reply to the request with the given msg_id."""
+    return {
+        "msg_type": "execute_reply",
+        "parent_header": {"msg_id": msg_id},
+        "content": {"status": status},
+    }
+
+
+class TestExecutionBatching:
+
+    """Execution output batching"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.execution = Execution("")
+        self.outputs = []
+        self.execution.signals.stdout.connect(
+            lambda text: self.outputs.append(("text", text))
+        )
+        self.execution.signals.display.connect(
+            lambda output: self.outputs.append(("display", output["data"]))
+        )
+
+    def test_coalesce(self):
+        """should deliver the printed text at once when flushed."""
+        # As done by the profiler
+        self.execution.received_times = deque()
+        for text in ("a\n", "b", "c\n", "d"):
+            self.execution.handle_message(stream(text))
+        check.equal(self.outputs, [])
+        check.is_true(self.execution.has_pending_outputs)
+
+        self.execution.flush()
+        # The last line is replaced by the next text, as if delivered one by one
+        check.equal(self.outputs, [("text", "a\nc\nd")])
+        check.equal(len(self.execution.received_times), 1)
+        check.equal(len(self.execution.outputs), 4)
+
+    def test_not_profiled(self):
+        """should not record the arrival of outputs if the execution is not profiled."""
+        self.execution.handle_message(stream("a\n"))
+        self.execution.flush()
+        check.is_none(self.execution.received_times)
+
+    def test_size(self):
+        """should deliver the printed text once it is large enough."""
+        self.execution.batch_size = 4
+        self.execution.handle_message(stream("ab\n"))
+        self.execution.handle_message(stream("cd\n"))
+        check.equal(self.outputs, [("text", "ab\ncd\n")])
+
+    def test_ordered(self):
+        """should deliver the printed text before any other output."""
+        self.execution.handle_message(stream("a\n"))
+        image = {"msg_type": "display_data", "content": {"data": {"image/png": "i"}}}
+        self.execution.handle_message(image)
+        self.execution.handle_message(stream("b\n"))
+        self.execution.handle_idle()
+        check.equal(
+            self.outputs,
+            [("text", "a\n"), ("display", {"image/png": "i"}), ("text", "b\n")],
+        )
+
+    def test_display(self):
+        """should keep every representation of rich outputs."""
+        data = {"image/svg+xml": "<svg/>", "text/plain": "<Figure>"}
+        message = {
+            "msg_type": "display_data",
+            "content": {"data": data, "metadata": {}},
+        }
+        self.execution.handle_message(message)
+        check.equal(self.outputs, [("display", data)])
+        check.equal(self.execution.outputs[0][1], "display")
+
+    def test_plain_result(self):
+        """should print results without a rich representation."""
+        message = {
+            "msg_type": "execute_result",
+            "content": {"data": {"text/plain": "1"}},
+        }
+        self.execution.handle_message(message)
+        check.equal(self.outputs, [("text", "1")])
+
+    def test_coalesce_updates(self):
+        """should only deliver the last update of each display."""
+        for width in (1, 2, 3):
+            content = {
+                "data": {"text/plain": str(width)},
+                "metadata": {},
+                "transient": {"display_id": "progress"},
+            }
+            message = {"msg_type": "update_display_data", "content": content}
+            self.execution.handle_message(message)
+        check.equal(self.outputs, [])
+
+        self.execution.flush()
+        check.equal(self.outputs, [("display", {"text/plain": "3"})])
+        check.equal(len(self.execution.outputs), 1)
+
+    def test_clear(self):
+        """should forget the cleared outputs once the next output arrives."""
+        self.execution.handle_message(stream("a\n"))
+        clear = {"msg_type": "clear_output", "content": {"wait": True}}
+        self.execution.handle_message(clear)
+        check.equal(len(self.execution.outputs), 2)
+
+        self.execution.handle_message(stream("b\n"))
+        check.equal(self.execution.outputs, [("b\n", "text")])
+
+
+class TestKernelListenerFailure:
+
+    """KernelListener without a kernel"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.pool = mocker.MagicMock()
+        self.pool.acquire.side_effect = RuntimeError("no kernel")
+        self.listener = KernelListener(self.pool)
+
+    def test_abort_pending(self):
+        """should abort the executions waiting for a kernel that failed to start."""
+        execution = Execution("")
+        self.listener.submit(execution)
+        self.listener.run()
+        check.is_true(self.listener.failed)
+        check.is_true(execution.is_finished)
+        check.is_true(execution.is_aborted)
+
+    def test_abort_submitted(self):
+        """should abort the executions submitted after the kernel failed to start."""
+        self.listener.run()
+        execution = Execution("")
+        self.listener.submit(execution)
+        check.is_true(execution.is_aborted)
+
+
+class TestKernelListenerRouting:
+
+    """KernelListener message routing"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.listener = KernelListener(mocker.MagicMock())
+        self.listener.client = mocker.MagicMock()
+        self.executions = {}
+        for msg_id in ("first", "second"):
+            execution = Execution("")
+            execution.msg_id = msg_id
+            self.executions[msg_id] = execution
+            self.listener._executions[msg_id] = execution
+
+    def read_shell(self, mocker: MockerFixture, *messages: dict):
+        """Route the given shell messages until there are none left."""
+        self.listener.client.get_shell_msg = mocker.AsyncMock(
+            side_effect=[*messages, asyncio.CancelledError]
+        )
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(self.listener._read_shell())
+
+    def test_route(self, mocker: MockerFixture):
+        """should route each reply to the execution given by its msg_id."""
+        self.read_shell(mocker, reply("second", "error"), reply("unknown"))
+        check.equal(self.executions["second"].status, "error")
+        check.is_none(self.executions["first"].status)
+
+    def test_stale_reply(self, mocker: MockerFixture):
+        """should drop the replies of executions that are already finished."""
+        finished = []
+        execution = self.executions["first"]
+        execution.signals.finished.connect(lambda: finished.append(True))
+        execution.handle_idle()
+        self.read_shell(mocker, reply("first"), reply("first", "error"))
+        check.equal(execution.status, "ok")
+        check.equal(finished, [True])
+        check.is_false("first" in self.listener._executions)
+
+    def test_stop_before_ready(self, mocker: MockerFixture):
+        """should shut down the kernel it gets once stopped, without running."""
+        kernel_manager = mocker.MagicMock()
+        self.listener.pool.acquire.return_value = (kernel_manager, mocker.MagicMock())
+        self.listener.stop()
+        self.listener.run()
+        kernel_manager.shutdown_kernel.assert_called_once()
+        check.is_none(self.listener.loop)
+        check.is_false(self.listener.ready.is_set())
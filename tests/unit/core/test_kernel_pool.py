@@ -0,0 +1,90 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow kernel pool module. """
+
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.kernel_pool import KernelPool
+
+
+class TestKernelPool:
+
+    """KernelPool"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.start_new_kernel = mocker.patch(
+            "pyflow.core.kernel_pool.start_new_kernel",
+            side_effect=lambda: (mocker.MagicMock(), mocker.MagicMock()),
+        )
+        self.pool = KernelPool(size=2)
+
+    def test_acquire_empty(self):
+        """should spawn a kernel when acquiring from an empty pool."""
+        kernel_manager, client = self.pool.acquire(timeout=5)
+        check.is_not_none(kernel_manager)
+        check.is_not_none(client)
+        check.greater_equal(self.start_new_kernel.call_count, 1)
+
+    def test_refill(self):
+        """should refill the pool in the background after a kernel is acquired."""
+        self.pool.fill()
+        self.pool.acquire(timeout=5)
+        handles = [self.pool.acquire(timeout=5) for _ in range(2)]
+        check.equal(len(handles), 2)
+        check.greater_equal(self.start_new_kernel.call_count, 3)
+
+    def test_report(self):
+        """should report the time to first execute."""
+        self.pool.record_first_execute(1.0)
+        self.pool.record_first_execute(3.0)
+        report = self.pool.report()
+        check.equal(report["first_executes"], 2)
+        check.equal(report["mean_time_to_first_execute"], 2.0)
+        check.equal(report["max_time_to_first_execute"], 3.0)
+
+    def test_shutdown(self):
+        """should shut down idle kernels and stop spawning."""
+        kernel_manager, client = self.pool.acquire(timeout=5)
+        self.pool.shutdown()
+        self.pool.fill()
+        check.equal(self.pool.idle_count, 0)
+        check.is_false(kernel_manager.shutdown_kernel.called)
+
+    def test_spawn_failure(self):
+        """should raise the spawn error in acquire instead of waiting forever."""
+        self.start_new_kernel.side_effect = RuntimeError("no kernel")
+        with pytest.raises(RuntimeError):
+            self.pool.acquire(timeout=5)
+
+    def test_spawn_failure_not_idle(self):
+        """should not count nor keep spawn errors that no acquire waited for."""
+        spawn = self.start_new_kernel.side_effect
+        self.start_new_kernel.side_effect = RuntimeError("no kernel")
+        self.pool.fill()
+        deadline = time.time() + 5
+        while self.start_new_kernel.call_count < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        while self.pool._spawning and time.time() < deadline:
+            time.sleep(0.01)
+        check.equal(self.pool.idle_count, 0)
+
+        self.start_new_kernel.side_effect = spawn
+        kernel_manager, client = self.pool.acquire(timeout=5)
+        check.is_not_none(kernel_manager)
+        check.is_not_none(client)
+
+    def test_release(self):
+        """should shut down the idle kernels no longer reserved."""
+        self.pool.reserve(4)
+        deadline = time.time() + 5
+        while self.pool.idle_count < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        self.pool.release(4)
+        check.equal(self.pool.target_size, 2)
+        check.equal(self.pool.idle_count, 2)
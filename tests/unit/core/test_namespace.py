@@ -0,0 +1,100 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow namespace module. """
+
+import json
+import os
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.namespace import (
+    code_names,
+    dump_code,
+    load_code,
+    parse_report,
+    snapshot_code,
+)
+
+
+class TestNamespaceTransfer:
+
+    """Namespace transfer"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.path = os.path.join(tmp_path, "namespace.pkl")
+        self.namespace = {"a": 1, "b": [1, 2], "os": os, "_hidden": 0}
+
+    def dump(self, capsys, namespace, **kwargs) -> dict:
+        """Run the dump code in the given namespace and return its report."""
+        exec(dump_code(self.path, **kwargs), namespace)  # pylint:disable=exec-used
+        return json.loads(capsys.readouterr().out)
+
+    def test_round_trip(self, capsys):
+        """should load the dumped variables and modules into another namespace."""
+        report = self.dump(capsys, self.namespace)
+        check.equal(report["names"], ["a", "b", "os"])
+        check.greater(report["bytes"], 0)
+
+        loaded = {}
+        exec(load_code(self.path), loaded)  # pylint:disable=exec-used
+        check.equal(loaded["a"], 1)
+        check.equal(loaded["b"], [1, 2])
+        check.is_(loaded["os"], os)
+        check.is_false("_hidden" in loaded)
+
+    def test_names(self, capsys):
+        """should only dump the given names that exist."""
+        report = self.dump(capsys, self.namespace, names=["b", "missing"])
+        check.equal(report["names"], ["b"])
+
+    def test_since_snapshot(self, capsys):
+        """should only dump the variables assigned since the snapshot."""
+        exec(snapshot_code(), self.namespace)  # pylint:disable=exec-used
+        exec("a = 2\nc = 3", self.namespace)  # pylint:disable=exec-used
+        report = self.dump(capsys, self.namespace, since_snapshot=True)
+        check.equal(report["names"], ["a", "c"])
+        check.is_false("_pyflow_snapshot" in self.namespace)
+
+    def test_modified_in_place(self, capsys):
+        """should dump the variables used by the code that it modified in place."""
+        exec(snapshot_code(["b"]), self.namespace)  # pylint:disable=exec-used
+        exec("b.append(3)", self.namespace)  # pylint:disable=exec-used
+        report = self.dump(capsys, self.namespace, since_snapshot=True)
+        check.equal(report["names"], ["b"])
+        check.is_false("_pyflow_fingerprint" in self.namespace)
+
+    def test_unchanged_in_place(self, capsys):
+        """should not dump the variables used by the code that it did not modify."""
+        exec(snapshot_code(["a", "b"]), self.namespace)  # pylint:disable=exec-used
+        exec("c = a + len(b)", self.namespace)  # pylint:disable=exec-used
+        report = self.dump(capsys, self.namespace, since_snapshot=True)
+        check.equal(report["names"], ["c"])
+
+    def test_unpicklable_used(self, capsys):
+        """should report the used variables it cannot tell are unchanged as skipped."""
+        self.namespace["gen"] = (i for i in range(3))
+        exec(snapshot_code(["gen"]), self.namespace)  # pylint:disable=exec-used
+        exec("next(gen)", self.namespace)  # pylint:disable=exec-used
+        report = self.dump(capsys, self.namespace, since_snapshot=True)
+        check.equal(report["skipped"], ["gen"])
+
+    def test_code_names(self):
+        """should find the names used by a piece of code."""
+        check.equal(code_names("model.fit(x)\ny = 1"), {"model", "x", "y"})
+        check.is_none(code_names("def ("))
+
+    def test_skip_unpicklable(self, capsys):
+        """should skip the variables that cannot be pickled."""
+        self.namespace["gen"] = (i for i in range(3))
+        report = self.dump(capsys, self.namespace)
+        check.equal(report["skipped"], ["gen"])
+
+    def test_parse_report(self, mocker: MockerFixture):
+        """should read the last json output of an execution."""
+        execution = mocker.MagicMock()
+        execution.outputs = [('{"seconds": 1}', "text"), ("not json", "text")]
+        check.equal(parse_report(execution), {"seconds": 1})
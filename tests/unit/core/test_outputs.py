@@ -0,0 +1,96 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow outputs module. """
+
+import os
+
+import pytest
+import pytest_check as check
+
+from pyflow.core.outputs import (
+    OutputBuffer,
+    append_output,
+    append_stdout,
+    is_rich,
+    spill_directory,
+    stream_output,
+)
+
+
+class TestOutputBuffer:
+
+    """OutputBuffer"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.buffer = OutputBuffer(max_lines=3, max_chars=100)
+        yield
+        self.buffer.clear()
+
+    def test_append_like_stdout(self):
+        """should replace the last line like append_stdout."""
+        cached_stdout, stdout = "", ""
+        for value in ("a\nb", "c\nd", "e", "f\n", "g"):
+            cached_stdout, stdout = append_stdout(cached_stdout, value)
+            self.buffer.append(value)
+        check.equal(self.buffer.text, stdout)
+
+    def test_append_new_lines(self):
+        """should return the new complete lines only."""
+        check.equal(self.buffer.append("a\nb"), (["a"], 0))
+        check.equal(self.buffer.append("c\nd\n"), (["c", "d"], 0))
+        check.equal(self.buffer.last_line, "")
+
+    def test_spill_lines(self):
+        """should spill the oldest lines to disk when there are too many."""
+        self.buffer.append("a\nb\n")
+        added, spilled = self.buffer.append("c\nd\ne\nf\n")
+
+        check.equal(added, ["d", "e", "f"])
+        check.equal(spilled, 2)
+        check.equal(self.buffer.text, "d\ne\nf\n")
+        check.is_true(self.buffer.is_truncated)
+        with open(self.buffer.full_output_path(), "r", encoding="utf-8") as file:
+            check.equal(file.read(), "a\nb\nc\nd\ne\nf\n")
+
+    def test_spill_directory(self):
+        """should spill every buffer into the same temporary directory."""
+        self.buffer.append("a\nb\nc\nd\ne\n")
+        check.equal(os.path.dirname(self.buffer.spill_path), spill_directory())
+        check.equal(spill_directory(), spill_directory())
+
+    def test_spill_chars(self):
+        """should spill the oldest lines to disk when they are too long."""
+        self.buffer.append("a" * 60 + "\n")
+        self.buffer.append("b" * 60 + "\n")
+        check.equal(self.buffer.text, "b" * 60 + "\n")
+        check.equal(self.buffer.spilled_lines, 1)
+
+    def test_clear(self):
+        """should forget every line and remove the spill file."""
+        self.buffer.append("a\nb\nc\nd\ne\n")
+        spill_path = self.buffer.spill_path
+        self.buffer.clear()
+        check.equal(self.buffer.text, "")
+        check.is_false(os.path.exists(spill_path))
+
+
+class TestOutputs:
+
+    """Notebook outputs"""
+
+    def test_is_rich(self):
+        """should only find rich outputs with a representation other than text."""
+        check.is_true(is_rich({"data": {"text/html": "<b>a</b>", "text/plain": "a"}}))
+        check.is_false(is_rich({"data": {"text/plain": "a"}}))
+
+    def test_append_output(self):
+        """should merge printed text, replacing its last line."""
+        display = {"output_type": "display_data", "data": {"image/png": "i"}}
+        outputs = []
+        for output in ("a\nb", "c\n", display, "d"):
+            if isinstance(output, str):
+                output = stream_output(output)
+            append_output(outputs, output)
+        check.equal(outputs, [stream_output("a\nc\n"), display, stream_output("d")])
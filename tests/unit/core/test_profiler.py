@@ -0,0 +1,84 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow execution profiler module. """
+
+import json
+from collections import deque
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.profiler import ExecutionProfiler
+
+
+class TestExecutionProfiler:
+
+    """ExecutionProfiler"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.mocker = mocker
+        self.profiler = ExecutionProfiler(enabled=True)
+
+        self.block = mocker.MagicMock()
+        self.block.id = 1
+        self.block.title = "block"
+
+        self.execution = mocker.MagicMock()
+        self.execution.start_time = 12.0
+        self.execution.end_time = 15.0
+        self.execution.received_times = deque()
+
+    def test_disabled(self):
+        """should not profile executions when disabled."""
+        self.profiler.enabled = False
+        check.is_none(self.profiler.profile(self.block, self.execution, 10.0))
+        check.equal(self.profiler.profiles, [])
+
+    def test_timings(self):
+        """should split the time between the queue and the kernel."""
+        profile = self.profiler.profile(self.block, self.execution, 10.0)
+        check.equal(profile.queue_time, 2.0)
+        check.equal(profile.run_time, 3.0)
+
+    def test_finish(self):
+        """should keep the kernel timings but not the finished execution."""
+        profile = self.profiler.profile(self.block, self.execution, 10.0)
+        profile.finish()
+        check.is_none(profile.execution)
+        check.equal(profile.queue_time, 2.0)
+        check.equal(profile.run_time, 3.0)
+
+    def test_deliver(self):
+        """should time the transfer and the rendering of each output."""
+        self.mocker.patch("pyflow.core.profiler.time", side_effect=[14.5, 14.75])
+        profile = self.profiler.profile(self.block, self.execution, 10.0)
+        handler = self.mocker.MagicMock()
+        self.execution.received_times.append(14.0)
+
+        profile.deliver(handler)("output")
+
+        handler.assert_called_once_with("output")
+        check.equal(profile.transfer_time, 0.5)
+        check.equal(profile.render_time, 0.25)
+        check.equal(len(self.execution.received_times), 0)
+
+    def test_export(self, tmp_path):
+        """should export a chrome trace with a lane per kernel, transfer and GUI."""
+        profile = self.profiler.profile(self.block, self.execution, 10.0, "worker 1")
+        profile.deliveries.append((14.0, 14.5, 14.75))
+        path = str(tmp_path / "trace.json")
+        self.profiler.export(path)
+
+        with open(path, "r", encoding="utf-8") as file:
+            events = json.load(file)["traceEvents"]
+        durations = {
+            event["cat"]: event["dur"] for event in events if event["ph"] == "X"
+        }
+        check.equal(
+            durations, {"queue": 2e6, "run": 3e6, "transfer": 5e5, "render": 2.5e5}
+        )
+        lanes = {event["args"]["name"] for event in events if event["ph"] == "M"}
+        check.equal(lanes, {"worker 1 queue", "worker 1", "transfer", "GUI"})
@@ -0,0 +1,37 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow serializable module. """
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.serializable import Serializable
+
+
+class TestCachedSerialize:
+
+    """Cached serialize"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.item = Serializable()
+        self.item.serialize = mocker.MagicMock(side_effect=lambda: {"id": 1})
+
+    def test_cache(self):
+        """should only serialize again once the object is marked dirty."""
+        self.item.TRACKS_CHANGES = True
+        first = self.item.cached_serialize()
+        check.is_(self.item.cached_serialize(), first)
+        check.equal(self.item.serialize.call_count, 1)
+
+        self.item.mark_dirty()
+        check.is_not(self.item.cached_serialize(), first)
+        check.equal(self.item.serialize.call_count, 2)
+
+    def test_untracked(self):
+        """should always serialize objects that do not track their changes."""
+        self.item.cached_serialize()
+        self.item.cached_serialize()
+        check.equal(self.item.serialize.call_count, 2)
@@ -0,0 +1,59 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow view module. """
+
+import pytest
+from PyQt5.QtCore import QPointF
+from PyQt5.QtWidgets import QGraphicsView
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.blocks.block import Block
+from pyflow.graphics.view import View
+from pyflow.scene.scene import Scene
+
+
+class TestViewportUpdates:
+
+    """Viewport updates"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.view = View(self.scene)
+        self.block = Block(width=300, height=200)
+        self.scene.addItem(self.block)
+
+    def test_update_mode(self):
+        """should only repaint the regions that changed by default."""
+        check.equal(
+            self.view.viewportUpdateMode(),
+            QGraphicsView.ViewportUpdateMode.SmartViewportUpdate,
+        )
+        self.view.set_update_mode("full")
+        check.equal(
+            self.view.viewportUpdateMode(),
+            QGraphicsView.ViewportUpdateMode.FullViewportUpdate,
+        )
+        with pytest.raises(ValueError):
+            self.view.set_update_mode("everything")
+
+    def test_block_outline(self):
+        """should include the selection outline in the area repainted for a block."""
+        outline_width = self.block.pen_width
+        check.is_true(
+            self.block.boundingRect().contains(
+                QPointF(-2.5 * outline_width, -2.5 * outline_width)
+            )
+        )
+        check.is_false(self.block.contains(QPointF(-outline_width, -outline_width)))
+
+    def test_resize_block(self, mocker: MockerFixture):
+        """should tell the scene before the area of a block changes."""
+        prepare = mocker.spy(self.block, "prepareGeometryChange")
+        self.block.width = 600
+        self.block.height = 400
+        check.equal(prepare.call_count, 2)
+        check.is_true(self.block in self.scene.items(QPointF(500, 300)))
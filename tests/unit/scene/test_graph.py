@@ -0,0 +1,85 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow execution graph module. """
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.scene.graph import ExecutionGraph
+
+
+class TestExecutionGraph:
+
+    """ExecutionGraph"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.mocker = mocker
+        self.graph = ExecutionGraph()
+        self.blocks = {name: mocker.MagicMock(name=name) for name in "abcde"}
+        self.edges = {}
+        for source, destination in ("ab", "bc", "cd", "ad"):
+            self.link(source, destination)
+
+    def link(self, source: str, destination: str):
+        """Add an active edge between two fake blocks."""
+        edge = self.mocker.MagicMock()
+        edge.source_socket.block = self.blocks[source]
+        edge.destination_socket.block = self.blocks[destination]
+        edge.source_socket.is_on = edge.destination_socket.is_on = True
+        self.edges[source + destination] = edge
+        self.graph.update_edge(edge)
+
+    def names(self, blocks):
+        """Names of the given fake blocks."""
+        return [block._mock_name for block in blocks]
+
+    def test_traversals(self):
+        """should give the ancestors and descendants of a block."""
+        check.equal(set(self.names(self.graph.ancestors(self.blocks["d"]))), set("abc"))
+        check.equal(
+            set(self.names(self.graph.descendants(self.blocks["b"]))), set("cd")
+        )
+        check.equal(self.graph.ancestors(self.blocks["e"]), frozenset())
+
+    def test_topological_order(self):
+        """should order each block after the blocks it depends on."""
+        check.equal(self.names(self.graph.topological_order()), list("abcd"))
+        blocks = [self.blocks[name] for name in "dcbe"]
+        check.equal(self.names(self.graph.sort(blocks)), list("ebcd"))
+
+    def test_remove_edge(self):
+        """should update the cached traversals when an edge is removed."""
+        check.equal(len(self.graph.ancestors(self.blocks["d"])), 3)
+        self.graph.remove_edge(self.edges["cd"])
+        check.equal(set(self.names(self.graph.ancestors(self.blocks["d"]))), {"a"})
+        check.equal(self.names(self.graph.input_blocks(self.blocks["d"])), ["a"])
+
+    def test_toggle_socket(self):
+        """should ignore the edges of a socket turned off."""
+        edge = self.edges["bc"]
+        edge.destination_socket.is_on = False
+        edge.destination_socket.edges = [edge]
+        self.graph.update_socket(edge.destination_socket)
+        check.equal(self.graph.descendants(self.blocks["b"]), frozenset())
+        check.is_false(edge in self.graph.links)
+
+    def test_reorder(self):
+        """should keep a topological order when an edge goes backward in it."""
+        self.link("e", "a")
+        check.equal(self.names(self.graph.topological_order()), list("eabcd"))
+
+    def test_reject_cycle(self):
+        """should not index an edge that would create a cycle."""
+        check.is_true(self.graph.creates_cycle(self.blocks["d"], self.blocks["a"]))
+        check.is_true(self.graph.creates_cycle(self.blocks["a"], self.blocks["a"]))
+        check.is_false(self.graph.creates_cycle(self.blocks["a"], self.blocks["c"]))
+
+        edge = self.mocker.MagicMock()
+        edge.source_socket.block = self.blocks["c"]
+        edge.destination_socket.block = self.blocks["b"]
+        check.is_false(self.graph.update_edge(edge))
+        check.is_false(edge in self.graph.links)
+        check.equal(self.graph.descendants(self.blocks["c"]), {self.blocks["d"]})
@@ -3,11 +3,16 @@
 
 """ Unit tests for the pyflow history module. """
 
+from functools import partial
+
 import pytest
 from pytest_mock import MockerFixture
 import pytest_check as check
 
+from pyflow.blocks.block import Block
+from pyflow.core.serializable import Serializable
 from pyflow.scene.history import SceneHistory
+from pyflow.scene.scene import Scene
 
 
 class TestUndo:
@@ -153,3 +158,125 @@ class TestStore:
 
         check.equal(self.history.history_stack, ["B", "C", "D", "E"])
         check.equal(self.history.history_stack[self.history.current], "E")
+
+
+class TestCheckpoint:
+
+    """Checkpoint"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.blocks = []
+        for block_id in (1, 2):
+            block = mocker.MagicMock(spec=Block)
+            block.id, block.dirty, block._serialized = block_id, True, None
+            block.serialize.return_value = {"id": block_id, "position": [0, 0]}
+            block.cached_serialize = partial(Serializable.cached_serialize, block)
+            self.blocks.append(block)
+        self.scene = mocker.MagicMock()
+        self.scene.blocks, self.scene.edges = set(self.blocks), set()
+        self.history = SceneHistory(self.scene, max_stack=6, keyframe_interval=2)
+        self.history.checkpoint("Initialized scene")
+
+    def move(self, block, position):
+        """Move a fake block."""
+        block.serialize.return_value = {"id": block.id, "position": position}
+        block.dirty = True
+
+    def test_only_dirty_blocks(self):
+        """should only serialize and store the blocks that changed."""
+        self.move(self.blocks[0], [1, 1])
+        self.history.checkpoint("Moved block")
+
+        check.equal(self.blocks[0].serialize.call_count, 2)
+        check.equal(self.blocks[1].serialize.call_count, 1)
+        stamp = self.history.history_stack[-1]
+        check.equal(
+            stamp["blocks"],
+            {1: ({"id": 1, "position": [0, 0]}, {"id": 1, "position": [1, 1]})},
+        )
+
+    def test_no_change(self):
+        """should not store a checkpoint if nothing changed."""
+        self.blocks[1].dirty = True
+        self.history.checkpoint("Nothing")
+        check.equal(len(self.history.history_stack), 1)
+
+    def test_undo_redo(self):
+        """should only restore the items that changed."""
+        self.move(self.blocks[0], [1, 1])
+        self.history.checkpoint("Moved block")
+        self.scene.blocks.remove(self.blocks[1])
+        self.history.checkpoint("Deleted block")
+
+        self.history.undo()
+        self.scene.deserialize_items.assert_called_with(
+            {2: {"id": 2, "position": [0, 0]}}, {}
+        )
+        self.history.undo()
+        self.scene.deserialize_items.assert_called_with(
+            {1: {"id": 1, "position": [0, 0]}}, {}
+        )
+
+        self.history.redo()
+        self.history.redo()
+        self.scene.deserialize_items.assert_called_with({2: None}, {})
+        check.equal(self.history.state["blocks"], {1: {"id": 1, "position": [1, 1]}})
+
+    def test_keyframes(self):
+        """should store a keyframe every keyframe_interval checkpoints."""
+        for position in range(1, 5):
+            self.move(self.blocks[0], [position, 0])
+            self.history.checkpoint("Moved block")
+
+        keyframes = ["keyframe" in stamp for stamp in self.history.history_stack]
+        check.equal(keyframes, [True, False, True, False, True])
+        state = self.history.state_at(3)
+        check.equal(state["blocks"][1], {"id": 1, "position": [3, 0]})
+
+
+class TestSceneRestore:
+
+    """Scene restore"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.blocks = [Block(title=name) for name in "abc"]
+        for block in self.blocks:
+            self.scene.addItem(block)
+        self.scene.history.checkpoint("Added blocks")
+
+    def items(self):
+        """Blocks of the scene by id."""
+        return {block.id: block for block in self.scene.blocks}
+
+    def test_untouched_items(self):
+        """should keep the untouched items and only rebuild the changed ones."""
+        moved, untouched, deleted = self.blocks
+        moved.setPos(10, 20)
+        self.scene.history.checkpoint("Moved block")
+        deleted.remove()
+        self.scene.history.checkpoint("Deleted block")
+
+        self.scene.history.undo()
+        items = self.items()
+        check.is_(items[moved.id], moved)
+        check.is_(items[untouched.id], untouched)
+        check.is_not(items[deleted.id], deleted)
+        check.equal(items[deleted.id].title, "c")
+        restored = items[deleted.id]
+
+        self.scene.history.undo()
+        items = self.items()
+        check.is_(items[moved.id], moved)
+        check.equal((moved.pos().x(), moved.pos().y()), (0, 0))
+        check.is_(items[untouched.id], untouched)
+        check.is_(items[deleted.id], restored)
+
+        self.scene.history.redo()
+        self.scene.history.redo()
+        items = self.items()
+        check.equal((moved.pos().x(), moved.pos().y()), (10, 20))
+        check.equal(set(items.values()), {moved, untouched})
@@ -0,0 +1,175 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow scene module. """
+
+import pytest
+from PyQt5.QtCore import QRectF
+from PyQt5.QtWidgets import QGraphicsItem
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.blocks.block import Block
+from pyflow.core.edge import Edge
+from pyflow.scene.scene import GRID_CACHED_TILES, GRID_MIN_SPACING, Scene
+
+
+class TestItemIndexes:
+
+    """Item indexes"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.block = Block()
+        self.edge = Edge()
+        self.scene.addItem(self.block)
+        self.scene.addItem(self.edge)
+
+    def test_add_item(self):
+        """should index the blocks and edges added to the scene."""
+        check.equal(self.scene.blocks, {self.block})
+        check.equal(self.scene.edges, {self.edge})
+        check.is_(self.scene.getItemById(self.block.id), self.block)
+        check.is_(self.scene.getItemById(self.edge.id), self.edge)
+
+    def test_remove_item(self):
+        """should forget the blocks and edges removed from the scene."""
+        self.block.remove()
+        self.edge.remove()
+        check.equal(self.scene.blocks, set())
+        check.equal(self.scene.edges, set())
+        check.is_none(self.scene.getItemById(self.block.id))
+
+    def test_clear(self):
+        """should forget every item when the scene is cleared."""
+        self.scene.clear()
+        check.equal(self.scene.items_by_id, {})
+        check.equal(self.scene.blocks, set())
+        check.equal(self.scene.edges, set())
+
+
+class TestVirtualization:
+
+    """Virtualization"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.scene.virtualized = True
+        self.scene.set_visible_rect(QRectF(0, 0, 1000, 1000))
+        self.near, self.far = Block(position=(100, 100)), Block(position=(5000, 0))
+        self.scene.addItem(self.near)
+        self.scene.addItem(self.far)
+
+    def test_visible_blocks(self):
+        """should only materialize the blocks in the visible area."""
+        check.is_true(self.near.materialized)
+        check.is_false(self.far.materialized)
+        check.is_false(self.far.holder.isVisible())
+
+    def test_scroll(self):
+        """should materialize the blocks entering the visible area."""
+        self.scene.set_visible_rect(QRectF(4500, 0, 1000, 1000))
+        check.is_false(self.near.materialized)
+        check.is_true(self.far.materialized)
+
+    def test_selected(self):
+        """should materialize the selected blocks."""
+        self.far.setSelected(True)
+        check.is_true(self.far.materialized)
+
+    def test_disable(self):
+        """should materialize every block when virtualization is disabled."""
+        self.scene.virtualized = False
+        check.is_true(self.far.materialized)
+
+    def test_low_detail(self):
+        """should hide the widgets of every block when zoomed out."""
+        self.scene.low_detail = True
+        check.is_false(self.near.materialized)
+        self.scene.low_detail = False
+        check.is_true(self.near.materialized)
+
+    def test_device_cache(self):
+        """should cache what the blocks paint when the device cache is enabled."""
+        cache = QGraphicsItem.CacheMode.DeviceCoordinateCache
+        check.equal(self.near.cacheMode(), QGraphicsItem.CacheMode.NoCache)
+        self.scene.device_cache = True
+        check.equal(self.near.cacheMode(), cache)
+        block = Block()
+        self.scene.addItem(block)
+        check.equal(block.cacheMode(), cache)
+
+
+class TestGridTiles:
+
+    """Grid tiles"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+
+    def test_cache(self):
+        """should render a tile of the grid once for each size in pixels."""
+        brush = self.scene.grid_brush(100.2)
+        check.is_(self.scene.grid_brush(99.8), brush)
+        check.equal(brush.texture().width(), 100)
+
+    def test_low_detail(self):
+        """should not draw the grid when its lines would be too close."""
+        check.is_none(self.scene.grid_brush(GRID_MIN_SPACING - 1))
+
+    def test_bounded(self):
+        """should only keep the tiles of the last sizes used."""
+        for pixels in range(100, 100 + 2 * GRID_CACHED_TILES):
+            self.scene.grid_brush(pixels)
+        check.equal(len(self.scene._grid_brushes), GRID_CACHED_TILES)
+
+
+class TestSocketsUpdates:
+
+    """Sockets updates"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, qapp):
+        mocker.patch("pyflow.scene.scene.Kernel")
+        self.scene = Scene()
+        self.blocks = [Block(), Block(), Block()]
+        for block in self.blocks:
+            self.scene.addItem(block)
+        self.scene.update_scheduled_sockets()
+        self.update_sockets = mocker.patch.object(Block, "update_sockets")
+
+    def test_coalesce(self):
+        """should update the sockets of a block once however often it is scheduled."""
+        for _ in range(3):
+            self.scene.schedule_sockets_update(self.blocks[:2])
+        self.blocks[1].remove()
+        self.update_sockets.assert_not_called()
+        self.scene.update_scheduled_sockets()
+        check.equal(self.update_sockets.call_count, 1)
+
+    def test_move_block(self, mocker: MockerFixture):
+        """should schedule the update of a moved block and of its neighbors."""
+        mocker.patch.object(Block, "neighbors", return_value={self.blocks[1]})
+        schedule = mocker.spy(self.scene, "schedule_sockets_update")
+        self.blocks[0].setPos(100, 100)
+        schedule.assert_called_once_with({self.blocks[0], self.blocks[1]})
+
+    def test_drag_selection(self, mocker: MockerFixture):
+        """should not schedule the neighbors dragged along with a moved block."""
+        mocker.patch.object(Block, "neighbors", return_value=set(self.blocks[1:]))
+        mocker.patch.object(self.scene, "mouseGrabberItem", return_value=self.blocks[0])
+        schedule = mocker.spy(self.scene, "schedule_sockets_update")
+        for block in self.blocks[:2]:
+            block.setSelected(True)
+        self.blocks[0].setPos(100, 100)
+        schedule.assert_called_once_with({self.blocks[0], self.blocks[2]})
+
+        self.blocks[2].setSelected(True)
+        self.blocks[0].setPos(200, 200)
+        schedule.assert_called_with(set())
@@ -0,0 +1,116 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow branch scheduler module. """
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.blocks.executableblock import ExecutableState
+from pyflow.scene.scheduler import BranchRun, BranchScheduler, split_branches
+
+
+class TestSplitBranches:
+
+    """split_branches"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.mocker = mocker
+
+    def make_blocks(self, names, edges):
+        """Create mock blocks named after `names` connected by the given edges."""
+        blocks = {}
+        for name in names:
+            block = self.mocker.MagicMock(name=name)
+            block.input_blocks.return_value = []
+            blocks[name] = block
+        for source, destination in edges:
+            blocks[destination].input_blocks.return_value.append(blocks[source])
+        return [blocks[name] for name in names]
+
+    def test_two_chains_joined(self):
+        """should split two chains feeding one block into two branches."""
+        a1, a2, b1, b2, train = self.make_blocks(
+            ["a1", "a2", "b1", "b2", "train"],
+            [("a1", "a2"), ("b1", "b2"), ("a2", "train"), ("b2", "train")],
+        )
+        branches, dependent, joined = split_branches([a1, a2, b1, b2, train])
+        check.equal(branches, [[a1, a2], [b1, b2]])
+        check.equal(dependent, [])
+        check.equal(joined, [train])
+
+    def test_chain(self):
+        """should keep a single chain as one branch."""
+        a, b, c = self.make_blocks(["a", "b", "c"], [("a", "b"), ("b", "c")])
+        branches, dependent, joined = split_branches([a, b, c])
+        check.equal(branches, [[a, b, c]])
+        check.equal(dependent, [])
+        check.equal(joined, [])
+
+    def test_depends_on_done_block(self):
+        """should not split a branch depending on a block that is not run."""
+        _, a, b, train = self.make_blocks(
+            ["done", "a", "b", "train"],
+            [("done", "a"), ("a", "train"), ("b", "train")],
+        )
+        branches, dependent, joined = split_branches([a, b, train])
+        check.equal(branches, [[b]])
+        check.equal(dependent, [a])
+        check.equal(joined, [train])
+
+    def test_joined_descendants(self):
+        """should run the blocks after a joining block after all branches."""
+        a, b, join, after = self.make_blocks(
+            ["a", "b", "join", "after"],
+            [("a", "join"), ("b", "join"), ("join", "after")],
+        )
+        branches, _, joined = split_branches([a, b, join, after])
+        check.equal(branches, [[a], [b]])
+        check.equal(joined, [join, after])
+
+
+class TestBranchRun:
+
+    """BranchRun"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture):
+        self.scheduler = BranchScheduler(mocker.MagicMock(), max_workers=2)
+        self.worker_block, self.local_block, self.joined_block = (
+            mocker.MagicMock(name=name) for name in ("worker", "local", "joined")
+        )
+        self.branch_run = BranchRun(
+            self.scheduler,
+            [[self.worker_block]],
+            [self.local_block],
+            [self.joined_block],
+        )
+        self.scheduler.runs.append(self.branch_run)
+
+    def test_wait_local(self):
+        """should only run the joined blocks once the local blocks are done."""
+        self.branch_run._part_done()
+        self.joined_block.run_code.assert_not_called()
+        self.local_block.run_state = ExecutableState.DONE
+        self.scheduler.block_done(self.local_block)
+        self.joined_block.run_code.assert_called_once()
+        check.equal(self.scheduler.runs, [])
+
+    def test_local_failure(self):
+        """should cancel the joined blocks if a local block fails after the branches."""
+        self.branch_run._part_done()
+        self.local_block.run_state = ExecutableState.CRASHED
+        self.scheduler.block_done(self.local_block)
+        self.joined_block.run_code.assert_not_called()
+        self.joined_block.execution_canceled.assert_called_once()
+
+    def test_enable(self):
+        """should reserve kernels for the workers only while enabled."""
+        pool = self.scheduler.scene.kernel.pool
+        self.scheduler.enabled = True
+        self.scheduler.enabled = True
+        pool.reserve.assert_called_once_with(2)
+        self.scheduler.enabled = False
+        pool.release.assert_called_once_with(2)
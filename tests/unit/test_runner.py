@@ -0,0 +1,149 @@
+# Pyflow an open-source tool for modular visual programing in python
+# Copyright (C) 2021-2022 Bycelium <https://www.gnu.org/licenses/>
+
+""" Unit tests for the pyflow headless runner. """
+
+import json
+import subprocess
+import sys
+
+import pytest
+from pytest_mock import MockerFixture
+import pytest_check as check
+
+from pyflow.core.outputs import stream_output
+from pyflow.runner import GraphRunner, block_source, main, topological_order
+
+
+def make_graph():
+    """Serialized graph: a -> c, b -> c, and a markdown block."""
+    blocks = [
+        {"id": 3, "title": "c", "block_type": "CodeBlock", "source": "print(a + b)"},
+        {"id": 1, "title": "a", "block_type": "CodeBlock", "source": "a = 1"},
+        {"id": 4, "title": "md", "block_type": "MarkdownBlock", "text": "# Title"},
+        {
+            "id": 2,
+            "title": "b",
+            "block_type": "SliderBlock",
+            "var_name": "b",
+            "value": "0.5",
+        },
+    ]
+    edges = [
+        {"id": 5, "source": {"block": 1}, "destination": {"block": 3}},
+        {"id": 6, "source": {"block": 2}, "destination": {"block": 3}},
+    ]
+    return {"id": 0, "blocks": blocks, "edges": edges}
+
+
+class TestTopologicalOrder:
+
+    """topological_order"""
+
+    def test_order(self):
+        """should order executable blocks after their inputs."""
+        order = [block["title"] for block in topological_order(make_graph())]
+        check.equal(order, ["a", "b", "c"])
+
+    def test_cycle(self):
+        """should raise a ValueError if the graph has a cycle."""
+        graph = make_graph()
+        graph["edges"].append(
+            {"id": 7, "source": {"block": 3}, "destination": {"block": 1}}
+        )
+        with pytest.raises(ValueError):
+            topological_order(graph)
+
+    def test_block_source(self):
+        """should give the code run by executable blocks only."""
+        blocks = {block["title"]: block for block in make_graph()["blocks"]}
+        check.equal(block_source(blocks["b"]), "b = 0.5")
+        check.equal(block_source(blocks["a"]), "a = 1")
+        check.is_none(block_source(blocks["md"]))
+
+
+class TestGraphRunner:
+
+    """GraphRunner"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker: MockerFixture, tmp_path):
+        self.path = str(tmp_path / "graph.ipyg")
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(make_graph(), file)
+
+        self.client = mocker.MagicMock()
+        self.start_new_kernel = mocker.patch(
+            "pyflow.runner.start_new_kernel",
+            return_value=(mocker.MagicMock(), self.client),
+        )
+
+    def execute(self, code, output_hook=None, **kwargs):
+        """Fake kernel printing the code it runs, failing on `a = 1`."""
+        output_hook({"msg_type": "stream", "content": {"name": "stdout", "text": code}})
+        status = "error" if code == "a = 1" else "ok"
+        return {"content": {"status": status}}
+
+    def test_run(self):
+        """should run the blocks in order and write their outputs back."""
+        self.client.execute_interactive.side_effect = self.execute
+        runner = GraphRunner(self.path)
+        results = runner.run()
+
+        check.equal([result.status for result in results], ["error", "ok", "skipped"])
+        check.is_false(runner.succeeded)
+        with open(self.path, "r", encoding="utf-8") as file:
+            blocks = {block["title"]: block for block in json.load(file)["blocks"]}
+        check.is_false("stdout" in blocks["a"])
+        check.equal(
+            blocks["a"]["outputs"],
+            [{"output_type": "stream", "name": "stdout", "text": "a = 1"}],
+        )
+        check.is_false("stdout" in blocks["b"])
+
+    def test_display_updates(self):
+        """should update displays in place and honor clear_output."""
+
+        def execute(code, output_hook=None, **kwargs):
+            transient = {"transient": {"display_id": "bar"}}
+            data = {"data": {"text/plain": "0%"}, "metadata": {}}
+            output_hook({"msg_type": "stream", "content": {"text": "cleared"}})
+            output_hook({"msg_type": "clear_output", "content": {"wait": True}})
+            output_hook({"msg_type": "display_data", "content": {**data, **transient}})
+            update = {"data": {"text/plain": "100%"}, "metadata": {}, **transient}
+            output_hook({"msg_type": "update_display_data", "content": update})
+            return {"content": {"status": "ok"}}
+
+        self.client.execute_interactive.side_effect = execute
+        GraphRunner(self.path).run()
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            blocks = {block["title"]: block for block in json.load(file)["blocks"]}
+        check.equal(
+            blocks["a"]["outputs"],
+            [
+                {
+                    "output_type": "display_data",
+                    "data": {"text/plain": "100%"},
+                    "metadata": {},
+                }
+            ],
+        )
+
+    def test_missing_graph(self, tmp_path):
+        """should only fail the graphs that cannot be read in a batch."""
+        self.client.execute_interactive.side_effect = self.execute
+        missing = str(tmp_path / "missing.ipyg")
+        check.equal(main([missing, self.path, "--jobs", "2"]), 1)
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            blocks = {block["title"]: block for block in json.load(file)["blocks"]}
+        check.equal(blocks["a"]["outputs"], [stream_output("a = 1")])
+
+    def test_no_qt(self):
+        """should not import Qt."""
+        code = "import sys, pyflow.runner; print('PyQt5' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, check=True, text=True
+        )
+        check.equal(output.stdout.strip(), "False")